@@ -8,10 +8,55 @@ import os
 import time
 import threading
 import csv
+import multiprocessing
+import signal
 import subprocess
-from collections import defaultdict, deque
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta, timezone
 
+try:
+    from .proc_snapshot import CpuSampler, SnapshotEngine
+    from .process_events import ProcConnectorSource
+    from .process_cache import ProcessMetadataCache
+    from .burst_window import SlidingWindowCounter
+    from .process_tree import ProcessTree
+    from .procfs import PROC_ROOT, STAT_PPID, UID_KEY, VMRSS_KEY, io_totals, thread_reader
+    from .log_writer import BatchedWriter
+    from .log_segments import RotationPolicy
+    from . import anomaly_archive
+    from .anomaly_schema import FIELDNAMES, classify_anomaly, ensure_current, format_timestamp, make_record, to_row
+    from .anomaly_store import AnomalyStore
+    from .anomaly_rollups import RollupStore
+    from .alert_episodes import ESCALATED, RESOLVED, AlertTracker, format_duration
+    from .state_tables import BoundedTable
+    from .alert_rules import AlertRules, severity_for
+    from .sampling_scheduler import SamplingScheduler
+    from .self_metrics import Profiler, SelfMetrics, format_report
+    from .cmdline_classifier import cache_stats as classifier_cache_stats, classify_cmdline, display_name as command_display_name
+    from .process_recording import DeltaDecoder, DeltaEncoder, Recorder, Replayer, ReplayMetadataCache
+    from .pipeline import STOP, Channel, QueueWriter, StageMeter, deliver, format_stage_report
+except ImportError:
+    from proc_snapshot import CpuSampler, SnapshotEngine
+    from process_events import ProcConnectorSource
+    from process_cache import ProcessMetadataCache
+    from burst_window import SlidingWindowCounter
+    from process_tree import ProcessTree
+    from procfs import PROC_ROOT, STAT_PPID, UID_KEY, VMRSS_KEY, io_totals, thread_reader
+    from log_writer import BatchedWriter
+    from log_segments import RotationPolicy
+    import anomaly_archive
+    from anomaly_schema import FIELDNAMES, classify_anomaly, ensure_current, format_timestamp, make_record, to_row
+    from anomaly_store import AnomalyStore
+    from anomaly_rollups import RollupStore
+    from alert_episodes import ESCALATED, RESOLVED, AlertTracker, format_duration
+    from state_tables import BoundedTable
+    from alert_rules import AlertRules, severity_for
+    from sampling_scheduler import SamplingScheduler
+    from self_metrics import Profiler, SelfMetrics, format_report
+    from cmdline_classifier import cache_stats as classifier_cache_stats, classify_cmdline, display_name as command_display_name
+    from process_recording import DeltaDecoder, DeltaEncoder, Recorder, Replayer, ReplayMetadataCache
+    from pipeline import STOP, Channel, QueueWriter, StageMeter, deliver, format_stage_report
+
 # Configuration
 MEMORY_THRESHOLD_MB = 50
 CPU_THRESHOLD_PERCENT = 80
@@ -20,14 +65,47 @@ PROCESS_BURST_WINDOW = 5  # seconds
 ANOMALY_GROUP_WINDOW = 3  # seconds
 CSV_FILE = "anomalies.csv"
 LOG_FILE = "netsnoop_persistent.txt"
+ANOMALY_BACKEND = "csv"  # "csv" or "sqlite" (indexed WAL database at ANOMALY_DB_FILE)
+ANOMALY_DB_FILE = "anomalies.db"
+ANOMALY_ROLLUP_FILE = "anomalies_rollup.db"  # Minute/hour counts for dashboard charts (None to disable)
 DEBUG_MODE = False  # Set to False to only show anomalies
 LOG_PROCESS_TREE = True  # Set to True to log process trees to file
+USE_PROC_CONNECTOR = True  # Use kernel fork/exec/exit events when permitted (needs CAP_NET_ADMIN)
 CPU_HIGH_THRESHOLD = 80      # High CPU warning
 CPU_CRITICAL_THRESHOLD = 95  # Critical CPU alert
 CPU_EXTREME_THRESHOLD = 98   # Extreme CPU alert
 MEMORY_HIGH_THRESHOLD = 50    # High memory warning (MB)
 MEMORY_CRITICAL_THRESHOLD = 100  # Critical memory alert (MB)
 MEMORY_EXTREME_THRESHOLD = 200   # Extreme memory alert (MB)
+FAMILY_MEMORY_THRESHOLD_MB = 400       # Combined RSS of a process and its descendants
+FAMILY_CPU_THRESHOLD_PERCENT = 150     # Combined CPU of a process family (100 = one core)
+RULES_FILE = "netsnoop_rules.json"     # Per-user/process/cgroup thresholds and exclusions (optional, reloaded on SIGHUP)
+ALERT_RESOLVE_AFTER = 30   # seconds under the thresholds before an alert episode is resolved
+STATE_TABLE_CAPACITY = 10000  # Max entries per alert/cooldown table (oldest evicted first)
+STATE_STATS_INTERVAL = 300    # seconds between state table size reports in the log
+ADAPTIVE_SAMPLING = True      # Re-read each process at its own interval instead of every sweep
+SAMPLE_MIN_INTERVAL = 1       # seconds between reads of a process near a threshold or changing fast
+SAMPLE_MAX_INTERVAL = 30      # seconds between reads of an idle process
+MONITOR_CPU_BUDGET_PERCENT = 1.0  # Monitor's own CPU (% of one core) before sampling intervals are stretched
+FAMILY_CHECK_INTERVAL = 5     # seconds between process family (subtree) checks
+MEMORY_CHECK_INTERVAL = 10    # seconds between memory checks without adaptive sampling
+CPU_CHECK_INTERVAL = 5        # seconds between CPU checks without adaptive sampling
+RECORD_FILE = None            # Capture per-sweep process table deltas here for replay (e.g. "netsnoop_capture.jsonl.gz")
+PIPELINE_MODE = False         # Run collector, detector and writer as separate processes (Linux, fork)
+PIPELINE_SWEEP_QUEUE = 8      # Sweeps in flight between collector and detector before the collector blocks
+PIPELINE_REPORT_INTERVAL = 60  # seconds between per-stage throughput reports in the log
+SELF_REPORT_INTERVAL = 60     # seconds between the monitor's own stage latency/cost reports in the log
+PROFILE_SECONDS = 30          # Length of a profiling session started with SIGUSR1
+PROFILE_DIR = "."             # Where profiling sessions write their .pstats/.txt files
+LOG_QUEUE_SIZE = 10000     # Pending log lines/anomaly rows before new ones are dropped
+LOG_FLUSH_INTERVAL = 1.0   # seconds between flushes of the log and CSV files
+LOG_FSYNC_POLICY = "interval"  # "never", "interval" (every LOG_FSYNC_INTERVAL) or "always"
+LOG_FSYNC_INTERVAL = 5.0   # seconds
+LOG_ROTATE_BYTES = 64 * 1024 * 1024  # Rotate the log/CSV into a compressed segment at this size...
+LOG_ROTATE_SECONDS = 24 * 3600       # ...or at this age
+LOG_KEEP_SEGMENTS = 60               # Oldest segments beyond this are deleted (None keeps all)
+ARCHIVE_DIR = "anomaly_archive"      # Daily Parquet archive of old CSV segments (needs pyarrow)
+ARCHIVE_COMPACT_INTERVAL = 24 * 3600  # seconds between compaction runs
 
 # Colors for terminal output
 RED = "\033[91m"
@@ -64,246 +142,227 @@ SAFE_PARENT_NAMES = {
     "firefox", "gnome", "kde"
 }
 
+# Command-line fragments identifying NetSnoop's own processes (self-exclusion)
+MONITORING_KEYWORDS = (
+    "acm_monitor.py", "acm.py", "streamlit", "dashboard.py",
+    "monitor_env/bin/streamlit", "monitor_env/bin/python",
+    "/streamlit", "streamlit run"
+)
+
+def threshold_defaults():
+    """The constants above, as the defaults a rules file overrides"""
+    return {
+        "memory_mb": {"HIGH": MEMORY_HIGH_THRESHOLD, "CRITICAL": MEMORY_CRITICAL_THRESHOLD,
+                      "EXTREME": MEMORY_EXTREME_THRESHOLD},
+        "cpu_percent": {"HIGH": CPU_HIGH_THRESHOLD, "CRITICAL": CPU_CRITICAL_THRESHOLD,
+                        "EXTREME": CPU_EXTREME_THRESHOLD},
+        "family_memory_mb": FAMILY_MEMORY_THRESHOLD_MB,
+        "family_cpu_percent": FAMILY_CPU_THRESHOLD_PERCENT,
+    }
+
 # Global variables for tracking
-recent_processes = deque(maxlen=100)
-memory_alert_counts = defaultdict(int)
-cpu_alert_counts = defaultdict(int)
+clock = time.time  # Wall clock; a replay substitutes the recorded sweep time
+snapshot_engine = None
+sampling_scheduler = None
+recorder = None  # process_recording.Recorder while RECORD_FILE is set (a DeltaEncoder in the pipeline collector)
+forward_spawns = False  # Pipeline collector: spawn events go to the detector instead of the burst counters
+alert_rules = AlertRules(RULES_FILE, threshold_defaults(), SAFE_PARENT_NAMES, MONITORING_KEYWORDS, STATE_TABLE_CAPACITY)
+rules_reload_requested = threading.Event()  # Set by SIGHUP, handled by the main loop
+metadata_cache = ProcessMetadataCache()  # comm/cmdline/user per (pid, starttime)
+process_event_source = None
+process_tree = ProcessTree()  # ppid -> children index with subtree CPU/RSS rollups
+family_alerts = {  # Open family episodes per metric
+    "memory": AlertTracker("memory-family", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY),
+    "cpu": AlertTracker("cpu-family", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY),
+}
+event_entries = OrderedDict()  # Recent fork entries by PID, updated on exec
+MAX_EVENT_ENTRIES = 4096
+recent_processes = deque(maxlen=100)  # Sample of recent spawns, used to name burst instigators
+spawn_counter = SlidingWindowCounter(PROCESS_BURST_WINDOW, PROCESS_BURST_THRESHOLD)
+script_spawn_counter = SlidingWindowCounter(PROCESS_BURST_WINDOW, PROCESS_BURST_THRESHOLD)
+memory_alerts = AlertTracker("memory", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY)  # Per (pid, starttime)
+cpu_alerts = AlertTracker("cpu", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY)
 anomaly_buffer = []
 anomaly_counts = {"PROCESS_BURST": 0, "HIGH_MEMORY": 0, "HIGH_CPU": 0, "SUSPICIOUS_PROCESS": 0}
-burst_alert_history = {}  # Track recent burst alerts to avoid spam
 BURST_COOLDOWN = 30  # seconds before alerting again for same process
-previous_cpu_measurements = {}
+# Recent burst alerts by parent (pid, starttime) or ("script", name); entries
+# expire with the cooldown, so the table only holds parents in cooldown
+burst_alert_history = BoundedTable("burst_alert_history", STATE_TABLE_CAPACITY, ttl=BURST_COOLDOWN)
+cpu_sampler = CpuSampler()  # Keeps utime/stime between CPU checks
+self_metrics = SelfMetrics()  # Per-stage latency histograms and counters of the monitor itself
+profiler = Profiler(PROFILE_SECONDS, PROFILE_DIR)  # cProfile/tracemalloc session on SIGUSR1
+log_writer = BatchedWriter(  # Single thread owning anomalies.csv and the log file
+    max_queue=LOG_QUEUE_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+    fsync_policy=LOG_FSYNC_POLICY, fsync_interval=LOG_FSYNC_INTERVAL,
+    rotation=RotationPolicy(LOG_ROTATE_BYTES, LOG_ROTATE_SECONDS, LOG_KEEP_SEGMENTS),
+    metrics=self_metrics
+)
 
 def get_ist_timestamp():
     """Get current timestamp in IST format (fixed deprecation warning)"""
-    utc_now = datetime.now(timezone.utc)
+    utc_now = datetime.fromtimestamp(clock(), timezone.utc)
     ist_now = utc_now + timedelta(hours=5, minutes=30)
     return ist_now.strftime("%H:%M:%S")
 
 def get_ist_datetime():
     """Get current datetime in IST format (fixed deprecation warning)"""
-    utc_now = datetime.now(timezone.utc)
+    utc_now = datetime.fromtimestamp(clock(), timezone.utc)
     ist_now = utc_now + timedelta(hours=5, minutes=30)
     return ist_now.strftime("%Y-%m-%d %H:%M:%S IST")
 
 
 class AnomalyLogger:
-    def __init__(self, csv_file):
+    def __init__(self, csv_file, db_file=None, rollup_file=None):
         self.csv_file = csv_file
-        self.fieldnames = ['timestamp', 'process_name', 'pid', 'reason', 'severity', 'user', 'command']
-        self._ensure_csv_exists()
+        self.fieldnames = FIELDNAMES
+        self.store = AnomalyStore(db_file) if db_file else None
+        self.rollups = RollupStore(rollup_file) if rollup_file else None
+        if self.store is None:
+            self._ensure_csv_exists()
 
     def _ensure_csv_exists(self):
-        """Ensure CSV file exists with proper headers"""
+        """Ensure CSV file exists with the current schema header"""
         if not os.path.exists(self.csv_file):
             with open(self.csv_file, 'w', newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=self.fieldnames)
                 writer.writeheader()
+            return
+        # Rows are appended in the current schema, so convert an older file first
+        stats = ensure_current(self.csv_file)
+        if stats is not None:
+            print(f"{YELLOW}📦 Migrated {self.csv_file} to the current anomaly schema "
+                  f"({stats['converted']} rows, original kept as {self.csv_file}.legacy){RESET}")
 
-    def log_anomaly(self, process_name, reason, pid=None, severity="MEDIUM", user=None, command=None):
-        """Log anomaly to CSV file with IST timestamp"""
-        try:
-            with open(self.csv_file, 'a', newline='') as f:
-                writer = csv.DictWriter(f, fieldnames=self.fieldnames)
-                writer.writerow({
-                    'timestamp': get_ist_datetime(),
-                    'process_name': process_name,
-                    'pid': pid or "",
-                    'reason': reason,
-                    'severity': severity,
-                    'user': user or "",
-                    'command': command or ""
-                })
-        except Exception as e:
-            print(f"{RED}❌ Error logging anomaly: {e}{RESET}")
-            
+    def log_anomaly(self, process_name, reason, pid=None, severity="MEDIUM", user=None, command=None, **fields):
+        """Queue a typed anomaly record for the background writer
+
+        fields are further schema columns, e.g. the episode state and id.
+        """
+        now = clock()
+        record = make_record(now, classify_anomaly(reason), severity, process_name, pid, reason,
+                             user=user, command=command, **fields)
+        if self.store is not None:
+            queued = log_writer.write_record(self.store, dict(record._asdict(), timestamp=format_timestamp(now)))
+        else:
+            queued = log_writer.write_row(self.csv_file, self.fieldnames, to_row(record))
+        if queued and self.rollups is not None and record.state != RESOLVED:
+            log_writer.write_record(self.rollups, record._asdict())
+        if not queued:
+            print(f"{RED}❌ Anomaly dropped, log queue full ({log_writer.dropped} dropped){RESET}")
 
 
 def log_message(message, level="INFO"):
-    """Log message to persistent log file"""
-    try:
-        timestamp = get_ist_datetime()
-        with open(LOG_FILE, "a") as f:
-            f.write(f"[{timestamp}] {message}\n")
-    except Exception as e:
-        print(f"{RED}❌ Log write error: {e}{RESET}")
+    """Queue a message for the persistent log file"""
+    log_writer.write_line(LOG_FILE, f"[{get_ist_datetime()}] {message}\n")
 
-def log_anomaly(process_name, reason, pid=None, severity="MEDIUM", user=None, command=None):
+def log_anomaly(process_name, reason, pid=None, severity="MEDIUM", user=None, command=None, **fields):
     """Global anomaly logging function"""
     global anomaly_logger
     try:
-        anomaly_logger.log_anomaly(process_name, reason, pid, severity, user, command)
+        anomaly_logger.log_anomaly(process_name, reason, pid, severity, user, command, **fields)
+        if fields.get("state") == RESOLVED:
+            log_message(f"✅ RESOLVED: {process_name} (PID {pid}) - {reason}")
+            return
         log_message(f"🚨 ANOMALY: {process_name} (PID {pid}) - {reason}")
         
         # Update counters
-        if "burst" in reason.lower():
-            anomaly_counts["PROCESS_BURST"] += 1
-        elif "memory" in reason.lower():
-            anomaly_counts["HIGH_MEMORY"] += 1
-        elif "cpu" in reason.lower():
-            anomaly_counts["HIGH_CPU"] += 1
-        else:
-            anomaly_counts["SUSPICIOUS_PROCESS"] += 1
+        anomaly_counts[classify_anomaly(reason)] += 1
+        self_metrics.count("alerts")
             
     except Exception as e:
         print(f"{RED}❌ Anomaly logging error: {e}{RESET}")
 
 def get_name_ppid_uid(pid):
     """Get process name, parent PID, and user ID"""
-    try:
-        with open(f"/proc/{pid}/stat", "r") as f:
-            fields = f.read().split()
-            name = fields[1].strip("()")
-            ppid = int(fields[3])
-        
-        with open(f"/proc/{pid}/status", "r") as f:
-            for line in f:
-                if line.startswith("Uid:"):
-                    uid = int(line.split()[1])
-                    break
-            else:
-                uid = 0
-        
-        return name, ppid, uid
-    except:
+    reader = thread_reader()
+    stat = reader.stat(pid, (STAT_PPID,))
+    if stat is None:
         return None, None, None
+    name, (ppid,) = stat
+
+    status = reader.status(pid, (UID_KEY,))
+    uid = status[0] if status and status[0] is not None else 0
+    return name, ppid, uid
 
 def get_username(uid):
-    """Get username from UID"""
-    try:
-        import pwd
-        return pwd.getpwuid(uid).pw_name
-    except:
-        return str(uid)
+    """Get username from UID (resolved once per UID)"""
+    return metadata_cache.username(uid)
+
+def get_process_metadata(pid):
+    """Get cached metadata for a PID, validated against the latest snapshot"""
+    snapshot = snapshot_engine.latest if snapshot_engine else None
+    return metadata_cache.get(pid, snapshot)
 
 def get_cmdline(pid):
     """Get command line for process"""
+    return metadata_cache.read_cmdline(pid)
+
+def get_comm(pid):
+    """Get the short process name from /proc/<pid>/comm"""
     try:
-        with open(f"/proc/{pid}/cmdline", "rb") as f:
-            args = f.read().replace(b'\x00', b' ').decode().strip()
-            return args or "N/A"
+        with open(f"{PROC_ROOT}/{pid}/comm", "r") as f:
+            return f.read().strip()
     except:
-        return "N/A"
+        return None
+
+def handle_process_event(event):
+    """Feed kernel fork/exec/exit events into the burst tracker
+
+    Runs on the proc connector thread, so it only touches the deque and
+    the entry map and never writes logs itself.
+    """
+    if event.kind == "fork":
+        parent = snapshot_engine.latest.get(event.ppid) if snapshot_engine and snapshot_engine.latest else None
+        name = get_comm(event.pid) or (parent.comm if parent else "unknown")
+        try:
+            uid = os.stat(f"{PROC_ROOT}/{event.pid}").st_uid
+        except OSError:
+            uid = parent.uid if parent else None
+        entry = {
+            'pid': event.pid,
+            'name': name,
+            'ppid': event.ppid,
+            'user': get_username(uid) if uid is not None else "unknown",
+            'cmd': "N/A",
+            'time': event.timestamp
+        }
+        if forward_spawns:
+            describe_spawn(entry)
+        else:
+            record_spawn(entry)
+        if recorder is not None:
+            recorder.spawn(entry)
+        event_entries[event.pid] = entry
+        while len(event_entries) > MAX_EVENT_ENTRIES:
+            event_entries.popitem(last=False)
+    elif event.kind == "exec":
+        metadata_cache.invalidate(event.pid)
+        entry = event_entries.get(event.pid)
+        if entry is not None:
+            entry['name'] = get_comm(event.pid) or entry['name']
+            entry['cmd'] = get_cmdline(event.pid)
+    elif event.kind == "exit":
+        metadata_cache.evict(event.pid)
+        event_entries.pop(event.pid, None)
 
 def extract_script_name_improved(cmd):
-    """Extract script name from command line - improved version"""
-    if not cmd or cmd == "N/A":
-        return None
-    
-    parts = cmd.split()
-    if not parts:
-        return None
-    
-    # Common script extensions
-    script_extensions = [
-        '.py', '.sh', '.js', '.pl', '.rb', '.php', '.go', '.rs', '.java', '.cpp', '.c', '.cc', '.cxx',
-        '.h', '.hpp', '.hxx', '.swift', '.kt', '.scala', '.lua', '.r', '.R', '.m', '.mm', '.sql',
-        '.html', '.css', '.xml', '.json', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
-        '.bat', '.cmd', '.ps1', '.vbs', '.awk', '.sed', '.perl', '.tcl', '.ex', '.exs', '.clj',
-        '.dart', '.tsx', '.jsx', '.vue', '.svelte', '.ts', '.coffee', '.elm', '.hs', '.ml',
-        '.f90', '.f95', '.for', '.pas', '.ada', '.vhd', '.v', '.sv', '.asm', '.s'
-    ]
-    
-    # Skip interpreters and look for actual script files
-    interpreters = {'python', 'python3', 'node', 'bash', 'sh', 'perl', 'ruby', 'java', 'php', 'go'}
-    
-    # First pass: Look for files with script extensions
-    for i, part in enumerate(parts):
-        # Skip flags/options
-        if part.startswith('-'):
-            continue
-            
-        # Check if this part has a script extension
-        if any(part.lower().endswith(ext) for ext in script_extensions):
-            # Extract just the filename
-            filename = part.split('/')[-1]
-            if filename:
-                return filename
-    
-    # Second pass: Look for non-system paths that might be scripts
-    for i, part in enumerate(parts):
-        if part.startswith('-'):
-            continue
-            
-        # Skip the interpreter itself
-        base_part = part.split('/')[-1]
-        if base_part.lower() in interpreters:
-            continue
-            
-        # Skip system directories
-        if part.startswith(('/usr/bin/', '/bin/', '/sbin/', '/usr/sbin/', '/usr/lib/')):
-            continue
-            
-        # If it's a path, extract the filename
-        if '/' in part:
-            filename = part.split('/')[-1]
-            # Make sure it's not an interpreter
-            if filename and filename.lower() not in interpreters and not filename.startswith('-'):
-                return filename
-        # If it's just a filename/command and not an interpreter
-        elif part and part.lower() not in interpreters and not part.startswith('-'):
-            return part
-    
-    # Third pass: Look for anything that looks like a script after interpreters
-    for i, part in enumerate(parts):
-        if i == 0:  # Skip the first part (usually the interpreter)
-            continue
-            
-        if part.startswith('-'):
-            continue
-            
-        # This might be a script name
-        if part and not part.startswith('/usr/') and not part.startswith('/bin/'):
-            filename = part.split('/')[-1] if '/' in part else part
-            if filename and filename.lower() not in interpreters:
-                return filename
-    
-    return None
+    """Extract script name from command line (memoized per cmdline)"""
+    return classify_cmdline(cmd).script
+
 def get_better_process_name(pid, process_name, cmd):
     """Get the best display name for a process with context"""
-    if not cmd or cmd == "N/A":
-        return process_name.strip("()") if process_name else "unknown"
-    
-    # First try to extract script name from command
-    script_name = extract_script_name_improved(cmd)
-    if script_name:
-        return script_name
-    
-    # For system commands, show the command with context
-    parts = cmd.split()
-    if parts:
-        main_cmd = parts[0].split('/')[-1]  # Get command name without path
-        
-        # If it's a simple system command, show it with some context
-        if main_cmd in ['sleep', 'cat', 'echo', 'grep', 'awk', 'sed', 'curl', 'wget']:
-            if len(parts) > 1:
-                # Show command with first argument
-                return f"{main_cmd} {parts[1]}"
-            else:
-                return main_cmd
-        
-        # For other commands, try to find the most meaningful part
-        return main_cmd
-    
-    # Fall back to process name, but clean it up
-    if process_name:
-        clean_name = process_name.strip("()")
-        if clean_name:
-            return clean_name
-    
-    return "unknown"
+    return command_display_name(cmd, process_name)
+
 def get_parent_process_info(ppid):
     """Get information about the parent process"""
     try:
-        parent_name, parent_ppid, parent_uid = get_name_ppid_uid(ppid)
-        if parent_name:
-            parent_cmd = get_cmdline(ppid)
-            parent_user = get_username(parent_uid) if parent_uid is not None else "unknown"
+        parent = get_process_metadata(ppid)
+        if parent and parent.comm:
             return {
-                'name': parent_name,
-                'cmd': parent_cmd,
-                'user': parent_user,
-                'ppid': parent_ppid
+                'name': parent.comm,
+                'cmd': parent.cmdline,
+                'user': parent.user,
+                'ppid': parent.ppid
             }
     except:
         pass
@@ -311,50 +370,10 @@ def get_parent_process_info(ppid):
 
 def get_memory_usage_mb(pid):
     """Get memory usage in MB"""
-    try:
-        with open(f"/proc/{pid}/status", "r") as f:
-            for line in f:
-                if line.startswith("VmRSS:"):
-                    kb = int(line.split()[1])
-                    return kb / 1024  # Convert to MB
-        return None
-    except:
-        return None
-
-def get_cpu_usage_simple(pid):
-    """Very simple CPU usage detection"""
-    try:
-        # Read current CPU times
-        with open(f"/proc/{pid}/stat", "r") as f:
-            fields = f.read().split()
-            utime1 = int(fields[13])
-            stime1 = int(fields[14])
-        
-        # Short delay
-        time.sleep(0.5)  # 500ms delay
-        
-        # Read again
-        with open(f"/proc/{pid}/stat", "r") as f:
-            fields = f.read().split()
-            utime2 = int(fields[13])
-            stime2 = int(fields[14])
-        
-        # Calculate difference
-        time_diff = (utime2 - utime1) + (stime2 - stime1)
-        
-        # Convert to percentage (rough approximation)
-        # If the process used significant CPU in 0.5 seconds, it's high CPU
-        if time_diff > 40:  # Threshold for high CPU
-            return 90.0  # Return high value to trigger alert
-        elif time_diff > 20:
-            return 85.0
-        elif time_diff > 5:
-            return 70.0
-        else:
-            return max(time_diff * 2, 0)  # Scale smaller values
-            
-    except:
+    status = thread_reader().status(pid, (VMRSS_KEY,))
+    if not status or status[0] is None:
         return None
+    return status[0] / 1024  # Convert to MB
 
 def trace_to_real_instigator(pid):
     """Trace back to find the real instigator process"""
@@ -372,16 +391,20 @@ def trace_to_real_instigator(pid):
     except:
         return None
     
-def log_process_with_parent_info(pid, name, user, cmd):
+def log_process_with_parent_info(pid, name, user, cmd, ppid=None):
     """Log process with parent information for better context"""
     try:
         # Get parent process info for this PID
-        current_name, current_ppid, current_uid = get_name_ppid_uid(pid)
+        if ppid is None:
+            current = get_process_metadata(pid)
+            ppid = current.ppid if current else None
+        current_ppid = ppid
         if current_ppid and current_ppid != 1:  # Don't show init as parent
-            parent_name, parent_ppid, parent_uid = get_name_ppid_uid(current_ppid)
-            if parent_name:
-                parent_cmd = get_cmdline(current_ppid)
-                parent_user = get_username(parent_uid) if parent_uid is not None else "unknown"
+            parent = get_process_metadata(current_ppid)
+            if parent and parent.comm:
+                parent_name = parent.comm
+                parent_cmd = parent.cmdline
+                parent_user = parent.user
                 
                 # Log with parent context
                 log_message(f"🌳 PROCESS TREE:")
@@ -405,7 +428,7 @@ def log_process_with_parent_info(pid, name, user, cmd):
         if DEBUG_MODE:
             log_message(f"    Error getting parent info: {e}")
 
-def print_process_tree(pid, name, user, cmd, indent=0):
+def print_process_tree(pid, name, user, cmd, indent=0, ppid=None):
     """Print process in tree format and log to file"""
     timestamp = get_ist_timestamp()
     indent_str = "    " * indent
@@ -420,205 +443,1012 @@ def print_process_tree(pid, name, user, cmd, indent=0):
     
     # Log process tree to file if enabled
     if LOG_PROCESS_TREE:
-        log_process_with_parent_info(pid, name, user, cmd)
+        log_process_with_parent_info(pid, name, user, cmd, ppid)
+
+def request_rules_reload(signum, frame):
+    """SIGHUP handler: only flags the reload, which runs on the main loop"""
+    rules_reload_requested.set()
+
+def reload_alert_rules():
+    """Recompile the rules file; a broken file leaves the previous rules active"""
+    ok, message = alert_rules.reload()
+    color = GREEN if ok else RED
+    print(f"{color}{'📐' if ok else '❌'} Alert rules: {message}{RESET}")
+    log_message(f"📐 Alert rules: {message}")
+
+def report_resolved(episode, label, peak, metrics):
+    """Log the close of an alert episode with its peak and duration"""
+    info = episode.info
+    duration = format_duration(episode.duration)
+    print(f"{CYAN}[{get_ist_datetime()}] {GREEN}✅ {label} resolved ({info['display_name']}) "
+          f"PID {episode.pid}: peak {peak} over {duration}{RESET}")
+    log_anomaly(
+        process_name=info['display_name'],
+        reason=f"{label} RESOLVED: peak {peak} over {duration}",
+        pid=episode.pid,
+        severity=episode.severity,
+        user=info['user'],
+        command=info['cmd'],
+        state=RESOLVED,
+        episode=episode.id,
+        duration=f"{int(episode.duration)}s",
+        **metrics
+    )
+
+def check_memory_usage(snapshot, since_seq=0):
+    """Check the processes read since snapshot since_seq against the memory severity levels
+
+    Rows are written when a process's episode opens, escalates or resolves;
+    sweeps where it merely stays over the threshold are silent.
+    """
+    for proc in snapshot.fresh(since_seq):
+        mem = proc.rss_kb / 1024  # Convert to MB
+
+        # Below every rule's lowest level nothing can alert
+        if mem < alert_rules.floor("memory_mb"):
+            continue
+
+        pid = proc.pid
+        try:
+            meta = metadata_cache.lookup(proc, snapshot)
+            cmd = meta.cmdline
+
+            # Excluded by a rule, including NetSnoop's own processes
+            decision = alert_rules.decide(proc, meta)
+            if decision.excluded:
+                continue
+
+            # Severity level from the thresholds that apply to this process
+            severity = severity_for(decision, "memory_mb", mem)
+            if not severity:
+                continue
+
+            user = meta.user
+
+            # Extract script name for better display
+            script_name = extract_script_name_improved(cmd)
+            display_name = script_name if script_name else (proc.comm or "unknown")
+
+            transition, episode = memory_alerts.observe(
+                pid, proc.starttime, severity, mem, now=snapshot.timestamp,
+                display_name=display_name, user=user, cmd=cmd
+            )
+            if transition is None:
+                continue  # Ongoing episode, already reported
+
+            # Get severity-specific formatting
+            color = SEVERITY_COLORS[severity]
+            emoji = "🧠" if severity == "HIGH" else "🔥" if severity == "CRITICAL" else "💀"
+            severity_name = f"{severity} MEMORY"
+            escalated = " ⬆️ escalated" if transition == ESCALATED else ""
+
+            timestamp = get_ist_datetime()
+
+            # Enhanced memory alert message
+            alert_msg = f"{CYAN}[{timestamp}] {color}{emoji} {severity_name}{escalated} Process ({display_name}) PID {pid}: {mem:.2f} MB → {cmd}{RESET}"
+
+            print(alert_msg)
+
+            # Add special handling for critical and extreme cases
+            if severity == "CRITICAL":
+                print(f"{RED}  ⚠️  CRITICAL: Process using {mem:.2f} MB memory - monitor closely{RESET}")
+            elif severity == "EXTREME":
+                print(f"{MAGENTA}  🚨 EXTREME: Process using {mem:.2f} MB memory - potential memory leak!{RESET}")
+
+            # Log to anomaly system
+            log_anomaly(
+                process_name=display_name,
+                reason=f"{severity_name}: {mem:.2f} MB memory usage",
+                pid=pid,
+                severity=severity,
+                user=user,
+                command=cmd,
+                state=transition,
+                episode=episode.id,
+                memory_usage_mb=mem
+            )
+
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"{RED}❌ Memory monitoring error for PID {pid}: {e}{RESET}")
+
+    for episode in memory_alerts.resolve(snapshot, snapshot.timestamp):
+        report_resolved(episode, f"{episode.severity} MEMORY", f"{episode.peak:.2f} MB",
+                        {"memory_usage_mb": episode.peak})
 
 def monitor_memory_usage_of_processes():
     """Monitor memory usage of all processes with severity levels"""
-    global memory_alert_counts
-    
+    last_seq = 0
+    last_family_check = 0
+
     while True:
         try:
-            for pid in os.listdir("/proc"):
-                if not pid.isdigit():
-                    continue
-                if int(pid) == os.getpid():  # Skip your own monitoring script
-                    continue
-
-                mem = get_memory_usage_mb(pid)
-
-                # Check different severity levels for memory
-                severity = None
-                if mem and mem >= MEMORY_EXTREME_THRESHOLD:
-                    severity = "EXTREME"
-                elif mem and mem >= MEMORY_CRITICAL_THRESHOLD:
-                    severity = "CRITICAL"
-                elif mem and mem >= MEMORY_HIGH_THRESHOLD:
-                    severity = "HIGH"
-
-                if severity:
-                    try:
-                        with open(f"/proc/{pid}/cmdline", "r") as f:
-                            cmd = f.read().replace('\x00', ' ').strip()
-
-                        # Skip monitoring system processes
-                        monitoring_keywords = [
-                            "acm_monitor.py", "acm.py", "streamlit", "dashboard.py",
-                            "monitor_env/bin/streamlit", "monitor_env/bin/python",
-                            "/streamlit", "streamlit run"
-                        ]
-                        
-                        if any(keyword in cmd for keyword in monitoring_keywords):
-                            continue
-
-                        name, ppid, uid = get_name_ppid_uid(pid)
-                        user = get_username(uid) if uid is not None else "unknown"
-
-                        # Extract script name for better display
-                        script_name = extract_script_name_improved(cmd)
-                        display_name = script_name if script_name else (name or "unknown")
-
-                        memory_alert_counts[pid] += 1
-                        count = memory_alert_counts[pid]
-                        
-                        # Get severity-specific formatting
-                        color = SEVERITY_COLORS[severity]
-                        emoji = "🧠" if severity == "HIGH" else "🔥" if severity == "CRITICAL" else "💀"
-                        severity_name = f"{severity} MEMORY"
-                        
-                        timestamp = get_ist_datetime()
-                        
-                        # Enhanced memory alert message
-                        alert_msg = f"{CYAN}[{timestamp}] {color}{emoji} {severity_name} Process ({display_name}) PID {pid} x{count}: {mem:.2f} MB → {cmd}{RESET}"
-                        
-                        print(alert_msg)
-                        
-                        # Add special handling for critical and extreme cases
-                        if severity == "CRITICAL":
-                            print(f"{RED}  ⚠️  CRITICAL: Process using {mem:.2f} MB memory - monitor closely{RESET}")
-                        elif severity == "EXTREME":
-                            print(f"{MAGENTA}  🚨 EXTREME: Process using {mem:.2f} MB memory - potential memory leak!{RESET}")
-                        
-                        # Log to anomaly system
-                        log_anomaly(
-                            process_name=display_name,
-                            reason=f"{severity_name}: {mem:.2f} MB memory usage",
-                            pid=pid,
-                            severity=severity,
-                            user=user,
-                            command=cmd
-                        )
-
-                    except (FileNotFoundError, PermissionError):
-                        continue
-                    except Exception as e:
-                        if DEBUG_MODE:
-                            print(f"{RED}❌ Memory monitoring error for PID {pid}: {e}{RESET}")
-
-            time.sleep(10)  # Check every 10 seconds
+            snapshot = snapshot_engine.wait_for(last_seq)
+            profiler.checkpoint()
+            with self_metrics.timed("memory_check"):
+                check_memory_usage(snapshot, last_seq)
+            last_seq = snapshot.seq
+            if snapshot.timestamp - last_family_check >= FAMILY_CHECK_INTERVAL:
+                with self_metrics.timed("family_check"):
+                    check_family_usage(snapshot, "memory")
+                last_family_check = snapshot.timestamp
+            if sampling_scheduler is None:
+                time.sleep(MEMORY_CHECK_INTERVAL)  # Fixed cadence; the scheduler otherwise paces each process
         except Exception as e:
             print(f"{RED}❌ Memory monitoring error: {e}{RESET}")
             log_message(f"❌ Memory monitoring error: {e}")
             time.sleep(5)
 
+def check_cpu_usage(snapshot, since_seq=0):
+    """Check the processes read since snapshot since_seq against the CPU severity levels (as episodes)"""
+
+    # Percentages come from the jiffy delta since the previous check
+    usage = cpu_sampler.sample(snapshot)
+    process_tree.set_cpu(usage)
+
+    for pid, cpu in usage.items():
+        if not snapshot.is_fresh(pid, since_seq):
+            continue  # Not re-read since the last check
+        proc = snapshot.get(pid)
+
+        # Below every rule's lowest level nothing can alert
+        if cpu < alert_rules.floor("cpu_percent"):
+            continue
+
+        try:
+            meta = metadata_cache.lookup(proc, snapshot)
+            cmd = meta.cmdline
+
+            # Excluded by a rule, including NetSnoop's own processes (self-exclusion)
+            decision = alert_rules.decide(proc, meta)
+            if decision.excluded:
+                continue
+
+            # Severity level from the thresholds that apply to this process
+            severity = severity_for(decision, "cpu_percent", cpu)
+            if not severity:
+                continue
+
+            user = meta.user
+
+            # Extract script name for better display
+            script_name = extract_script_name_improved(cmd)
+            display_name = script_name if script_name else (proc.comm or "unknown")
+
+            transition, episode = cpu_alerts.observe(
+                pid, proc.starttime, severity, cpu, now=snapshot.timestamp,
+                display_name=display_name, user=user, cmd=cmd
+            )
+            if transition is None:
+                continue  # Ongoing episode, already reported
+
+            # Get severity-specific formatting
+            color = SEVERITY_COLORS[severity]
+            emoji = SEVERITY_EMOJIS[severity]
+            severity_name = SEVERITY_NAMES[severity]
+            escalated = " ⬆️ escalated" if transition == ESCALATED else ""
+
+            timestamp = get_ist_datetime()
+
+            # Enhanced alert message with severity
+            alert_msg = f"{CYAN}[{timestamp}] {color}{emoji} {severity_name}{escalated} Process ({display_name}) PID {pid}: {cpu:.1f}% → {cmd}{RESET}"
+
+            print(alert_msg)
+
+            # Add special handling for critical and extreme cases
+            if severity == "CRITICAL":
+                print(f"{RED}  ⚠️  CRITICAL: Process consuming {cpu:.1f}% CPU - consider investigation{RESET}")
+            elif severity == "EXTREME":
+                print(f"{MAGENTA}  🚨 EXTREME: Process consuming {cpu:.1f}% CPU - immediate attention required!{RESET}")
+                print(f"{MAGENTA}  💀 This process may be causing system instability{RESET}")
+
+            # Log to anomaly system with appropriate severity
+            log_anomaly(
+                process_name=display_name,
+                reason=f"{severity_name}: {cpu:.1f}% CPU usage",
+                pid=pid,
+                severity=severity,
+                user=user,
+                command=cmd,
+                state=transition,
+                episode=episode.id,
+                cpu_usage=cpu
+            )
+
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"{RED}❌ CPU monitoring error for PID {pid}: {e}{RESET}")
+
+    for episode in cpu_alerts.resolve(snapshot, snapshot.timestamp):
+        report_resolved(episode, SEVERITY_NAMES[episode.severity], f"{episode.peak:.1f}%",
+                        {"cpu_usage": episode.peak})
+
+    return usage
+
 def monitor_cpu_usage_of_processes():
     """Monitor CPU usage of all processes with severity levels"""
-    global cpu_alert_counts
-    
+    last_seq = 0
+    last_family_check = 0
+
     while True:
         try:
-            for pid in os.listdir("/proc"):
-                if not pid.isdigit():
-                    continue
-                if int(pid) == os.getpid():  # Skip your own monitoring script
-                    continue
-
-                cpu = get_cpu_usage_simple(pid)
-
-                # Check different severity levels
-                severity = None
-                if cpu and cpu >= CPU_EXTREME_THRESHOLD:
-                    severity = "EXTREME"
-                elif cpu and cpu >= CPU_CRITICAL_THRESHOLD:
-                    severity = "CRITICAL"
-                elif cpu and cpu >= CPU_HIGH_THRESHOLD:
-                    severity = "HIGH"
-
-                if severity:
-                    try:
-                        with open(f"/proc/{pid}/cmdline", "r") as f:
-                            cmd = f.read().replace('\x00', ' ').strip()
-
-                        # Skip monitoring system processes (self-exclusion)
-                        monitoring_keywords = [
-                            "acm_monitor.py", "acm.py", "streamlit", "dashboard.py",
-                            "monitor_env/bin/streamlit", "monitor_env/bin/python",
-                            "/streamlit", "streamlit run"
-                        ]
-                        
-                        if any(keyword in cmd for keyword in monitoring_keywords):
-                            continue
-
-                        name, ppid, uid = get_name_ppid_uid(pid)
-                        user = get_username(uid) if uid is not None else "unknown"
-
-                        # Extract script name for better display
-                        script_name = extract_script_name_improved(cmd)
-                        display_name = script_name if script_name else (name or "unknown")
-
-                        cpu_alert_counts[pid] += 1
-                        count = cpu_alert_counts[pid]
-                        
-                        # Get severity-specific formatting
-                        color = SEVERITY_COLORS[severity]
-                        emoji = SEVERITY_EMOJIS[severity]
-                        severity_name = SEVERITY_NAMES[severity]
-                        
-                        timestamp = get_ist_datetime()
-                        
-                        # Enhanced alert message with severity
-                        alert_msg = f"{CYAN}[{timestamp}] {color}{emoji} {severity_name} Process ({display_name}) PID {pid} x{count}: {cpu:.1f}% → {cmd}{RESET}"
-                        
-                        print(alert_msg)
-                        
-                        # Add special handling for critical and extreme cases
-                        if severity == "CRITICAL":
-                            print(f"{RED}  ⚠️  CRITICAL: Process consuming {cpu:.1f}% CPU - consider investigation{RESET}")
-                        elif severity == "EXTREME":
-                            print(f"{MAGENTA}  🚨 EXTREME: Process consuming {cpu:.1f}% CPU - immediate attention required!{RESET}")
-                            print(f"{MAGENTA}  💀 This process may be causing system instability{RESET}")
-                        
-                        # Log to anomaly system with appropriate severity
-                        log_anomaly(
-                            process_name=display_name,
-                            reason=f"{severity_name}: {cpu:.1f}% CPU usage",
-                            pid=pid,
-                            severity=severity,
-                            user=user,
-                            command=cmd
-                        )
-
-                    except (FileNotFoundError, PermissionError):
-                        continue
-                    except Exception as e:
-                        if DEBUG_MODE:
-                            print(f"{RED}❌ CPU monitoring error for PID {pid}: {e}{RESET}")
-
-            time.sleep(5)  # Check every 5 seconds (faster than before)
-            
+            snapshot = snapshot_engine.wait_for(last_seq)
+            profiler.checkpoint()
+            with self_metrics.timed("cpu_check"):
+                usage = check_cpu_usage(snapshot, last_seq)
+            last_seq = snapshot.seq
+            if snapshot.timestamp - last_family_check >= FAMILY_CHECK_INTERVAL:
+                with self_metrics.timed("family_check"):
+                    check_family_usage(snapshot, "cpu", usage)
+                last_family_check = snapshot.timestamp
+            if sampling_scheduler is None:
+                time.sleep(CPU_CHECK_INTERVAL)  # Fixed cadence; the scheduler otherwise paces each process
+
         except Exception as e:
             print(f"{RED}❌ CPU monitoring error: {e}{RESET}")
             log_message(f"❌ CPU monitoring error: {e}")
             time.sleep(5)
 
+def compact_anomaly_archive():
+    """Periodically move day-old anomalies.csv segments into the Parquet archive"""
+    archive = anomaly_archive.AnomalyArchive(ARCHIVE_DIR)
+    while True:
+        try:
+            result = archive.compact(CSV_FILE)
+            if result["segments"]:
+                log_message(
+                    f"🗜️  Archived {result['rows']} anomalies from {result['segments']} segments "
+                    f"into {len(result['days'])} daily files"
+                )
+        except Exception as e:
+            print(f"{RED}❌ Archive compaction error: {e}{RESET}")
+            log_message(f"❌ Archive compaction error: {e}")
+        time.sleep(ARCHIVE_COMPACT_INTERVAL)
+
+def check_family_usage(snapshot, metric, usage=None):
+    """Alert on process families whose combined memory or CPU crosses the family thresholds
+
+    Uses the subtree rollups of the process tree, so a build with dozens of
+    compiler children or a browser split over many renderers is caught even
+    though no single PID is over the per-process limit.
+    """
+    if metric == "memory":
+        limit = alert_rules.family_threshold("family_memory_mb")
+        families = process_tree.heaviest_families(rss_kb=limit * 1024)
+    else:
+        limit = alert_rules.family_threshold("family_cpu_percent")
+        families = process_tree.heaviest_families(cpu_percent=limit)
+
+    tracker = family_alerts[metric]
+    for family in families:
+        root = snapshot.get(family.pid)
+        if root is None or family.processes < 2 or alert_rules.is_safe_parent(root.comm):
+            continue
+
+        # A root that is over the limit on its own is reported per-PID
+        own = root.rss_kb / 1024 if metric == "memory" else (usage or {}).get(root.pid, 0.0)
+        if own > limit:
+            continue
+
+        try:
+            meta = metadata_cache.lookup(root, snapshot)
+            if alert_rules.decide(root, meta).excluded:
+                continue
+            display_name = extract_script_name_improved(meta.cmdline) or root.comm
+
+            if metric == "memory":
+                severity_name = "HIGH MEMORY FAMILY"
+                value = family.rss_kb / 1024
+                amount = f"{value:.2f} MB memory"
+                metrics = {"memory_usage_mb": value}
+            else:
+                severity_name = "HIGH CPU FAMILY"
+                value = family.cpu_percent
+                amount = f"{value:.1f}% CPU"
+                metrics = {"cpu_usage": value}
+
+            transition, episode = tracker.observe(
+                root.pid, root.starttime, "HIGH", value, now=snapshot.timestamp,
+                display_name=display_name, user=meta.user, cmd=meta.cmdline
+            )
+            if transition is None:
+                continue  # Still over the family threshold, already reported
+
+            timestamp = get_ist_datetime()
+            print(f"{CYAN}[{timestamp}] {YELLOW}👪 {severity_name} ({display_name}) PID {root.pid}: "
+                  f"{family.processes} processes using {amount} → {meta.cmdline}{RESET}")
+
+            log_anomaly(
+                process_name=display_name,
+                reason=f"{severity_name}: {family.processes} processes using {amount}",
+                pid=root.pid,
+                severity="HIGH",
+                user=meta.user,
+                command=meta.cmdline,
+                state=transition,
+                episode=episode.id,
+                **metrics
+            )
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"{RED}❌ Family monitoring error for PID {root.pid}: {e}{RESET}")
+
+    for episode in tracker.resolve(snapshot, snapshot.timestamp):
+        if metric == "memory":
+            report_resolved(episode, "HIGH MEMORY FAMILY", f"{episode.peak:.2f} MB",
+                            {"memory_usage_mb": episode.peak})
+        else:
+            report_resolved(episode, "HIGH CPU FAMILY", f"{episode.peak:.1f}%",
+                            {"cpu_usage": episode.peak})
+
+def detect_new_processes(snapshot, seen_processes, record_recent=True):
+    """Record and log processes that appeared since the previous snapshot
+
+    When the proc connector is active it already feeds the spawn counters,
+    so the sweep only logs the process tree (record_recent=False).
+    """
+    for proc in snapshot:
+        pid = proc.pid
+        if (pid, proc.starttime) in seen_processes:
+            continue
+
+        try:
+            meta = metadata_cache.lookup(proc, snapshot)
+            user = meta.user
+            cmd = meta.cmdline
+
+            # Record new process
+            if record_recent:
+                record_spawn({
+                    'pid': pid,
+                    'name': proc.comm,
+                    'ppid': proc.ppid,
+                    'user': user,
+                    'cmd': cmd,
+                    'time': snapshot.timestamp
+                })
+
+            # Always log process tree to file, print only in debug mode
+            print_process_tree(pid, proc.comm, user, cmd, ppid=proc.ppid)
+
+            seen_processes.add((pid, proc.starttime))
+
+        except Exception as e:
+            if DEBUG_MODE:
+                print(f"{RED}❌ Error processing PID {pid}: {e}{RESET}")
+
+    # Remove dead processes (and replaced PIDs) from the seen set and evict
+    # their cached metadata
+    seen_processes.intersection_update((proc.pid, proc.starttime) for proc in snapshot)
+    metadata_cache.prune(snapshot)
+
+def record_spawn(entry):
+    """Add a newly spawned process to the burst counters
+
+    Counts are kept per parent PID and per parent script name, so a script
+    that fans out through several intermediate shells is still caught.
+    """
+    recent_processes.append(entry)
+    spawn_counter.add(entry['ppid'], entry['time'])
+    if 'script' not in entry:  # A replayed or forwarded entry already has it
+        describe_spawn(entry)
+    if entry['script']:
+        script_spawn_counter.add(entry['script'], entry['time'])
+
+def describe_spawn(entry):
+    """Add the parent's script name to a spawn entry while the parent can still be read"""
+    parent = get_process_metadata(entry['ppid'])
+    entry['script'] = extract_script_name_improved(parent.cmdline) if parent else None
+
+def find_burst_instigator(ppid, since):
+    """First recorded child of ppid spawned after since, if still sampled"""
+    # list() copies the deque atomically; the event thread may append concurrently
+    for process in list(recent_processes):
+        if process['ppid'] == ppid and process['time'] > since:
+            return process
+    return None
+
+def report_burst(burst_key, count, instigator, parent_info, now):
+    """Print and log one process burst anomaly"""
+    instigator_pid = instigator['pid']
+    name = instigator['name']
+    user = instigator['user']
+
+    # Get better process name for display; short-lived children
+    # may already be gone, so fall back to the recorded command
+    cmd = get_cmdline(instigator_pid) if instigator_pid else "N/A"
+    if cmd == "N/A":
+        cmd = instigator['cmd']
+    normalized_name = get_better_process_name(instigator_pid, name, cmd)
+
+    # Get parent info for context
+    parent_context = ""
+    if parent_info and parent_info['name'] != normalized_name:
+        parent_script = extract_script_name_improved(parent_info['cmd'])
+        if parent_script:
+            parent_context = f" (spawned by {parent_script})"
+        elif parent_info['name'] not in ['bash', 'sh', 'dash']:
+            parent_context = f" (spawned by {parent_info['name']})"
+
+    severity = "HIGH" if count > 15 else "MEDIUM"
+
+    # Create anomaly entry
+    anomaly_entry = {
+        'type': 'PROCESS_BURST',
+        'time': now,
+        'pid': instigator_pid,
+        'name': normalized_name,
+        'count': count,
+        'info': f"{normalized_name} (PID {instigator_pid}){parent_context}"
+    }
+
+    anomaly_buffer.append(anomaly_entry)
+
+    # Enhanced alert message
+    alert_msg = f"⚠️ PROCESS_BURST: {normalized_name} (PID {instigator_pid}){parent_context} - {count} processes spawned in {PROCESS_BURST_WINDOW}s"
+    print(f"{YELLOW}{alert_msg}{RESET}")
+
+    # Show command details in debug mode
+    if DEBUG_MODE:
+        print(f"[DEBUG] Child command: {cmd}")
+        if parent_info:
+            print(f"[DEBUG] Parent command: {parent_info['cmd']}")
+
+    # Log anomaly
+    log_anomaly(
+        process_name=normalized_name,
+        reason=f"Process burst: {count} processes spawned rapidly{parent_context}",
+        pid=instigator_pid,
+        severity=severity,
+        user=user,
+        command=cmd
+    )
+
+    # Update cooldown
+    burst_alert_history.set(burst_key, now, now)
+
+def check_process_bursts(snapshot):
+    """Alert on every parent (and parent script) spawning faster than the threshold"""
+    now = snapshot.timestamp
+    window_start = now - PROCESS_BURST_WINDOW
+    covered_scripts = set()
+
+    for ppid, count in spawn_counter.over(now):
+        if DEBUG_MODE:
+            print(f"{YELLOW}[DEBUG] Anomaly Check → PID: {ppid}, Count: {count}{RESET}")
+
+        parent = metadata_cache.get(ppid, snapshot)
+        parent_name = parent.comm if parent else "unknown"
+
+        # Check if it's a safe parent process
+        if alert_rules.is_safe_parent(parent_name):
+            if DEBUG_MODE:
+                print(f"{YELLOW}[DEBUG] Burst from safe parent '{parent_name}' ignored.{RESET}")
+            continue
+
+        parent_info = get_parent_process_info(ppid)
+        parent_script = extract_script_name_improved(parent_info['cmd']) if parent_info else None
+        if parent_script:
+            covered_scripts.add(parent_script)
+
+        # Check cooldown to avoid spam; keyed by identity so a reused PID starts fresh
+        burst_key = (ppid, parent.starttime if parent else None)
+        if burst_alert_history.get(burst_key, now=now) is not None:
+            if DEBUG_MODE:
+                print(f"{YELLOW}[DEBUG] Burst alert for {burst_key} in cooldown{RESET}")
+            continue
+
+        # Find the instigator (the first child spawned in the window); with
+        # very large bursts it may have rotated out of the sample, so fall
+        # back to the parent itself
+        instigator = find_burst_instigator(ppid, window_start)
+        if instigator is None:
+            instigator = {
+                'pid': ppid,
+                'name': parent_name,
+                'user': parent.user if parent else "unknown",
+                'cmd': parent.cmdline if parent else "N/A"
+            }
+        report_burst(burst_key, count, instigator, parent_info, now)
+        if parent_script:
+            # The per-parent alert already names the script
+            burst_alert_history.set(("script", parent_script), now, now)
+
+    # Scripts fanning out through many short-lived parents
+    for script, count in script_spawn_counter.over(now):
+        if script in covered_scripts:
+            continue
+        burst_key = ("script", script)
+        if burst_alert_history.get(burst_key, now=now) is not None:
+            continue
+        instigator = {'pid': "", 'name': script, 'user': "unknown", 'cmd': script}
+        report_burst(burst_key, count, instigator, None, now)
+
+    spawn_counter.prune(now)
+    script_spawn_counter.prune(now)
+    burst_alert_history.expire(now)
+
+def print_grouped_anomalies():
+    """Print the burst anomalies buffered over the group window together, then clear them"""
+    if len(anomaly_buffer) > 1:
+        print(f"\n{MAGENTA}⚠️  Multiple Anomalies Detected (Grouped):{RESET}")
+        for anomaly in anomaly_buffer:
+            time_str = time.strftime("%H:%M:%S", time.localtime(anomaly['time']))
+            print(f"• [{time_str}] PID {anomaly['pid']} → {anomaly['count']} spawns — {anomaly['info']}")
+    anomaly_buffer.clear()
+
+def state_table_stats():
+    """Size and eviction gauges of every per-process table the monitor keeps"""
+    tables = {burst_alert_history.name: burst_alert_history.stats(),
+              alert_rules.cache.name: alert_rules.cache.stats()}
+    for tracker in (memory_alerts, cpu_alerts, *family_alerts.values()):
+        tables[tracker.episodes.name] = tracker.episodes.stats()
+    for name, counter in (("spawn_counter", spawn_counter), ("script_spawn_counter", script_spawn_counter)):
+        tables[name] = {"size": len(counter), "capacity": counter.max_keys,
+                        "lru_evictions": counter.evictions, "ttl_evictions": 0}
+    tables["event_entries"] = {"size": len(event_entries), "capacity": MAX_EVENT_ENTRIES,
+                               "lru_evictions": 0, "ttl_evictions": 0}
+    classifier = classifier_cache_stats()
+    tables["cmdline_classifier"] = {"size": classifier["size"], "capacity": classifier["capacity"],
+                                    "lru_evictions": 0, "ttl_evictions": 0}
+    if sampling_scheduler is not None:
+        tables["sampling_scheduler"] = {"size": sampling_scheduler.stats()["tracked"], "capacity": None,
+                                        "lru_evictions": 0, "ttl_evictions": 0}
+    tables["metadata_cache"] = {"size": metadata_cache.stats()["entries"], "capacity": None,
+                                "lru_evictions": 0, "ttl_evictions": 0}
+    return tables
+
+def log_state_table_stats():
+    """Write the state table gauges to the persistent log"""
+    log_message("📏 State tables: " + ", ".join(
+        f"{name} {t['size']}/{t['capacity'] or '-'} ({t['lru_evictions']} lru, {t['ttl_evictions']} ttl evicted)"
+        for name, t in state_table_stats().items()
+    ))
+    if sampling_scheduler is not None:
+        stats = sampling_scheduler.stats()
+        log_message(
+            f"⏱️  Sampling: {stats['reads_per_sweep']:.1f} reads / {stats['reused_per_sweep']:.1f} reused per sweep, "
+            f"{stats['hot']} hot, mean interval {stats['mean_interval']:.1f}s, "
+            f"monitor CPU {stats['overhead_percent']:.2f}% (budget {stats['budget_percent']}%), "
+            f"stretch x{stats['stretch']:.2f}"
+        )
+
+def log_self_report():
+    """Write the monitor's own stage latencies and I/O since the last report to the log"""
+    opens, bytes_read = io_totals()
+    self_metrics.set_total("file_opens", opens)
+    self_metrics.set_total("bytes_read", bytes_read)
+    self_metrics.set_total("rows_written", log_writer.written)
+    if sampling_scheduler is not None:
+        self_metrics.set_total("pids_read", sampling_scheduler.reads)
+    log_message("🩺 Self-report " + format_report(self_metrics.collect()))
+
+def request_profile(signum, frame):
+    """SIGUSR1 handler: only flags the request, the main loop starts the session"""
+    profiler.request()
+
+def poll_profiler():
+    """Start a requested profiling session, or dump a finished one"""
+    result = profiler.poll()
+    if result is None:
+        return
+    state, paths = result
+    if state == "started":
+        message = f"🔬 Profiling for {PROFILE_SECONDS}s (cProfile + tracemalloc)"
+    else:
+        message = f"🔬 Profile written: {', '.join(paths)}"
+    print(f"{CYAN}{message}{RESET}")
+    log_message(message)
+
+def describe_for_recording(proc):
+    """(cmdline, user) of a snapshot row, for the recorder"""
+    meta = metadata_cache.lookup(proc, snapshot_engine.latest)
+    return meta.cmdline, meta.user
+
+def reset_detector_state(metadata=None, num_cpus=None):
+    """Fresh detector state built from the current constants (e.g. for a replay)"""
+    global alert_rules, metadata_cache, process_tree, family_alerts, event_entries, recent_processes
+    global spawn_counter, script_spawn_counter, memory_alerts, cpu_alerts, anomaly_buffer, anomaly_counts
+    global burst_alert_history, cpu_sampler
+    alert_rules = AlertRules(RULES_FILE, threshold_defaults(), SAFE_PARENT_NAMES, MONITORING_KEYWORDS,
+                             STATE_TABLE_CAPACITY)
+    metadata_cache = metadata or ProcessMetadataCache()
+    process_tree = ProcessTree()
+    family_alerts = {
+        "memory": AlertTracker("memory-family", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY),
+        "cpu": AlertTracker("cpu-family", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY),
+    }
+    event_entries = OrderedDict()
+    recent_processes = deque(maxlen=100)
+    spawn_counter = SlidingWindowCounter(PROCESS_BURST_WINDOW, PROCESS_BURST_THRESHOLD)
+    script_spawn_counter = SlidingWindowCounter(PROCESS_BURST_WINDOW, PROCESS_BURST_THRESHOLD)
+    memory_alerts = AlertTracker("memory", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY)
+    cpu_alerts = AlertTracker("cpu", ALERT_RESOLVE_AFTER, STATE_TABLE_CAPACITY)
+    anomaly_buffer = []
+    anomaly_counts = {"PROCESS_BURST": 0, "HIGH_MEMORY": 0, "HIGH_CPU": 0, "SUSPICIOUS_PROCESS": 0}
+    burst_alert_history = BoundedTable("burst_alert_history", STATE_TABLE_CAPACITY, ttl=BURST_COOLDOWN)
+    cpu_sampler = CpuSampler(num_cpus)
+
+class SweepDetector:
+    """The sweep loop's checks and the memory/CPU threads' checks, in order on one thread
+
+    For snapshots that arrive from elsewhere (a capture or the pipeline
+    collector): memory and CPU are checked every sweep with adaptive
+    sampling, else at their own cadence in snapshot time. The first
+    snapshot only seeds the tree, as at startup.
+    """
+
+    def __init__(self, events):
+        self.events = events  # Spawns come from kernel events, not from new PIDs in the sweep
+        self.seen_processes = set()
+        self.memory_seq = self.cpu_seq = 0
+        self.last_memory = self.last_cpu = float("-inf")
+        self.last_memory_family = self.last_cpu_family = float("-inf")
+        self.first = self.last = None
+
+    def feed(self, snapshot, spawns):
+        now = snapshot.timestamp
+        if self.first is None:
+            self.first = now
+            process_tree.update(snapshot)
+            detect_new_processes(snapshot, self.seen_processes, record_recent=False)
+            return
+        self.last = now
+
+        with self_metrics.timed("tree_update"):
+            process_tree.update(snapshot)
+        for entry in spawns:  # Kernel fork events seen since the previous sweep
+            record_spawn(entry)
+        with self_metrics.timed("new_processes"):
+            detect_new_processes(snapshot, self.seen_processes, record_recent=not self.events)
+        with self_metrics.timed("bursts"):
+            check_process_bursts(snapshot)
+
+        adaptive = snapshot.sampled is not None
+        if adaptive or now - self.last_memory >= MEMORY_CHECK_INTERVAL:
+            with self_metrics.timed("memory_check"):
+                check_memory_usage(snapshot, self.memory_seq)
+            self.memory_seq, self.last_memory = snapshot.seq, now
+            if now - self.last_memory_family >= FAMILY_CHECK_INTERVAL:
+                with self_metrics.timed("family_check"):
+                    check_family_usage(snapshot, "memory")
+                self.last_memory_family = now
+        if adaptive or now - self.last_cpu >= CPU_CHECK_INTERVAL:
+            with self_metrics.timed("cpu_check"):
+                usage = check_cpu_usage(snapshot, self.cpu_seq)
+            self.cpu_seq, self.last_cpu = snapshot.seq, now
+            if now - self.last_cpu_family >= FAMILY_CHECK_INTERVAL:
+                with self_metrics.timed("family_check"):
+                    check_family_usage(snapshot, "cpu", usage)
+                self.last_cpu_family = now
+
+def replay_recording(path, speed=0, csv_file=None, log_file=None):
+    """Feed a capture (see RECORD_FILE) through the detectors and log what would have fired
+
+    Runs the same checks as the sweep loop and the memory/CPU threads, in
+    order, with the recorded sweep times as the clock, so thresholds,
+    cooldowns and episode timing behave as they would have live. speed 0
+    replays as fast as possible; otherwise at that multiple of real time.
+    Anomalies go to <capture>.replay.csv unless csv_file is given.
+    """
+    global anomaly_logger, snapshot_engine, sampling_scheduler, clock, CSV_FILE, LOG_FILE
+
+    replayer = Replayer(path)
+    base = path[:-3] if path.endswith(".gz") else path
+    CSV_FILE = csv_file or f"{base}.replay.csv"
+    LOG_FILE = log_file or f"{base}.replay.log"
+    for stale in (CSV_FILE, LOG_FILE):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    reset_detector_state(ReplayMetadataCache(replayer), replayer.num_cpus)
+    snapshot_engine = replayer  # Provides .latest, like the SnapshotEngine
+    sampling_scheduler = None
+    clock = replayer.now
+    anomaly_logger = AnomalyLogger(CSV_FILE)
+    log_writer.start()
+    ok, message = alert_rules.reload()
+    print(f"{CYAN}📼 Replaying {path} (recorded on {replayer.header.get('host')}){RESET}")
+    print(f"{GREEN if ok else RED}📐 Alert rules: {message}{RESET}")
+    log_message(f"📼 REPLAY of {path}: {message}")
+
+    detector = SweepDetector(replayer.events)
+    started = time.perf_counter()
+    for snapshot, spawns in replayer:
+        if speed and detector.first is not None:
+            delay = (snapshot.timestamp - detector.first) / speed - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+        detector.feed(snapshot, spawns)
+        anomaly_buffer.clear()
+
+    elapsed = time.perf_counter() - started
+    recorded = (detector.last - detector.first) if detector.last is not None else 0.0
+    summary = {
+        "sweeps": replayer.sweeps, "recorded_seconds": recorded, "replay_seconds": elapsed,
+        "speedup": recorded / elapsed if elapsed else 0.0, "anomalies": dict(anomaly_counts),
+        "episodes": {tracker.rule: tracker.stats() for tracker in (memory_alerts, cpu_alerts, *family_alerts.values())},
+    }
+    counts = ", ".join(f"{kind} {count}" for kind, count in anomaly_counts.items())
+    message = (f"📼 Replayed {summary['sweeps']} sweeps ({format_duration(recorded)} recorded) in "
+               f"{elapsed:.2f}s, {summary['speedup']:.0f}x real time: {counts}")
+    print(f"{GREEN}{message}{RESET}")
+    print(f"{YELLOW}📁 Anomalies that would have fired: {CSV_FILE}{RESET}")
+    log_message(message)
+    log_writer.close()
+    clock = time.time
+    return summary
+
+def start_stage(name, output):
+    """Common setup of a pipeline stage process; returns its StageMeter"""
+    global log_writer, profiler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C goes to the supervisor, which stops the stages in order
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, request_rules_reload)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, request_profile)
+    profiler = Profiler(PROFILE_SECONDS, PROFILE_DIR, prefix=f"netsnoop_profile_{name}")
+    meter = StageMeter(name)
+    if output is not None:
+        log_writer = QueueWriter(output, meter)
+    return meter
+
+def run_collector(sweeps, output, stop):
+    """Pipeline stage: sweep /proc and send each sweep's changes to the detector
+
+    The first item is a header like a capture's; then one DeltaEncoder
+    record per sweep. Kernel spawn events ride along with the next sweep.
+    A full sweep queue blocks the collector, which then sweeps less often.
+    """
+    global snapshot_engine, sampling_scheduler, process_event_source, recorder, forward_spawns
+    meter = start_stage("collector", output)
+    alert_rules.reload()  # Thresholds steer the adaptive sampling
+    if ADAPTIVE_SAMPLING:
+        sampling_scheduler = SamplingScheduler(
+            lambda: (alert_rules.floor("memory_mb"), alert_rules.floor("cpu_percent")),
+            SAMPLE_MIN_INTERVAL, SAMPLE_MAX_INTERVAL, MONITOR_CPU_BUDGET_PERCENT
+        )
+    snapshot_engine = SnapshotEngine(scheduler=sampling_scheduler)
+    forward_spawns = True
+    if USE_PROC_CONNECTOR and PROC_ROOT == "/proc":
+        process_event_source = ProcConnectorSource.open(handle_process_event)
+    events = process_event_source is not None
+    recorder = Recorder(RECORD_FILE, cpu_sampler.num_cpus, events) if RECORD_FILE else DeltaEncoder()
+    if process_event_source:
+        process_event_source.start()
+    sweeps.put({"num_cpus": cpu_sampler.num_cpus, "events": events}, meter)
+
+    last_report = time.monotonic()
+    try:
+        while not stop.is_set():
+            if rules_reload_requested.is_set():
+                rules_reload_requested.clear()
+                alert_rules.reload()
+            poll_profiler()
+
+            with self_metrics.timed("sweep"):
+                snapshot = snapshot_engine.sweep()
+            self_metrics.count("pids_scanned", len(snapshot))
+            if sampling_scheduler is not None and sampling_scheduler.check_budget():
+                log_message(
+                    f"⏱️  Sampling intervals x{sampling_scheduler.stretch:.2f}: collector at "
+                    f"{sampling_scheduler.overhead_percent:.2f}% CPU (budget {MONITOR_CPU_BUDGET_PERCENT}%)"
+                )
+            with self_metrics.timed("encode"):
+                record = recorder.encode(snapshot, describe_for_recording)
+            metadata_cache.prune(snapshot)
+            if RECORD_FILE:
+                with self_metrics.timed("record"):
+                    recorder.write(record)
+            sweeps.put(record, meter)
+            meter.handled()
+
+            if time.monotonic() - last_report >= PIPELINE_REPORT_INTERVAL:
+                log_message("🧵 Pipeline " + format_stage_report(meter.report(), "sweeps"))
+                log_self_report()
+                last_report = time.monotonic()
+
+            started = time.perf_counter()
+            stop.wait(1)  # Main loop delay
+            meter.idle += time.perf_counter() - started
+    finally:
+        if process_event_source:
+            process_event_source.stop()
+        log_message("🧵 Pipeline " + format_stage_report(meter.report(), "sweeps"))
+        if RECORD_FILE:
+            stats = recorder.stats()
+            recorder.close()
+            log_message(f"🎥 Recorded {stats['sweeps']} sweeps, {stats['rows']} changed rows, "
+                        f"{stats['bytes'] / 1024:.1f} KB to {RECORD_FILE}")
+
+def run_detector(sweeps, output):
+    """Pipeline stage: rebuild each sweep from the collector's records and run every check"""
+    global snapshot_engine, sampling_scheduler
+    meter = start_stage("detector", output)
+    header = sweeps.get(meter)
+    if header == STOP:
+        return
+    decoder = DeltaDecoder(header["num_cpus"], header["events"])
+    reset_detector_state(ReplayMetadataCache(decoder), decoder.num_cpus)
+    snapshot_engine = decoder  # Provides .latest, like the SnapshotEngine
+    sampling_scheduler = None
+    reload_alert_rules()
+    detector = SweepDetector(decoder.events)
+
+    last_grouped_alert_time = last_state_report = last_report = time.monotonic()
+    while True:
+        record = sweeps.get(meter, timeout=1.0)
+        if record == STOP:
+            break
+        if rules_reload_requested.is_set():
+            rules_reload_requested.clear()
+            reload_alert_rules()
+        poll_profiler()
+        if record is not None:
+            try:
+                with self_metrics.timed("decode"):
+                    snapshot, spawns = decoder.apply(record)
+                detector.feed(snapshot, spawns)
+            except Exception as e:
+                print(f"{RED}❌ Detector error: {e}{RESET}")
+                log_message(f"❌ Detector error: {e}")
+            meter.handled()
+
+        now = time.monotonic()
+        if now - last_grouped_alert_time > ANOMALY_GROUP_WINDOW and anomaly_buffer:
+            print_grouped_anomalies()
+            last_grouped_alert_time = now
+        if now - last_state_report >= STATE_STATS_INTERVAL:
+            log_state_table_stats()
+            last_state_report = now
+        if now - last_report >= PIPELINE_REPORT_INTERVAL:
+            log_message("🧵 Pipeline " + format_stage_report(meter.report(), "sweeps"))
+            log_self_report()
+            last_report = now
+
+    log_message("🧵 Pipeline " + format_stage_report(meter.report(), "sweeps"))
+    log_state_table_stats()
+    for tracker in (memory_alerts, cpu_alerts, *family_alerts.values()):
+        episodes = tracker.stats()
+        log_message(
+            f"🔔 {tracker.rule} alerts: {episodes['opened']} opened, {episodes['escalated']} escalated, "
+            f"{episodes['resolved']} resolved, {episodes['open']} still open"
+        )
+
+def open_sink(name, path):
+    """A writer-process connection to a sink named by a QueueWriter"""
+    return {"AnomalyStore": AnomalyStore, "RollupStore": RollupStore}[name](path)
+
+def run_writer(output):
+    """Pipeline stage: the only process touching the log, CSV and database files
+
+    The BatchedWriter blocks instead of dropping when its own queue is
+    full, so a slow disk fills the output queue and slows the detector.
+    Rotated CSV segments are compacted into the Parquet archive here too.
+    """
+    meter = start_stage("writer", None)
+    log_writer.block_when_full = True
+    log_writer.start()
+    if anomaly_logger.store is None and anomaly_archive.available():
+        threading.Thread(target=compact_anomaly_archive, daemon=True).start()
+        log_message(f"🗜️  Anomaly archive compaction scheduled ({ARCHIVE_DIR})")
+    sinks = {}
+    last_report = time.monotonic()
+    try:
+        while True:
+            item = output.get(meter, timeout=1.0)
+            if item == STOP:
+                break
+            if item is not None:
+                deliver(log_writer, item, sinks, open_sink)
+                meter.handled()
+            if time.monotonic() - last_report >= PIPELINE_REPORT_INTERVAL:
+                log_message("🧵 Pipeline " + format_stage_report(meter.report(), "writes"))
+                last_report = time.monotonic()
+        log_message("🧵 Pipeline " + format_stage_report(meter.report(), "writes"))
+        writer_stats = log_writer.stats()
+        log_message(
+            f"📝 Log writer: {writer_stats['written']} records, {writer_stats['dropped']} dropped, "
+            f"max queue depth {writer_stats['max_queue_depth']}, {writer_stats['flushes']} flushes, "
+            f"{writer_stats['fsyncs']} fsyncs, {writer_stats['rotations']} rotations"
+        )
+    finally:
+        log_writer.close()
+
+def forward_signal(stages):
+    """Signal handler for the supervisor: pass SIGHUP/SIGUSR1 on to the collector and detector"""
+    def handler(signum, frame):
+        for name in ("collector", "detector"):
+            if stages[name].pid is not None:
+                os.kill(stages[name].pid, signum)
+    return handler
+
+def run_pipeline():
+    """Run the monitor as collector, detector and writer processes (PIPELINE_MODE)
+
+    The stages are forked, so they inherit the configuration of this
+    process. They are stopped in pipeline order on Ctrl+C (or when one of
+    them dies), so every sweep already collected is checked and every
+    anomaly found is written.
+    """
+    global anomaly_logger, log_writer
+    anomaly_logger = AnomalyLogger(
+        CSV_FILE, ANOMALY_DB_FILE if ANOMALY_BACKEND == "sqlite" else None, ANOMALY_ROLLUP_FILE
+    )
+    print(f"{CYAN}🖥️  Enhanced System Monitor - pipeline mode (collector → detector → writer){RESET}")
+    print(f"{YELLOW}📁 Anomalies file: {ANOMALY_DB_FILE if anomaly_logger.store else CSV_FILE}{RESET}")
+    print(f"{MAGENTA}📄 Log file: {LOG_FILE}{RESET}")
+    print("=" * 60)
+
+    context = multiprocessing.get_context("fork")
+    stop = context.Event()
+    sweeps = Channel(context, PIPELINE_SWEEP_QUEUE)
+    output = Channel(context, LOG_QUEUE_SIZE)
+    stages = {
+        "writer": context.Process(target=run_writer, args=(output,), name="netsnoop-writer"),
+        "detector": context.Process(target=run_detector, args=(sweeps, output), name="netsnoop-detector"),
+        "collector": context.Process(target=run_collector, args=(sweeps, output, stop), name="netsnoop-collector"),
+    }
+    for process in stages.values():
+        process.start()
+    meter = StageMeter("supervisor")
+    log_writer = QueueWriter(output, meter)
+    log_message("🚀 NEW SESSION STARTED (pipeline mode): " + get_ist_datetime())
+    for signum in ("SIGHUP", "SIGUSR1"):
+        if hasattr(signal, signum):
+            signal.signal(getattr(signal, signum), forward_signal(stages))
+    print(f"{GREEN}✅ Stages running: " + ", ".join(f"{name} (PID {p.pid})" for name, p in stages.items()) + RESET)
+    print(f"{CYAN}🚀 Monitoring started - Press Ctrl+C to stop{RESET}")
+
+    try:
+        while all(process.is_alive() for process in stages.values()):
+            time.sleep(0.5)
+        dead = [name for name, process in stages.items() if not process.is_alive()]
+        print(f"{RED}❌ Pipeline stage exited unexpectedly: {', '.join(dead)}{RESET}")
+    except KeyboardInterrupt:
+        print(f"\n{YELLOW}🛑 Monitoring stopped by user{RESET}")
+        log_message("🛑 Monitoring stopped by user")
+    finally:
+        # Upstream first: each stage drains its input before the STOP behind it
+        stop.set()
+        stages["collector"].join(10)
+        sweeps.put(STOP, meter, timeout=5)
+        stages["detector"].join(30)
+        output.put(STOP, meter, timeout=5)
+        stages["writer"].join(30)
+        for name, process in stages.items():
+            if process.is_alive():
+                print(f"{RED}❌ {name} did not stop, terminating it{RESET}")
+                process.terminate()
+
 def main():
     """Main monitoring loop"""
-    global anomaly_logger, recent_processes, anomaly_buffer
+    global anomaly_logger, snapshot_engine, process_event_source, sampling_scheduler, recorder
+    
+    if PIPELINE_MODE:
+        run_pipeline()
+        return
     
     print(f"{GREEN}✅ Anomaly logger initialized successfully{RESET}")
     
     # Initialize anomaly logger
-    anomaly_logger = AnomalyLogger(CSV_FILE)
+    anomaly_logger = AnomalyLogger(
+        CSV_FILE, ANOMALY_DB_FILE if ANOMALY_BACKEND == "sqlite" else None, ANOMALY_ROLLUP_FILE
+    )
     print(f"{GREEN}✅ Anomaly logger initialized successfully{RESET}")
     
     # Print startup information
     print(f"{CYAN}🖥️  Enhanced System Monitor with Dashboard Integration{RESET}")
     print(f"{BLUE}📊 Dashboard: streamlit run dashboard.py{RESET}")
-    print(f"{YELLOW}📁 Anomalies file: {CSV_FILE}{RESET}")
+    print(f"{YELLOW}📁 Anomalies file: {ANOMALY_DB_FILE if anomaly_logger.store else CSV_FILE}{RESET}")
     print(f"{MAGENTA}📄 Log file: {LOG_FILE}{RESET}")
     print("=" * 60)
     
-    # Test log file writability
+    # Test log file writability; writes themselves happen on the writer thread
     try:
+        with open(LOG_FILE, "a"):
+            pass
+        log_writer.start()
         log_message("🚀 NEW SESSION STARTED: " + get_ist_datetime())
         print(f"{GREEN}✅ Log file is writable: {LOG_FILE}{RESET}")
     except Exception as e:
@@ -628,6 +1458,29 @@ def main():
     log_message("🔗 Enhanced System Monitor — Universal Process & Anomaly Detection")
     log_message("📌 Language-agnostic process burst detection active")
     log_message("📊 Dashboard integration enabled")
+    if PROC_ROOT != "/proc":
+        log_message(f"🧪 Reading processes from {PROC_ROOT} (NETSNOOP_PROC_ROOT)")
+        print(f"{YELLOW}🧪 Reading processes from {PROC_ROOT} instead of /proc{RESET}")
+
+    # Compile the rules file before any check runs; SIGHUP recompiles it
+    reload_alert_rules()
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, request_rules_reload)
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, request_profile)
+    
+    # Per-process sampling intervals under the monitor's CPU budget
+    if ADAPTIVE_SAMPLING:
+        sampling_scheduler = SamplingScheduler(
+            lambda: (alert_rules.floor("memory_mb"), alert_rules.floor("cpu_percent")),
+            SAMPLE_MIN_INTERVAL, SAMPLE_MAX_INTERVAL, MONITOR_CPU_BUDGET_PERCENT
+        )
+        log_message(f"⏱️  Adaptive sampling: {SAMPLE_MIN_INTERVAL}-{SAMPLE_MAX_INTERVAL}s per process, "
+                    f"monitor CPU budget {MONITOR_CPU_BUDGET_PERCENT}% of one core")
+    
+    # Shared /proc sweep engine; the memory and CPU threads block until the
+    # main loop publishes its first snapshot
+    snapshot_engine = SnapshotEngine(scheduler=sampling_scheduler)
     
     # Start memory monitoring thread
     memory_thread = threading.Thread(target=monitor_memory_usage_of_processes, daemon=True)
@@ -639,174 +1492,117 @@ def main():
     cpu_thread.start()
     print(f"{GREEN}✅ CPU monitoring thread started{RESET}")
     
+    # Compact old CSV segments into the columnar archive when pyarrow is installed
+    if anomaly_logger.store is None and anomaly_archive.available():
+        threading.Thread(target=compact_anomaly_archive, daemon=True).start()
+        print(f"{GREEN}✅ Anomaly archive compaction scheduled ({ARCHIVE_DIR}){RESET}")
+    
+    # Prefer kernel process events for burst detection, fall back to polling
+    # Kernel events describe the real /proc, not a synthetic NETSNOOP_PROC_ROOT
+    if USE_PROC_CONNECTOR and PROC_ROOT == "/proc":
+        process_event_source = ProcConnectorSource.open(handle_process_event)
+    if process_event_source:
+        process_event_source.start()
+        print(f"{GREEN}✅ Process event stream active (netlink proc connector){RESET}")
+        log_message("📡 Burst detection fed by kernel process events")
+    else:
+        print(f"{YELLOW}⚠️  Process events unavailable - falling back to /proc polling{RESET}")
+        log_message("📡 Burst detection using /proc polling")
+    
+    # Capture sweeps (and kernel spawn events) for replay_recording()
+    if RECORD_FILE:
+        recorder = Recorder(RECORD_FILE, cpu_sampler.num_cpus, events=process_event_source is not None)
+        print(f"{GREEN}🎥 Recording process table deltas to {RECORD_FILE}{RESET}")
+        log_message(f"🎥 Recording process table deltas to {RECORD_FILE}")
+    
     print(f"{CYAN}🚀 Monitoring started - Press Ctrl+C to stop{RESET}")
     
-    # Initialize variables for main loop
+    # Initialize variables for main loop; processes already running at
+    # startup are logged but not counted as spawns
     last_grouped_alert_time = time.time()
+    last_state_report = time.time()
+    last_self_report = time.time()
     seen_processes = set()
+    snapshot = snapshot_engine.sweep()
+    detect_new_processes(snapshot, seen_processes, record_recent=False)
+    if recorder is not None:
+        recorder.record(snapshot, describe_for_recording)
     
     try:
         while True:
-            current_processes = set()
-            
-            # Scan all current processes
-            for pid in os.listdir("/proc"):
-                if not pid.isdigit():
-                    continue
-                
-                try:
-                    pid = int(pid)
-                    if pid == os.getpid():  # Skip self
-                        continue
-                    
-                    name, ppid, uid = get_name_ppid_uid(pid)
-                    if not name:
-                        continue
-                    
-                    current_processes.add(pid)
-                    
-                    # Check for new processes
-                    if pid not in seen_processes:
-                        user = get_username(uid) if uid is not None else "unknown"
-                        cmd = get_cmdline(pid)
-                        
-                        # Record new process
-                        recent_processes.append({
-                            'pid': pid,
-                            'name': name,
-                            'ppid': ppid,
-                            'user': user,
-                            'cmd': cmd,
-                            'time': time.time()
-                        })
-                        
-                        # Always log process tree to file, print only in debug mode
-                        print_process_tree(pid, name, user, cmd)
-                        
-                        seen_processes.add(pid)
-                
-                except (ValueError, FileNotFoundError, PermissionError):
-                    continue
-                except Exception as e:
-                    if DEBUG_MODE:
-                        print(f"{RED}❌ Error processing PID {pid}: {e}{RESET}")
-            
-            # Remove dead processes from seen set
-            seen_processes &= current_processes
-            
+            if rules_reload_requested.is_set():
+                rules_reload_requested.clear()
+                reload_alert_rules()
+
+            poll_profiler()
+
+            # One /proc sweep per tick, shared with the memory and CPU threads
+            with self_metrics.timed("sweep"):
+                snapshot = snapshot_engine.sweep()
+            self_metrics.count("pids_scanned", len(snapshot))
+            with self_metrics.timed("tree_update"):
+                process_tree.update(snapshot)
+
+            # Stretch (or relax) every sampling interval to keep within the CPU budget
+            if sampling_scheduler is not None and sampling_scheduler.check_budget():
+                log_message(
+                    f"⏱️  Sampling intervals x{sampling_scheduler.stretch:.2f}: monitor at "
+                    f"{sampling_scheduler.overhead_percent:.2f}% CPU (budget {MONITOR_CPU_BUDGET_PERCENT}%)"
+                )
+
+            with self_metrics.timed("new_processes"):
+                detect_new_processes(snapshot, seen_processes, record_recent=process_event_source is None)
+            if recorder is not None:
+                with self_metrics.timed("record"):
+                    recorder.record(snapshot, describe_for_recording)
+
             # Check for process bursts
-            now = time.time()
-            recent_time_window = now - PROCESS_BURST_WINDOW
-            
-            # Get recent processes within time window
-            recent = [p for p in recent_processes if p['time'] > recent_time_window]
-            
-            if len(recent) > PROCESS_BURST_THRESHOLD:
-                # Group by parent process
-                parent_groups = defaultdict(list)
-                for process in recent:
-                    parent_groups[process['ppid']].append(process)
-                
-                # Find the most prolific parent
-                most_common_parent = max(parent_groups.keys(), key=lambda x: len(parent_groups[x]))
-                most_common_count = len(parent_groups[most_common_parent])
-                
-                if DEBUG_MODE:
-                    print(f"{YELLOW}[DEBUG] Anomaly Check → PID: {most_common_parent}, Count: {most_common_count}{RESET}")
-                
-                # Get parent process info
-                try:
-                    parent_name, _, parent_uid = get_name_ppid_uid(most_common_parent)
-                    parent_user = get_username(parent_uid) if parent_uid is not None else "unknown"
-                    parent_cmd = get_cmdline(most_common_parent)
-                except:
-                    parent_name, parent_user, parent_cmd = "unknown", "unknown", "N/A"
-                
-                # Check if it's a safe parent process
-                if parent_name and parent_name in SAFE_PARENT_NAMES:
-                    if DEBUG_MODE:
-                        print(f"{YELLOW}[DEBUG] Burst from safe parent '{parent_name}' ignored.{RESET}")
-                else:
-                    # Check cooldown to avoid spam
-                    burst_key = f"{most_common_parent}_{parent_name}"
-                    last_alert_time = burst_alert_history.get(burst_key, 0)
-                    
-                    if now - last_alert_time > BURST_COOLDOWN:
-                        # Find the instigator (a child process that's likely causing the burst)
-                        children = parent_groups[most_common_parent]
-                        instigator = children[0]  # Take the first spawned process as instigator
-                        instigator_pid = instigator['pid']
-                        name = instigator['name']
-                        user = instigator['user']
-                        
-                        # Get better process name for display
-                        cmd = get_cmdline(instigator_pid)
-                        normalized_name = get_better_process_name(instigator_pid, name, cmd)
-                        
-                        # Get parent info for context
-                        parent_info = get_parent_process_info(most_common_parent)
-                        parent_context = ""
-                        if parent_info and parent_info['name'] != normalized_name:
-                            parent_script = extract_script_name_improved(parent_info['cmd'])
-                            if parent_script:
-                                parent_context = f" (spawned by {parent_script})"
-                            elif parent_info['name'] not in ['bash', 'sh', 'dash']:
-                                parent_context = f" (spawned by {parent_info['name']})"
-                        
-                        severity = "HIGH" if len(recent) > 15 else "MEDIUM"
-                        
-                        # Create anomaly entry
-                        anomaly_entry = {
-                            'type': 'PROCESS_BURST',
-                            'time': now,
-                            'pid': instigator_pid,
-                            'name': normalized_name,
-                            'count': len(recent),
-                            'info': f"{normalized_name} (PID {instigator_pid}){parent_context}"
-                        }
-                        
-                        anomaly_buffer.append(anomaly_entry)
-                        
-                        # Enhanced alert message
-                        alert_msg = f"⚠️ PROCESS_BURST: {normalized_name} (PID {instigator_pid}){parent_context} - {len(recent)} processes spawned in {PROCESS_BURST_WINDOW}s"
-                        print(f"{YELLOW}{alert_msg}{RESET}")
-                        
-                        # Show command details in debug mode
-                        if DEBUG_MODE:
-                            print(f"[DEBUG] Child command: {cmd}")
-                            if parent_info:
-                                print(f"[DEBUG] Parent command: {parent_info['cmd']}")
-                        
-                        # Log anomaly
-                        log_anomaly(
-                            process_name=normalized_name,
-                            reason=f"Process burst: {len(recent)} processes spawned rapidly{parent_context}",
-                            pid=instigator_pid,
-                            severity=severity,
-                            user=user,
-                            command=cmd
-                        )
-                        
-                        # Update cooldown
-                        burst_alert_history[burst_key] = now
-                    elif DEBUG_MODE:
-                        print(f"{YELLOW}[DEBUG] Burst alert for {burst_key} in cooldown{RESET}")
+            with self_metrics.timed("bursts"):
+                check_process_bursts(snapshot)
             # Flush grouped anomaly buffer
             if time.time() - last_grouped_alert_time > ANOMALY_GROUP_WINDOW and anomaly_buffer:
-                if len(anomaly_buffer) > 1:
-                    print(f"\n{MAGENTA}⚠️  Multiple Anomalies Detected (Grouped):{RESET}")
-                    for anomaly in anomaly_buffer:
-                        time_str = time.strftime("%H:%M:%S", time.localtime(anomaly['time']))
-                        print(f"• [{time_str}] PID {anomaly['pid']} → {anomaly['count']} spawns — {anomaly['info']}")
-                
-                anomaly_buffer.clear()
+                print_grouped_anomalies()
                 last_grouped_alert_time = time.time()
             
+            if time.time() - last_state_report >= STATE_STATS_INTERVAL:
+                log_state_table_stats()
+                last_state_report = time.time()
+            
+            if time.time() - last_self_report >= SELF_REPORT_INTERVAL:
+                log_self_report()
+                last_self_report = time.time()
+            
             time.sleep(1)  # Main loop delay
             
     except KeyboardInterrupt:
         print(f"\n{YELLOW}🛑 Monitoring stopped by user{RESET}")
         log_message("🛑 Monitoring stopped by user")
+        if process_event_source:
+            stats = process_event_source.stats()
+            process_event_source.stop()
+            log_message(
+                f"📡 Process events: {stats['events']} ({stats['events_per_second']:.1f}/s), "
+                f"latency avg {stats['avg_latency_ms']:.2f} ms / max {stats['max_latency_ms']:.2f} ms, "
+                f"overruns {stats['overruns']}"
+            )
+        writer_stats = log_writer.stats()
+        log_message(
+            f"📝 Log writer: {writer_stats['written']} records, {writer_stats['dropped']} dropped, "
+            f"max queue depth {writer_stats['max_queue_depth']}, {writer_stats['flushes']} flushes, "
+            f"{writer_stats['fsyncs']} fsyncs, {writer_stats['rotations']} rotations"
+        )
+        log_state_table_stats()
+        log_self_report()
+        if recorder is not None:
+            stats = recorder.stats()
+            log_message(f"🎥 Recorded {stats['sweeps']} sweeps, {stats['rows']} changed rows, "
+                        f"{stats['bytes'] / 1024:.1f} KB to {RECORD_FILE}")
+        for tracker in (memory_alerts, cpu_alerts, *family_alerts.values()):
+            episodes = tracker.stats()
+            log_message(
+                f"🔔 {tracker.rule} alerts: {episodes['opened']} opened, {episodes['escalated']} escalated, "
+                f"{episodes['resolved']} resolved, {episodes['open']} still open"
+            )
     except Exception as e:
         error_msg = f"❌ Monitoring error: {e}"
         print(f"{RED}{error_msg}{RESET}")
@@ -821,6 +1617,10 @@ def main():
             user="system",
             command=""
         )
+    finally:
+        if recorder is not None:
+            recorder.close()
+        log_writer.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
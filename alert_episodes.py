@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Alert episodes for NetSnoop's threshold checks
+A process over a threshold opens an episode keyed by (pid, starttime);
+later sweeps only update it, and anomaly rows are written when it opens,
+when its severity escalates and when it resolves (with peak and duration)
+"""
+
+import itertools
+import threading
+import time
+
+try:
+    from .anomaly_schema import SEVERITIES
+    from .state_tables import BoundedTable
+except ImportError:
+    from anomaly_schema import SEVERITIES
+    from state_tables import BoundedTable
+
+OPEN = "open"
+ESCALATED = "escalated"
+RESOLVED = "resolved"
+
+SEVERITY_RANK = {severity: rank for rank, severity in enumerate(SEVERITIES)}
+
+
+class Episode:
+    """One continuous period of a process being over a rule's thresholds"""
+
+    __slots__ = ("id", "rule", "pid", "starttime", "severity", "opened", "last_seen",
+                 "closed", "value", "peak", "info")
+
+    def __init__(self, episode_id, rule, pid, starttime, severity, value, now, info):
+        self.id = episode_id
+        self.rule = rule
+        self.pid = pid
+        self.starttime = starttime
+        self.severity = severity  # Highest severity reached
+        self.opened = now
+        self.last_seen = now
+        self.closed = None
+        self.value = value
+        self.peak = value
+        self.info = info
+
+    @property
+    def duration(self):
+        return self.last_seen - self.opened
+
+
+class AlertTracker:
+    """Open episodes of one rule, keyed by process identity
+
+    observe() returns OPEN for a new episode, ESCALATED when the severity
+    rises above the highest one seen so far, and None while it is merely
+    ongoing. resolve() closes episodes whose process exited, was replaced
+    (new starttime) or has stayed under the thresholds for resolve_after
+    seconds, so a value hovering around a threshold does not flap. The
+    table is bounded; if it is ever full the stalest episode is dropped
+    without a resolved row.
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self, rule, resolve_after=30.0, capacity=10000):
+        self.rule = rule
+        self.resolve_after = resolve_after
+        self.episodes = BoundedTable(f"{rule} episodes", capacity)  # (pid, starttime) -> Episode
+        self._lock = threading.Lock()
+        self.opened = 0
+        self.escalated = 0
+        self.resolved = 0
+
+    def observe(self, pid, starttime, severity, value, now=None, **info):
+        """Record that a process is over the thresholds; returns (transition, episode)"""
+        now = time.time() if now is None else now
+        key = (pid, starttime)
+        with self._lock:
+            episode = self.episodes.get(key)
+            if episode is None:
+                episode_id = f"{self.rule}-{pid}-{int(now)}-{next(self._ids)}"
+                episode = Episode(episode_id, self.rule, pid, starttime, severity, value, now, info)
+                self.episodes.set(key, episode, now)
+                self.opened += 1
+                return OPEN, episode
+            self.episodes.set(key, episode, now)
+            episode.last_seen = now
+            episode.value = value
+            episode.peak = max(episode.peak, value)
+            if SEVERITY_RANK.get(severity, 0) > SEVERITY_RANK.get(episode.severity, 0):
+                episode.severity = severity
+                self.escalated += 1
+                return ESCALATED, episode
+            return None, episode
+
+    def resolve(self, snapshot, now=None):
+        """Close and return episodes whose process is gone or has been quiet long enough
+
+        snapshot maps pid -> row with a starttime (a proc_snapshot.Snapshot).
+        """
+        now = time.time() if now is None else now
+        closed = []
+        with self._lock:
+            for key, episode in self.episodes.items():
+                proc = snapshot.get(episode.pid)
+                gone = proc is None or proc.starttime != episode.starttime
+                if gone or now - episode.last_seen >= self.resolve_after:
+                    self.episodes.pop(key)
+                    episode.closed = episode.last_seen  # Last sweep it was over the thresholds
+                    closed.append(episode)
+            self.resolved += len(closed)
+        return closed
+
+    def stats(self):
+        with self._lock:
+            return {"open": len(self.episodes), "opened": self.opened,
+                    "escalated": self.escalated, "resolved": self.resolved}
+
+
+def format_duration(seconds):
+    """Compact duration, e.g. 45s, 12m05s, 3h07m"""
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Declarative alert rules for NetSnoop
+Thresholds, exclusions and safe parents from a JSON rules file, compiled
+into one matcher: the cmdline, process-name and cgroup patterns of every
+rule are compiled once, user and exact-name conditions become dict
+lookups, and the decision is cached per process identity
+Usage: python3 alert_rules.py [rules.json] [pid ...]
+"""
+
+import json
+import os
+import re
+import sys
+import threading
+from collections import namedtuple
+
+try:
+    from .proc_snapshot import PROC_ROOT
+    from .state_tables import BoundedTable
+except ImportError:
+    from proc_snapshot import PROC_ROOT
+    from state_tables import BoundedTable
+
+LEVELS = ("HIGH", "CRITICAL", "EXTREME")
+METRICS = ("memory_mb", "cpu_percent")
+FAMILY_METRICS = ("family_memory_mb", "family_cpu_percent")
+TEXT_CONDITIONS = ("cmdline", "process_regex", "cgroup")
+SET_CONDITIONS = ("user", "process")
+
+# excluded: skip the process entirely; thresholds: metric -> ((level, value), ...)
+# highest level first; rules: names of the matching rules, in file order
+Decision = namedtuple("Decision", ["excluded", "thresholds", "rules"])
+
+
+def severity_for(decision, metric, value):
+    """Highest level whose threshold value reaches, or None"""
+    for level, threshold in decision.thresholds[metric]:
+        if value >= threshold:
+            return level
+    return None
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple, set)) else [value]
+
+
+def _compile(pattern, where):
+    """re.compile() with the offending pattern and its place in the rules file in the error"""
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError(f"bad pattern {pattern!r} in {where}: {e}") from None
+
+
+class _PatternSet:
+    """Which of many regexes match a string
+
+    Each pattern is compiled and searched on its own, so anything valid
+    for re on its own (global flags like (?i), backreferences) works; a
+    rule index is skipped once one of its patterns has matched.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = patterns  # [(rule index, compiled regex)]
+
+    def matches(self, text):
+        hits = set()
+        if not text:
+            return hits
+        for rule_index, regex in self.patterns:
+            if rule_index not in hits and regex.search(text):
+                hits.add(rule_index)
+        return hits
+
+
+class RuleSet:
+    """A compiled rules file (immutable; reload() builds a new one)"""
+
+    def __init__(self, config, defaults, safe_parents=(), self_exclude=()):
+        thresholds = config.get("thresholds", {})
+        self.defaults = {
+            metric: self._levels(thresholds.get(metric, {}), defaults[metric]) for metric in METRICS
+        }
+        self.family = {metric: thresholds.get(metric, defaults[metric]) for metric in FAMILY_METRICS}
+
+        self.safe_parents = set(safe_parents) | set(config.get("safe_parents", []))
+        self.safe_parent_patterns = [
+            _compile(pattern, "safe_parent_patterns") for pattern in _as_list(config.get("safe_parent_patterns"))
+        ]
+
+        # NetSnoop's own processes are always excluded, ahead of any file rule
+        rules = []
+        if self_exclude:
+            rules.append({"name": "netsnoop", "cmdline": [re.escape(k) for k in self_exclude], "exclude": True})
+        rules.extend(config.get("rules", []))
+
+        self.rules = []
+        by_value = {condition: {} for condition in SET_CONDITIONS}
+        texts = {condition: [] for condition in TEXT_CONDITIONS}
+        for index, rule in enumerate(rules):
+            name = rule.get("name", f"rule {index}")
+            conditions = [c for c in SET_CONDITIONS + TEXT_CONDITIONS if rule.get(c) is not None]
+            if not conditions:
+                raise ValueError(f"rule {name!r} has no match condition")
+            for condition in SET_CONDITIONS:
+                for value in _as_list(rule.get(condition)):
+                    by_value[condition].setdefault(value, set()).add(index)
+            for condition in TEXT_CONDITIONS:
+                for pattern in _as_list(rule.get(condition)):
+                    texts[condition].append((index, _compile(pattern, f"{condition} of rule {name!r}")))
+            overrides = rule.get("thresholds", {})
+            self.rules.append((
+                name, conditions, rule.get("exclude"),
+                {metric: overrides[metric] for metric in METRICS if metric in overrides},
+            ))
+        self.by_value = by_value
+        self.patterns = {condition: _PatternSet(texts[condition]) for condition in TEXT_CONDITIONS}
+        self.uses_cgroup = bool(texts["cgroup"])
+
+        # Lowest HIGH threshold anywhere: values below it cannot alert, so
+        # callers skip the rule lookup for them
+        self.floor = {
+            metric: min([self.defaults[metric][-1][1]] + [
+                self._levels(overrides[metric], dict(self.defaults[metric]))[-1][1]
+                for _, _, _, overrides in self.rules if metric in overrides
+            ])
+            for metric in METRICS
+        }
+
+    @staticmethod
+    def _levels(overrides, base):
+        """((level, threshold), ...) highest first
+
+        Levels left out of overrides keep their ratio to the nearest given
+        level in base, e.g. {"HIGH": 500} over 50/100/200 gives 500/1000/2000.
+        The result must not decrease from one level to the next.
+        """
+        given = {level.upper(): float(v) for level, v in overrides.items()}
+        unknown = set(given) - set(LEVELS)
+        if unknown:
+            raise ValueError(f"unknown threshold level(s): {', '.join(sorted(unknown))}")
+        values = {}
+        for position, level in enumerate(LEVELS):
+            if level in given or not given:
+                values[level] = given.get(level, float(base[level]))
+                continue
+            below = [other for other in LEVELS[:position] if other in given]
+            anchor = below[-1] if below else next(other for other in LEVELS[position:] if other in given)
+            scale = given[anchor] / float(base[anchor]) if base[anchor] else 1.0
+            values[level] = float(base[level]) * scale
+        for lower, higher in zip(LEVELS, LEVELS[1:]):
+            if values[higher] < values[lower]:
+                raise ValueError(f"threshold {higher} ({values[higher]:g}) is below {lower} ({values[lower]:g})")
+        return tuple((level, values[level]) for level in reversed(LEVELS))
+
+    def decide(self, comm, user, cmdline, cgroup=None):
+        hits = {condition: self.by_value[condition].get(value, set())
+                for condition, value in (("user", user), ("process", comm))}
+        for condition, text in (("cmdline", cmdline), ("process_regex", comm), ("cgroup", cgroup)):
+            hits[condition] = self.patterns[condition].matches(text)
+
+        excluded = None
+        thresholds = {}
+        names = []
+        for index, (name, conditions, exclude, overrides) in enumerate(self.rules):
+            if not all(index in hits[condition] for condition in conditions):
+                continue
+            names.append(name)
+            if excluded is None and exclude is not None:
+                excluded = bool(exclude)  # First rule that says decides
+            for metric, levels in overrides.items():
+                thresholds.setdefault(metric, levels)  # First rule that sets a metric wins
+        return Decision(
+            bool(excluded),
+            {metric: self._levels(thresholds[metric], dict(self.defaults[metric]))
+             if metric in thresholds else self.defaults[metric] for metric in METRICS},
+            tuple(names),
+        )
+
+    def is_safe_parent(self, name):
+        if name in self.safe_parents:
+            return True
+        return bool(name) and any(regex.search(name) for regex in self.safe_parent_patterns)
+
+
+def read_cgroup(pid, proc_root=PROC_ROOT):
+    """cgroup path of a process (the unified v2 hierarchy if present), or None"""
+    try:
+        with open(f"{proc_root}/{pid}/cgroup", "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+    for line in lines:
+        if line.startswith("0::"):
+            return line[3:]
+    return lines[0].split(":", 2)[-1] if lines else None
+
+
+class AlertRules:
+    """The active RuleSet plus a per-process decision cache
+
+    reload() compiles the rules file into a new RuleSet and swaps it in
+    only if it compiled, so a bad edit keeps the previous rules running.
+    Decisions are cached by (pid, starttime, comm) and dropped on reload.
+    """
+
+    def __init__(self, path, defaults, safe_parents=(), self_exclude=(),
+                 capacity=10000, proc_root=PROC_ROOT):
+        self.path = path
+        self.defaults = defaults
+        self.safe_parents = tuple(safe_parents)
+        self.self_exclude = tuple(self_exclude)
+        self.proc_root = proc_root
+        self.cache = BoundedTable("rule decisions", capacity)
+        self._lock = threading.Lock()
+        self.loaded_from = None
+        self.reloads = 0
+        self.rules = RuleSet({}, defaults, self.safe_parents, self.self_exclude)
+
+    def reload(self):
+        """(ok, message); built-in defaults are used while there is no rules file"""
+        try:
+            if self.path and os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    config = json.load(f)
+                source = self.path
+            else:
+                config, source = {}, None
+            rules = RuleSet(config, self.defaults, self.safe_parents, self.self_exclude)
+        except (OSError, ValueError, re.error) as e:
+            return False, f"rules file {self.path} not loaded, keeping previous rules: {e}"
+        with self._lock:
+            self.rules = rules
+            self.cache = BoundedTable("rule decisions", self.cache.capacity)
+            self.loaded_from = source
+            self.reloads += 1
+        if source is None:
+            return True, "no rules file, using built-in thresholds"
+        return True, f"loaded {len(rules.rules)} rules from {source}"
+
+    def decide(self, proc, meta):
+        """Decision for a snapshot row and its ProcessMetadata"""
+        rules, cache = self.rules, self.cache
+        key = (proc.pid, proc.starttime, proc.comm)
+        decision = cache.get(key)
+        if decision is None:
+            cgroup = read_cgroup(proc.pid, self.proc_root) if rules.uses_cgroup else None
+            decision = rules.decide(proc.comm, meta.user, meta.cmdline, cgroup)
+            cache.set(key, decision)
+        return decision
+
+    def is_safe_parent(self, name):
+        return self.rules.is_safe_parent(name)
+
+    def floor(self, metric):
+        return self.rules.floor[metric]
+
+    def family_threshold(self, metric):
+        return self.rules.family[metric]
+
+    def stats(self):
+        return dict(self.cache.stats(), rules=len(self.rules.rules), reloads=self.reloads)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else "netsnoop_rules.json"
+    defaults = {
+        "memory_mb": {"HIGH": 50, "CRITICAL": 100, "EXTREME": 200},
+        "cpu_percent": {"HIGH": 80, "CRITICAL": 95, "EXTREME": 98},
+        "family_memory_mb": 400, "family_cpu_percent": 150,
+    }
+    rules = AlertRules(path, defaults)
+    ok, message = rules.reload()
+    print(("✅ " if ok else "❌ ") + message)
+    if not ok:
+        sys.exit(1)
+    try:
+        from .proc_snapshot import read_process
+        from .process_cache import ProcessMetadataCache
+    except ImportError:
+        from proc_snapshot import read_process
+        from process_cache import ProcessMetadataCache
+    cache = ProcessMetadataCache()
+    for pid in sys.argv[2:]:
+        proc = read_process(int(pid))
+        if proc is None:
+            print(f"PID {pid}: not running")
+            continue
+        decision = rules.decide(proc, cache.lookup(proc))
+        print(f"PID {pid} ({proc.comm}): excluded={decision.excluded} rules={list(decision.rules)} "
+              f"memory={decision.thresholds['memory_mb']} cpu={decision.thresholds['cpu_percent']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Columnar cold archive for NetSnoop anomalies
+Compacts rotated anomalies.csv segments into one Parquet file per day
+(dictionary-encoded text columns, zstd) with a min/max-timestamp index, so
+"All Time" reads skip whole files and load only the columns they need
+Requires pyarrow (optional): pip install pyarrow
+Usage: python3 anomaly_archive.py [compact|stats] [csv_file] [archive_dir]
+"""
+
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Optional: the archive tier is disabled without it
+    pa = pc = pq = None
+
+try:
+    from .anomaly_schema import FIELDNAMES, FIELDS, IST, iter_records
+    from .log_segments import load_manifest, open_segment, remove_segments
+except ImportError:
+    from anomaly_schema import FIELDNAMES, FIELDS, IST, iter_records
+    from log_segments import load_manifest, open_segment, remove_segments
+
+ARCHIVE_DIR = "anomaly_archive"
+INDEX_FILE = "archive_index.json"
+ARCHIVE_AFTER = 24 * 3600  # Segments that ended longer ago than this are compacted
+
+# Every schema field is archived, so compacted segments lose nothing. Text
+# columns with few distinct values are dictionary-encoded (and load into
+# pandas as categoricals)
+DICTIONARY_COLUMNS = (
+    "anomaly_type", "severity", "process_name", "user", "command", "duration", "session_id",
+    "additional_info", "state",
+)
+COLUMNS = FIELDNAMES
+
+
+def available():
+    return pa is not None
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("the anomaly archive needs pyarrow (pip install pyarrow)")
+
+
+def _schema():
+    """Parquet schema for anomaly_schema.FIELDS (files from before a field was archived read it as null)"""
+    types = {float: pa.float64(), int: pa.int64(), str: pa.string()}
+    return pa.schema([
+        (name, pa.dictionary(pa.int32(), pa.string()) if name in DICTIONARY_COLUMNS else types[kind])
+        for name, kind in FIELDS
+    ])
+
+
+class AnomalyArchive:
+    """Daily Parquet files plus an index of their time ranges and severities
+
+    read() consults the index first, so files outside the time window or
+    without the requested severities are never opened, then passes the
+    same predicates to the Parquet reader to skip row groups, and reads
+    only the requested columns.
+    """
+
+    def __init__(self, archive_dir=ARCHIVE_DIR):
+        self.archive_dir = archive_dir
+
+    # Index
+
+    def _index_path(self):
+        return os.path.join(self.archive_dir, INDEX_FILE)
+
+    def load_index(self):
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            index = {}
+        index.setdefault("files", {})
+        index.setdefault("compacted", {})
+        return index
+
+    def _save_index(self, index):
+        tmp = self._index_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self._index_path())
+
+    def files(self, start=None, end=None, severities=None):
+        """Archive files that can hold rows matching the predicates, oldest first"""
+        wanted = set(severities) if severities else None
+        result = []
+        for name, info in sorted(self.load_index()["files"].items()):
+            if start is not None and info["max_ts"] < start:
+                continue
+            if end is not None and info["min_ts"] >= end:
+                continue
+            if wanted is not None and not wanted.intersection(info["severities"]):
+                continue
+            result.append(os.path.join(self.archive_dir, name))
+        return result
+
+    def compacted(self, csv_file="anomalies.csv"):
+        """Numbers of csv_file's segments already in the archive
+
+        They are published with the daily files in one index write and only
+        then removed from the manifest, so readers of both tiers skip them.
+        """
+        return set(self.load_index()["compacted"].get(os.path.basename(csv_file), ()))
+
+    # Writing
+
+    def _write_day(self, day, records, previous, tag):
+        """Write a day's rows (merged with its previous file, if any) to a new file
+
+        The new file only becomes visible when the index naming it is saved,
+        so a run that dies before then leaves the archive as it was.
+        """
+        name = f"anomalies-{day}.{tag}.parquet"
+        path = os.path.join(self.archive_dir, name)
+        columns = list(zip(*records))
+        table = pa.table(
+            {col: pa.array(values).cast(_schema().field(col).type) if col in DICTIONARY_COLUMNS
+             else pa.array(values, type=_schema().field(col).type)
+             for col, values in zip(COLUMNS, columns)},
+            schema=_schema()
+        )
+        if previous is not None:
+            # Late segment for a day that is already archived: merge
+            table = pa.concat_tables([pq.read_table(os.path.join(self.archive_dir, previous), schema=_schema()), table])
+        table = table.sort_by("ts")
+        pq.write_table(table, path + ".tmp", compression="zstd", row_group_size=64 * 1024,
+                       use_dictionary=True, write_statistics=True)
+        os.replace(path + ".tmp", path)
+        severities = pc.unique(table.column("severity").combine_chunks().dictionary_decode())
+        return name, {
+            "min_ts": table.column("ts")[0].as_py(),
+            "max_ts": table.column("ts")[-1].as_py(),
+            "rows": table.num_rows,
+            "severities": sorted(severities.to_pylist()),
+            "bytes": os.path.getsize(path),
+        }
+
+    def compact(self, csv_file="anomalies.csv", older_than=ARCHIVE_AFTER, now=None):
+        """Move rotated CSV segments that ended before now - older_than into daily files
+
+        Safe to re-run after a crash at any point: the daily files and the
+        numbers of the segments they hold are published in one index write,
+        and segments listed there are never read again.
+        """
+        _require_pyarrow()
+        now = time.time() if now is None else now
+        manifest = load_manifest(csv_file)["segments"]
+        done = self.compacted(csv_file)
+        leftover = [s["number"] for s in manifest if s["number"] in done]
+        if leftover:
+            # Archived by a run that stopped before removing them
+            remove_segments(csv_file, leftover)
+        segments = [
+            s for s in manifest
+            if s["number"] not in done
+            and s["end"] < now - older_than and s["file"].endswith(".gz")  # Compressed = complete
+        ]
+        if not segments:
+            return {"segments": 0, "rows": 0, "days": []}
+
+        by_day = defaultdict(list)
+        rows = 0
+        for segment in segments:
+            # Segments of any schema version, including pre-schema ones
+            with open_segment(csv_file, segment) as f:
+                for record in iter_records(f):
+                    by_day[datetime.fromtimestamp(record.ts, IST).strftime("%Y-%m-%d")].append(record)
+                    rows += 1
+
+        os.makedirs(self.archive_dir, exist_ok=True)
+        index = self.load_index()
+        numbers = [s["number"] for s in segments]
+        replaced = []
+        for day in sorted(by_day):
+            previous = next((n for n in index["files"] if n.startswith(f"anomalies-{day}.")), None)
+            name, info = self._write_day(day, by_day[day], previous, max(numbers))
+            if previous is not None:
+                del index["files"][previous]
+                replaced.append(previous)
+            index["files"][name] = info
+        # Segment numbers are never reused, so those no longer in the manifest can be forgotten
+        live = {s["number"] for s in manifest}
+        index["compacted"][os.path.basename(csv_file)] = sorted((done & live).union(numbers))
+        self._save_index(index)
+        for name in replaced:
+            try:
+                os.remove(os.path.join(self.archive_dir, name))
+            except OSError:
+                pass
+        remove_segments(csv_file, numbers)
+        return {"segments": len(segments), "rows": rows, "days": sorted(by_day)}
+
+    # Reading
+
+    def read(self, start=None, end=None, severities=None, columns=None):
+        """pyarrow Table of archived anomalies matching the predicates"""
+        _require_pyarrow()
+        filters = []
+        if start is not None:
+            filters.append(("ts", ">=", start))
+        if end is not None:
+            filters.append(("ts", "<", end))
+        if severities:
+            filters.append(("severity", "in", list(severities)))
+        columns = list(columns) if columns else list(COLUMNS)
+        tables = [
+            pq.read_table(path, columns=columns, filters=filters or None, schema=_schema())
+            for path in self.files(start, end, severities)
+        ]
+        if not tables:
+            return _schema().empty_table().select(columns)
+        return pa.concat_tables(tables)
+
+    def to_pandas(self, start=None, end=None, severities=None, columns=None):
+        """DataFrame with categorical text columns and an IST-naive timestamp column"""
+        import pandas as pd  # Needed by Table.to_pandas() anyway
+        df = self.read(start, end, severities, columns).to_pandas()
+        if "ts" in df.columns:
+            df["timestamp"] = pd.to_datetime(df["ts"], unit="s") + timedelta(hours=5, minutes=30)
+        return df
+
+    def counts(self, start=None, end=None):
+        """Totals by anomaly type and severity, reading just those columns
+
+        Resolved-episode rows are left out; their alert was counted when it opened.
+        """
+        stats = {"total_anomalies": 0, "by_type": {}, "by_severity": {}}
+        if pa is None:
+            return stats
+        table = self.read(start, end, columns=["anomaly_type", "severity", "state"])
+        table = table.filter(pc.not_equal(table.column("state").combine_chunks().dictionary_decode(), "resolved"))
+        for column, key in (("anomaly_type", "by_type"), ("severity", "by_severity")):
+            values = table.column(column)
+            if len(values):
+                for item in pc.value_counts(values.combine_chunks().dictionary_decode()).to_pylist():
+                    stats[key][item["values"] or "Unknown"] = item["counts"]
+        stats["total_anomalies"] = table.num_rows
+        return stats
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    csv_file = sys.argv[2] if len(sys.argv) > 2 else "anomalies.csv"
+    archive = AnomalyArchive(sys.argv[3] if len(sys.argv) > 3 else ARCHIVE_DIR)
+    if not available():
+        print("❌ pyarrow is not installed: pip install pyarrow")
+        sys.exit(1)
+    if command == "compact":
+        result = archive.compact(csv_file)
+        print(f"🗜️  Archived {result['rows']} anomalies from {result['segments']} segments "
+              f"into {len(result['days'])} daily files")
+    else:
+        index = archive.load_index()["files"]
+        rows = sum(info["rows"] for info in index.values())
+        size = sum(info["bytes"] for info in index.values())
+        print(f"📦 {len(index)} archive files, {rows} anomalies, {size / 1024:.1f} KB")
+        print(archive.counts())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Write-time anomaly rollups for the NetSnoop dashboard
+Minute and hour buckets of anomaly counts by severity, anomaly type and
+process name, kept in a small SQLite sidecar so charts cost O(buckets)
+instead of a pass over every raw anomaly
+"""
+
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+RESOLUTIONS = {"minute": 60, "hour": 3600}
+DIMENSIONS = ("severity", "type", "process")
+MINUTE_RETENTION = 2 * 24 * 3600  # Minute buckets older than this are pruned; hours are kept
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rollups (
+    resolution INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (resolution, dimension, bucket, value)
+) WITHOUT ROWID;
+"""
+
+_UPSERT = """
+INSERT INTO rollups (resolution, bucket, dimension, value, count) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (resolution, dimension, bucket, value) DO UPDATE SET count = count + excluded.count
+"""
+
+
+def anomaly_label(reason):
+    """Chart label for a reason, e.g. "HIGH CPU: 95.0% CPU usage" -> "HIGH CPU" """
+    return (reason or "").split(":", 1)[0].strip() or "Unknown"
+
+
+class RollupStore:
+    """Per-bucket anomaly counts in a WAL-mode SQLite sidecar
+
+    add_many() folds a batch into one upsert per (bucket, dimension, value),
+    so it also works as a BatchedWriter sink. Reads only touch the buckets
+    in the requested range.
+    """
+
+    def __init__(self, path, readonly=False, timeout=5.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._last_prune = 0
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                                         timeout=timeout, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def add_many(self, records):
+        """Count anomaly dicts (ts, severity, reason, process_name) into every bucket"""
+        now = time.time()
+        counts = Counter()
+        for record in records:
+            ts = record.get("ts") or now
+            values = (
+                ("severity", record.get("severity") or "Unknown"),
+                ("type", anomaly_label(record.get("reason"))),
+                ("process", record.get("process_name") or "Unknown"),
+            )
+            for step in RESOLUTIONS.values():
+                bucket = int(ts // step * step)
+                for dimension, value in values:
+                    counts[(step, bucket, dimension, str(value))] += 1
+
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, [key + (count,) for key, count in counts.items()])
+            if now - self._last_prune > RESOLUTIONS["hour"]:
+                self._conn.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                                   (RESOLUTIONS["minute"], now - MINUTE_RETENTION))
+                self._last_prune = now
+
+    write_batch = add_many  # BatchedWriter sink interface
+
+    def flush(self):
+        pass  # Every batch is committed on insert
+
+    def _resolution_for(self, start):
+        # Minute buckets give the window edge to the minute while they are retained
+        if start is not None and time.time() - start <= MINUTE_RETENTION:
+            return RESOLUTIONS["minute"]
+        return RESOLUTIONS["hour"]
+
+    def totals(self, dimension, start=None):
+        """{value: count} for a dimension since start (epoch seconds), largest first"""
+        step = self._resolution_for(start)
+        sql = "SELECT value, SUM(count) FROM rollups WHERE resolution = ? AND dimension = ?"
+        params = [step, dimension]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            params.append(int(start // step * step))
+        sql += " GROUP BY value ORDER BY SUM(count) DESC"
+        with self._lock:
+            return dict(self._conn.execute(sql, params).fetchall())
+
+    def series(self, dimension, start=None, resolution="hour"):
+        """[(bucket, value, count)] in time order"""
+        step = RESOLUTIONS[resolution]
+        sql = "SELECT bucket, value, count FROM rollups WHERE resolution = ? AND dimension = ?"
+        params = [step, dimension]
+        if start is not None:
+            sql += " AND bucket >= ?"
+            params.append(int(start // step * step))
+        sql += " ORDER BY bucket"
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Versioned anomaly record schema for NetSnoop
+One typed layout for every anomalies CSV writer and reader: epoch
+timestamps, integer pids, float metrics and enumerated severity/type. The
+header row identifies the version; files written before it (the monitor's
+7-column "reason" rows and the enhanced logger's 14-column "description"
+rows, often mixed in one file) are converted by the migrate command
+Usage: python3 anomaly_schema.py [check|migrate] anomalies.csv [output.csv]
+"""
+
+import csv
+import io
+import itertools
+import os
+import re
+import shutil
+import sys
+from collections import Counter, namedtuple
+from datetime import datetime, timedelta, timezone
+
+try:
+    from .log_segments import load_manifest, open_segment
+except ImportError:
+    from log_segments import load_manifest, open_segment
+
+SCHEMA_VERSION = 2
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Later versions may only append fields, so older readers keep working
+FIELDS = (
+    ("ts", float),
+    ("anomaly_type", str),
+    ("severity", str),
+    ("process_name", str),
+    ("pid", int),
+    ("parent_pid", int),
+    ("user", str),
+    ("command", str),
+    ("reason", str),
+    ("cpu_usage", float),
+    ("memory_usage_mb", float),
+    ("duration", str),
+    ("session_id", str),
+    ("additional_info", str),
+    # v2: alert episode rows (see alert_episodes); empty for one-off events
+    ("state", str),
+    ("episode", str),
+)
+FIELDNAMES = tuple(name for name, _ in FIELDS)
+HEADERS = {FIELDNAMES[:14]: 1, FIELDNAMES: 2}
+STATES = ("", "open", "escalated", "resolved")
+
+SEVERITIES = ("LOW", "MEDIUM", "HIGH", "CRITICAL", "EXTREME", "EMERGENCY")
+ANOMALY_TYPES = {
+    "PROCESS_BURST": "Process Burst",
+    "HIGH_CPU": "High CPU Usage",
+    "CRITICAL_CPU": "Critical CPU Usage",
+    "HIGH_MEMORY": "High Memory Usage",
+    "CRITICAL_MEMORY": "Critical Memory Usage",
+    "SUSPICIOUS_PROCESS": "Suspicious Process",
+    "USB_EVENT": "USB Device Event",
+    "SYSTEM_OVERLOAD": "System Overload",
+    "NETWORK_ANOMALY": "Network Anomaly",
+    "FILE_ACCESS": "Suspicious File Access",
+    "PRIVILEGE_ESCALATION": "Privilege Escalation",
+}
+_TYPE_BY_LABEL = {label.lower(): key for key, label in ANOMALY_TYPES.items()}
+
+# Metric in a monitor reason, e.g. "HIGH MEMORY: 69.53 MB memory usage", "HIGH CPU: 90.0% CPU usage"
+_REASON_METRICS = {
+    "memory_usage_mb": (("HIGH_MEMORY", "CRITICAL_MEMORY"), re.compile(r"(\d+(?:\.\d+)?)\s*MB\b")),
+    "cpu_usage": (("HIGH_CPU", "CRITICAL_CPU"), re.compile(r"(\d+(?:\.\d+)?)\s*%")),
+}
+
+# Legacy layouts, identified by row length (files mix them under one header)
+MONITOR_FIELDS = ("timestamp", "process_name", "pid", "reason", "severity", "user", "command")
+ENHANCED_FIELDS = (
+    "timestamp", "anomaly_type", "severity", "process_name", "pid", "user", "command",
+    "description", "cpu_usage", "memory_usage_mb", "duration", "parent_pid", "session_id",
+    "additional_info",
+)
+
+AnomalyRecord = namedtuple("AnomalyRecord", FIELDNAMES)
+AnomalyRecord.__new__.__defaults__ = (
+    "SUSPICIOUS_PROCESS", "MEDIUM", "", None, None, "", "", "", 0.0, 0.0, "", "", "", "", ""
+)
+
+
+def classify_anomaly(reason):
+    """Anomaly type for a free-text reason, using the monitor's counter buckets"""
+    reason = (reason or "").lower()
+    if "burst" in reason:
+        return "PROCESS_BURST"
+    if "memory" in reason:
+        return "HIGH_MEMORY"
+    if "cpu" in reason:
+        return "HIGH_CPU"
+    return "SUSPICIOUS_PROCESS"
+
+
+def parse_timestamp(value):
+    """Epoch seconds for "YYYY-mm-dd HH:MM:SS[ IST]" (IST wall clock), or None"""
+    try:
+        return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=IST).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def format_timestamp(ts):
+    """IST display string the log and dashboard use"""
+    return datetime.fromtimestamp(ts, IST).strftime("%Y-%m-%d %H:%M:%S IST")
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _float_or_zero(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def anomaly_type_for(value, reason=""):
+    """Enum key for a key, a display label or (failing both) the reason text"""
+    value = (value or "").strip()
+    if value.upper() in ANOMALY_TYPES:
+        return value.upper()
+    return _TYPE_BY_LABEL.get(value.lower()) or classify_anomaly(reason)
+
+
+def make_record(ts, anomaly_type, severity, process_name="", pid=None, reason="", timestamp=None, **fields):
+    """Validated AnomalyRecord; raises ValueError for values outside the enums"""
+    if anomaly_type not in ANOMALY_TYPES:
+        raise ValueError(f"unknown anomaly type: {anomaly_type!r}")
+    if severity not in SEVERITIES:
+        raise ValueError(f"unknown severity: {severity!r}")
+    if fields.get("state", "") not in STATES:
+        raise ValueError(f"unknown alert state: {fields['state']!r}")
+    return AnomalyRecord(
+        float(ts), anomaly_type, severity, process_name or "", _int_or_none(pid),
+        _int_or_none(fields.get("parent_pid")), fields.get("user") or "",
+        fields.get("command") or "", reason or "", _float_or_zero(fields.get("cpu_usage")),
+        _float_or_zero(fields.get("memory_usage_mb")), fields.get("duration") or "",
+        fields.get("session_id") or "", fields.get("additional_info") or "",
+        fields.get("state") or "", fields.get("episode") or "",
+    )
+
+
+def to_row(record):
+    """{field: text} for csv.DictWriter"""
+    row = record._asdict()
+    row["ts"] = f"{record.ts:.3f}"
+    for name in ("pid", "parent_pid"):
+        row[name] = "" if row[name] is None else row[name]
+    return row
+
+
+def from_row(values):
+    """AnomalyRecord from a schema CSV row (a list of strings) of this or an older version"""
+    if len(values) < len(FIELDNAMES):
+        values = list(values) + [""] * (len(FIELDNAMES) - len(values))
+    return AnomalyRecord(
+        float(values[0]), values[1], values[2], values[3], _int_or_none(values[4]),
+        _int_or_none(values[5]), values[6], values[7], values[8], _float_or_zero(values[9]),
+        _float_or_zero(values[10]), values[11], values[12], values[13], values[14], values[15],
+    )
+
+
+def from_legacy_row(values):
+    """AnomalyRecord from a pre-schema row, or None if it cannot be read"""
+    if len(values) == len(MONITOR_FIELDS):
+        row = dict(zip(MONITOR_FIELDS, values))
+        # Some monitor versions wrote pid and severity the other way round
+        if row["severity"].isdigit() and not row["pid"].isdigit():
+            row["severity"], row["pid"] = row["pid"], row["severity"]
+    elif len(values) == len(ENHANCED_FIELDS):
+        row = dict(zip(ENHANCED_FIELDS, values))
+        row["reason"] = row.pop("description")
+    else:
+        return None
+    ts = parse_timestamp(row["timestamp"])
+    if ts is None:
+        return None
+    severity = row.pop("severity").strip().upper()
+    anomaly_type = anomaly_type_for(row.pop("anomaly_type", ""), row["reason"])
+    # The monitor's 7-column rows only carry the metric in the reason text
+    for field, (types, pattern) in _REASON_METRICS.items():
+        if field not in row and anomaly_type in types:
+            match = pattern.search(row["reason"])
+            if match:
+                row[field] = match.group(1)
+    return make_record(
+        ts=ts, anomaly_type=anomaly_type,
+        severity=severity if severity in SEVERITIES else "MEDIUM", **row
+    )
+
+
+def header_version(header):
+    """Schema version for a header row, or None for a legacy file"""
+    header = tuple(header or ())
+    for fields, version in sorted(HEADERS.items(), key=lambda item: -item[1]):
+        if header[:len(fields)] == fields:
+            return version
+    return None
+
+
+def read_header(path):
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            return next(csv.reader(f), None)
+    except OSError:
+        return None
+
+
+def iter_records(f):
+    """AnomalyRecords from an open CSV text file of any version"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header_version(header) is not None:
+        for values in reader:
+            yield from_row(values)
+        return
+    # Legacy: every row is sniffed (the header may not describe it, and a
+    # chunk of appended rows has no header at all)
+    for values in reader if header is None else itertools.chain([header], reader):
+        if not values or values[0] in ("timestamp", "ts"):
+            continue
+        record = from_legacy_row(values)
+        if record is not None:
+            yield record
+
+
+def read_records(csv_file, include_segments=True, skip=()):
+    """AnomalyRecords from rotated segments (oldest first, except the numbers in skip), then the active file"""
+    if include_segments:
+        for segment in load_manifest(csv_file)["segments"]:
+            if segment["number"] in skip:
+                continue  # Already in the archive
+            try:
+                with open_segment(csv_file, segment) as f:
+                    yield from iter_records(f)
+            except OSError:
+                continue
+    try:
+        with open(csv_file, "r", encoding="utf-8", newline="") as f:
+            yield from iter_records(f)
+    except OSError:
+        pass
+
+
+# pandas
+
+def pandas_dtypes():
+    """read_csv dtypes: enums and repetitive text as categoricals, free text as str"""
+    import pandas as pd
+    return {
+        "ts": "float64",
+        "anomaly_type": pd.CategoricalDtype(list(ANOMALY_TYPES)),
+        "severity": pd.CategoricalDtype(list(SEVERITIES)),
+        "process_name": "category",
+        "pid": "Int64",
+        "parent_pid": "Int64",
+        "user": "category",
+        "command": "category",
+        "reason": "object",
+        "cpu_usage": "float64",
+        "memory_usage_mb": "float64",
+        "duration": "category",
+        "session_id": "category",
+        "additional_info": "category",
+        "state": pd.CategoricalDtype(list(STATES)),
+        "episode": "object",
+    }
+
+
+def to_frame(df):
+    """Add the IST-naive timestamp column the dashboard charts use"""
+    import pandas as pd
+    df["timestamp"] = pd.to_datetime(df["ts"], unit="s") + pd.Timedelta(hours=5, minutes=30)
+    return df
+
+
+def data_version(data):
+    """Schema version of CSV bytes that start with a header row, or None"""
+    return header_version(data.split(b"\n", 1)[0].decode("utf-8", errors="replace").strip().split(","))
+
+
+def fieldnames(version=SCHEMA_VERSION):
+    return next(fields for fields, v in HEADERS.items() if v == version)
+
+
+def read_frame(data, header=True, version=None):
+    """Typed DataFrame from schema CSV bytes (header=False and a version for appended rows)
+
+    No per-load sniffing: dtypes come from the schema, so the parse is a
+    single C-engine pass. Columns added by later versions are empty for
+    files written by older ones.
+    """
+    import pandas as pd
+    names = list(fieldnames(version or (data_version(data) if header else SCHEMA_VERSION)))
+    dtypes = pandas_dtypes()
+    df = pd.read_csv(
+        io.BytesIO(data), header=0 if header else None, names=names,
+        dtype={name: dtypes[name] for name in names}, keep_default_na=False,
+        na_values={"pid": [""], "parent_pid": [""]},
+    )
+    for name in FIELDNAMES[len(names):]:
+        df[name] = pd.Series("", index=df.index, dtype=dtypes[name])
+    return to_frame(df)
+
+
+def records_frame(records):
+    """Typed DataFrame from AnomalyRecords (e.g. a legacy file read row by row)"""
+    import pandas as pd
+    df = pd.DataFrame.from_records(list(records), columns=list(FIELDNAMES))
+    return to_frame(df.astype(pandas_dtypes()))
+
+
+def load_frame(path):
+    """Typed DataFrame for a CSV file of any version"""
+    header = read_header(path)
+    if header_version(header) is not None:
+        with open(path, "rb") as f:
+            return read_frame(f.read())
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        return records_frame(iter_records(f))
+
+
+# Migration
+
+def migrate_file(path, output=None, backup=True):
+    """Rewrite a legacy (or mixed) anomalies CSV in the current schema
+
+    In place unless output is given; the original is kept as <path>.legacy.
+    Returns counts of converted (pre-schema), upgraded (older schema
+    version), already current and unreadable rows.
+    """
+    stats = Counter()
+    target = output or path
+    tmp = target + ".tmp"
+    with open(path, "r", encoding="utf-8", newline="") as src, \
+            open(tmp, "w", encoding="utf-8", newline="") as dst:
+        reader = csv.reader(src)
+        writer = csv.DictWriter(dst, fieldnames=FIELDNAMES)
+        writer.writeheader()
+        version = header_version(next(reader, None))
+        for values in reader:
+            if not values or values[0] in ("timestamp", "ts"):
+                continue
+            if version is not None:
+                record = from_row(values)
+                stats["current" if version == SCHEMA_VERSION else "upgraded"] += 1
+            else:
+                record = from_legacy_row(values)
+                stats["converted" if record is not None else "skipped"] += 1
+            if record is not None:
+                writer.writerow(to_row(record))
+    if backup and output is None:
+        shutil.copy2(path, path + ".legacy")
+    os.replace(tmp, target)
+    return stats
+
+
+def ensure_current(path):
+    """Migrate path in place if it exists with an older header; returns the stats or None"""
+    header = read_header(path)
+    if header is None or header_version(header) == SCHEMA_VERSION:
+        return None
+    return migrate_file(path)
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    path = sys.argv[2] if len(sys.argv) > 2 else "anomalies.csv"
+    if not os.path.exists(path):
+        print(f"❌ {path} not found")
+        sys.exit(1)
+    if command == "migrate":
+        output = sys.argv[3] if len(sys.argv) > 3 else None
+        stats = migrate_file(path, output)
+        print(f"✅ Migrated {path} to schema v{SCHEMA_VERSION}: {stats['converted']} converted, "
+              f"{stats['upgraded']} upgraded, {stats['current']} already current, {stats['skipped']} unreadable rows dropped")
+        if output is None:
+            print(f"📦 Original kept as {path}.legacy")
+    else:
+        version = header_version(read_header(path))
+        print(f"📄 {path}: " + (f"schema v{version}" if version else "legacy layout (run migrate)"))
+
+
+if __name__ == "__main__":
+    main()
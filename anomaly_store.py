@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+SQLite anomaly store for NetSnoop
+Optional alternative to anomalies.csv: WAL mode lets the monitor insert in
+batches while the dashboard reads, and indexed time-range queries keep load
+cost proportional to the selected window rather than the whole history
+"""
+
+import sqlite3
+import threading
+import time
+
+# Columns stored for every anomaly; ts is epoch seconds, timestamp the IST
+# display string written by the monitor, state/episode the alert episode
+# transition (see alert_episodes)
+STORE_COLUMNS = (
+    "ts", "timestamp", "anomaly_type", "severity", "process_name", "pid", "reason",
+    "user", "command", "cpu_usage", "memory_usage_mb", "parent_pid", "additional_info",
+    "duration", "state", "episode"
+)
+ADDED_COLUMNS = {"duration": "TEXT", "state": "TEXT", "episode": "TEXT"}  # Not in older databases
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS anomalies (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    anomaly_type TEXT,
+    severity TEXT,
+    process_name TEXT,
+    pid TEXT,
+    reason TEXT,
+    user TEXT,
+    command TEXT,
+    cpu_usage REAL,
+    memory_usage_mb REAL,
+    parent_pid TEXT,
+    additional_info TEXT,
+    duration TEXT,
+    state TEXT,
+    episode TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_anomalies_ts ON anomalies (ts);
+CREATE INDEX IF NOT EXISTS idx_anomalies_severity ON anomalies (severity, ts);
+CREATE INDEX IF NOT EXISTS idx_anomalies_type ON anomalies (anomaly_type, ts);
+CREATE INDEX IF NOT EXISTS idx_anomalies_process ON anomalies (process_name, ts);
+"""
+
+_INSERT = "INSERT INTO anomalies ({}) VALUES ({})".format(
+    ", ".join(STORE_COLUMNS), ", ".join("?" for _ in STORE_COLUMNS)
+)
+
+
+class AnomalyStore:
+    """Anomaly table in a WAL-mode SQLite database
+
+    A read-only store (the dashboard) opens the file with mode=ro and never
+    blocks the monitor's writes. The store also works as a BatchedWriter
+    sink: write_batch() inserts one batch per transaction.
+    """
+
+    def __init__(self, path, readonly=False, timeout=5.0):
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        if readonly:
+            self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True,
+                                         timeout=timeout, check_same_thread=False)
+        else:
+            self._conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints, safe with WAL
+            self._conn.executescript(SCHEMA)
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(anomalies)")}
+        if not readonly:
+            for column, kind in ADDED_COLUMNS.items():
+                if column not in existing:
+                    self._conn.execute(f"ALTER TABLE anomalies ADD COLUMN {column} {kind}")
+                    existing.add(column)
+        self.columns = [col for col in STORE_COLUMNS if col in existing]
+        self._conn.row_factory = sqlite3.Row
+        self.inserted = 0
+
+    def insert_many(self, rows):
+        """Insert anomaly dicts in a single transaction"""
+        now = time.time()
+        values = [
+            tuple((row.get("ts") or now) if col == "ts" else row.get(col) for col in STORE_COLUMNS)
+            for row in rows
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT, values)
+        self.inserted += len(values)
+
+    def insert(self, row):
+        self.insert_many([row])
+
+    write_batch = insert_many  # BatchedWriter sink interface
+
+    def flush(self):
+        pass  # Every batch is committed on insert
+
+    def _where(self, start, end, severity, anomaly_type, process_name):
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("ts < ?")
+            params.append(end)
+        for column, value in (("severity", severity), ("anomaly_type", anomaly_type),
+                              ("process_name", process_name)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def query(self, start=None, end=None, severity=None, anomaly_type=None,
+              process_name=None, limit=None):
+        """Anomalies in [start, end) matching the filters, newest first"""
+        where, params = self._where(start, end, severity, anomaly_type, process_name)
+        sql = f"SELECT {', '.join(self.columns)} FROM anomalies{where} ORDER BY ts DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def counts(self, start=None, end=None):
+        """Totals by anomaly type and severity, aggregated inside SQLite
+
+        Resolved-episode rows close an alert that was already counted, so
+        they are left out.
+        """
+        where, params = self._where(start, end, None, None, None)
+        if "state" in self.columns:
+            where += (" AND " if where else " WHERE ") + "(state IS NULL OR state != 'resolved')"
+        stats = {"total_anomalies": 0, "by_type": {}, "by_severity": {}}
+        with self._lock:
+            for column, key in (("anomaly_type", "by_type"), ("severity", "by_severity")):
+                sql = f"SELECT {column}, COUNT(*) FROM anomalies{where} GROUP BY {column}"
+                for value, count in self._conn.execute(sql, params):
+                    stats[key][value or "Unknown"] = count
+        stats["total_anomalies"] = sum(stats["by_severity"].values())
+        return stats
+
+    def latest_ts(self):
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(ts) FROM anomalies").fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Sliding-window spawn counters for burst detection
+Exact per-key event counts over the last N seconds using fixed time
+buckets, O(1) per event and per check, with a bounded number of keys
+"""
+
+import math
+import threading
+
+
+class SlidingWindowCounter:
+    """Per-key event counts over a sliding time window
+
+    Each key owns a ring of time buckets plus a running total. Adding an
+    event touches one bucket; reading a key expires at most num_buckets
+    stale buckets. Keys whose count exceeded the threshold when an event
+    arrived are tracked in a "hot" set, so over() only inspects keys that
+    can actually be bursting instead of every parent seen recently.
+    Keys are kept in update order, so prune() stops at the first live key.
+    """
+
+    def __init__(self, window=5.0, threshold=0, resolution=1.0, max_keys=10000):
+        self.window = window
+        self.threshold = threshold
+        self.resolution = resolution
+        self.num_buckets = max(int(math.ceil(window / resolution)), 1)
+        self.max_keys = max_keys
+        self._keys = {}  # key -> [total, counts, bucket_ids, last_bucket]
+        self._hot = set()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _bucket(self, timestamp):
+        return int(timestamp // self.resolution)
+
+    def _expire(self, state, bucket):
+        """Zero the buckets of a key that fell out of the window"""
+        counts, bucket_ids = state[1], state[2]
+        oldest = bucket - self.num_buckets
+        for slot in range(self.num_buckets):
+            if counts[slot] and bucket_ids[slot] <= oldest:
+                state[0] -= counts[slot]
+                counts[slot] = 0
+
+    def add(self, key, timestamp, amount=1):
+        """Record amount events for key at timestamp and return its window count"""
+        bucket = self._bucket(timestamp)
+        slot = bucket % self.num_buckets
+        with self._lock:
+            state = self._keys.pop(key, None)
+            if state is None:
+                state = [0, [0] * self.num_buckets, [bucket] * self.num_buckets, bucket]
+                if len(self._keys) >= self.max_keys:
+                    # Evict the least recently updated key
+                    oldest_key = next(iter(self._keys))
+                    del self._keys[oldest_key]
+                    self._hot.discard(oldest_key)
+                    self.evictions += 1
+            # Re-insert so dict order tracks recency of updates
+            self._keys[key] = state
+
+            if state[2][slot] > bucket:
+                return state[0]  # Older than the window, e.g. a late event
+            if state[2][slot] != bucket:
+                state[0] -= state[1][slot]
+                state[1][slot] = 0
+                state[2][slot] = bucket
+            state[1][slot] += amount
+            state[0] += amount
+            state[3] = max(state[3], bucket)
+            if state[0] > self.threshold:
+                self._hot.add(key)
+            return state[0]
+
+    def count(self, key, now):
+        """Events for key within the window ending at now"""
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                return 0
+            self._expire(state, self._bucket(now))
+            return state[0]
+
+    def over(self, now):
+        """[(key, count)] for every key whose window count exceeds the threshold"""
+        threshold = self.threshold
+        bucket = self._bucket(now)
+        result = []
+        with self._lock:
+            for key in list(self._hot):
+                state = self._keys.get(key)
+                if state is None:
+                    self._hot.discard(key)
+                    continue
+                self._expire(state, bucket)
+                if state[0] > threshold:
+                    result.append((key, state[0]))
+                else:
+                    self._hot.discard(key)
+                    if state[0] == 0:
+                        del self._keys[key]
+        result.sort(key=lambda item: item[1], reverse=True)
+        return result
+
+    def prune(self, now):
+        """Drop keys whose last event has left the window"""
+        oldest = self._bucket(now) - self.num_buckets
+        with self._lock:
+            while self._keys:
+                key = next(iter(self._keys))
+                if self._keys[key][3] > oldest:
+                    break
+                del self._keys[key]
+                self._hot.discard(key)
+
+    def __len__(self):
+        return len(self._keys)
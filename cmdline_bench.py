@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: cmdline_classifier vs the per-call script-name extraction
+Corpus is every live /proc/*/cmdline plus a built-in sample (or one cmdline
+per line from a file), repeated the way alerts repeat the same commands;
+checks both give the same script and display names before timing
+Usage: python3 cmdline_bench.py [corpus_file] [repeat] [rounds]
+"""
+
+import os
+import sys
+import time
+
+from cmdline_classifier import classify_cmdline, display_name, script_name
+
+SAMPLE = [
+    "/usr/bin/python3 /srv/jobs/nightly_report.py --since 2024-01-01 --verbose",
+    "python3 -m http.server 8000",
+    "/usr/bin/env python3 manage.py runserver 0.0.0.0:8000",
+    "node /opt/app/node_modules/.bin/webpack --watch --config webpack.config.js",
+    "bash -c while true; do sleep 1; done",
+    "/bin/sh -c /usr/local/bin/backup --target /mnt/backup",
+    "java -Xmx4g -Dspring.profiles.active=prod -jar /opt/svc/service.jar",
+    "/usr/lib/jvm/java-17-openjdk/bin/java -cp /opt/kafka/libs/* kafka.Kafka config/server.properties",
+    "perl -e print 1",
+    "ruby /home/dev/bin/deploy.rb production",
+    "sleep 30",
+    "curl -sS https://example.com/health",
+    "/usr/sbin/sshd -D",
+    "/lib/systemd/systemd-journald",
+    "postgres: checkpointer",
+    "/usr/bin/containerd-shim-runc-v2 -namespace moby -id 3f2a -address /run/containerd/containerd.sock",
+    "gcc -O2 -c src/main.c -o build/main.o",
+    "/usr/bin/python3.11 /usr/local/lib/python3.11/site-packages/celery worker -A tasks",
+    "tmux new-session -d -s work",
+    "/snap/code/123/usr/share/code/code --type=renderer --lang=en-US",
+]
+
+
+def legacy_extract(cmd):
+    """extract_script_name_improved before the classifier"""
+    if not cmd or cmd == "N/A":
+        return None
+    parts = cmd.split()
+    if not parts:
+        return None
+    script_extensions = [
+        '.py', '.sh', '.js', '.pl', '.rb', '.php', '.go', '.rs', '.java', '.cpp', '.c', '.cc', '.cxx',
+        '.h', '.hpp', '.hxx', '.swift', '.kt', '.scala', '.lua', '.r', '.R', '.m', '.mm', '.sql',
+        '.html', '.css', '.xml', '.json', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
+        '.bat', '.cmd', '.ps1', '.vbs', '.awk', '.sed', '.perl', '.tcl', '.ex', '.exs', '.clj',
+        '.dart', '.tsx', '.jsx', '.vue', '.svelte', '.ts', '.coffee', '.elm', '.hs', '.ml',
+        '.f90', '.f95', '.for', '.pas', '.ada', '.vhd', '.v', '.sv', '.asm', '.s'
+    ]
+    interpreters = {'python', 'python3', 'node', 'bash', 'sh', 'perl', 'ruby', 'java', 'php', 'go'}
+    for part in parts:
+        if part.startswith('-'):
+            continue
+        if any(part.lower().endswith(ext) for ext in script_extensions):
+            filename = part.split('/')[-1]
+            if filename:
+                return filename
+    for part in parts:
+        if part.startswith('-'):
+            continue
+        base_part = part.split('/')[-1]
+        if base_part.lower() in interpreters:
+            continue
+        if part.startswith(('/usr/bin/', '/bin/', '/sbin/', '/usr/sbin/', '/usr/lib/')):
+            continue
+        if '/' in part:
+            filename = part.split('/')[-1]
+            if filename and filename.lower() not in interpreters and not filename.startswith('-'):
+                return filename
+        elif part and part.lower() not in interpreters and not part.startswith('-'):
+            return part
+    for i, part in enumerate(parts):
+        if i == 0 or part.startswith('-'):
+            continue
+        if part and not part.startswith('/usr/') and not part.startswith('/bin/'):
+            filename = part.split('/')[-1] if '/' in part else part
+            if filename and filename.lower() not in interpreters:
+                return filename
+    return None
+
+
+def legacy_display(cmd, process_name):
+    """get_better_process_name before the classifier (it extracts a second time)"""
+    if not cmd or cmd == "N/A":
+        return process_name.strip("()") if process_name else "unknown"
+    script = legacy_extract(cmd)
+    if script:
+        return script
+    parts = cmd.split()
+    if parts:
+        main_cmd = parts[0].split('/')[-1]
+        if main_cmd in ['sleep', 'cat', 'echo', 'grep', 'awk', 'sed', 'curl', 'wget']:
+            return f"{main_cmd} {parts[1]}" if len(parts) > 1 else main_cmd
+        return main_cmd
+    return process_name.strip("()") if process_name else "unknown"
+
+
+def live_cmdlines():
+    cmdlines = []
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                cmd = f.read().replace(b"\0", b" ").decode(errors="replace").strip()
+        except OSError:
+            continue
+        if cmd:
+            cmdlines.append(cmd[:4096])
+    return cmdlines
+
+
+def load_corpus(path=None):
+    if path:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return [line.rstrip("\n") for line in f if line.strip()]
+    return live_cmdlines() + SAMPLE
+
+
+def legacy_both(cmd):
+    # An alert calls extract_script_name_improved and then get_better_process_name
+    return legacy_extract(cmd), legacy_display(cmd, "proc")
+
+
+def classifier_both(cmd):
+    return script_name(cmd), display_name(cmd, "proc")
+
+
+def run(label, func, calls, rounds, before=None):
+    best = float("inf")
+    for _ in range(rounds):
+        if before:
+            before()
+        start = time.perf_counter()
+        for cmd in calls:
+            func(cmd)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<18} {best * 1000:9.1f} ms   {len(calls) / best:12,.0f} cmdlines/s")
+    return best
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+
+    corpus = load_corpus(path)
+    mismatches = [cmd for cmd in corpus if legacy_both(cmd) != classifier_both(cmd)]
+    print(f"Corpus: {len(corpus)} distinct cmdlines x {repeat}, {len(mismatches)} mismatches")
+    for cmd in mismatches[:5]:
+        print(f"  {cmd[:80]!r}: {legacy_both(cmd)} != {classifier_both(cmd)}")
+
+    calls = corpus * repeat
+    # Each distinct cmdline once, without the cache
+    legacy_cold = run("legacy (once)", legacy_both, corpus, rounds)
+    cold = run("classifier (once)", classify_cmdline.__wrapped__, corpus, rounds)
+    # Repeated cmdlines, starting from an empty cache every round
+    legacy = run("legacy", legacy_both, calls, rounds)
+    warm = run("classifier", classifier_both, calls, rounds, before=classify_cmdline.cache_clear)
+    print(f"Uncached: {legacy_cold / cold:.1f}x faster, with repeats: {legacy / warm:.1f}x faster")
+    print(f"Classifier: {classify_cmdline(SAMPLE[0])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Command-line classifier for NetSnoop display names
+Splits a cmdline once into (interpreter, script, display name) using
+precompiled suffix and interpreter tables, memoized per cmdline string in
+a bounded LRU, so repeated alerts for the same command cost a dict lookup
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+
+CLASSIFIER_CACHE_SIZE = 4096  # Distinct cmdlines remembered (least recently used evicted)
+
+# Script extensions, matched case-insensitively against a token's last suffix
+SCRIPT_EXTENSIONS = frozenset(ext.lower() for ext in (
+    '.py', '.sh', '.js', '.pl', '.rb', '.php', '.go', '.rs', '.java', '.cpp', '.c', '.cc', '.cxx',
+    '.h', '.hpp', '.hxx', '.swift', '.kt', '.scala', '.lua', '.r', '.m', '.mm', '.sql',
+    '.html', '.css', '.xml', '.json', '.yaml', '.yml', '.toml', '.ini', '.cfg', '.conf',
+    '.bat', '.cmd', '.ps1', '.vbs', '.awk', '.sed', '.perl', '.tcl', '.ex', '.exs', '.clj',
+    '.dart', '.tsx', '.jsx', '.vue', '.svelte', '.ts', '.coffee', '.elm', '.hs', '.ml',
+    '.f90', '.f95', '.for', '.pas', '.ada', '.vhd', '.v', '.sv', '.asm', '.s'
+))
+
+# Programs that run a script rather than being the interesting part themselves
+INTERPRETERS = frozenset({'python', 'python3', 'node', 'bash', 'sh', 'perl', 'ruby', 'java', 'php', 'go'})
+
+# Launchers in front of the interpreter, e.g. "/usr/bin/env python3 x.py"
+LAUNCHERS = frozenset({'env', 'nice', 'nohup', 'sudo', 'exec', 'time', 'timeout', 'ionice'})
+
+SYSTEM_DIRS = ('/usr/bin/', '/bin/', '/sbin/', '/usr/sbin/', '/usr/lib/')
+NON_SCRIPT_DIRS = ('/usr/', '/bin/')
+
+# System commands whose first argument says what they are doing
+CONTEXT_COMMANDS = frozenset({'sleep', 'cat', 'echo', 'grep', 'awk', 'sed', 'curl', 'wget'})
+
+# interpreter: e.g. "python3" (versions like python3.11 included), or None
+# script: the script or most meaningful file/command name, or None
+# display_name: what alerts show for the process, or None for an empty cmdline
+CommandInfo = namedtuple("CommandInfo", ["interpreter", "script", "display_name"])
+
+EMPTY = CommandInfo(None, None, None)
+
+
+def _basename(token):
+    return token.rsplit('/', 1)[-1]
+
+
+def _interpreter(tokens):
+    """The interpreter running the command, looking past launchers and VAR=value"""
+    for token in tokens:
+        if token.startswith('-') or '=' in token:
+            continue
+        name = _basename(token).lower()
+        if name in LAUNCHERS:
+            continue
+        if name in INTERPRETERS:
+            return name
+        # python3.11, ruby2.7, perl5.36
+        if name.rstrip('0123456789.') in INTERPRETERS:
+            return name
+        return None
+    return None
+
+
+def _script(tokens):
+    """Script name: the first token with a script extension, else the first
+    non-interpreter, non-system token, else a later token outside /usr and /bin
+
+    One pass that remembers the fallbacks while looking for an extension.
+    """
+    fallback = later = None
+    for i, token in enumerate(tokens):
+        if token.startswith('-'):
+            continue
+        lower = token.lower()
+        dot = lower.rfind('.')
+        if dot >= 0 and lower[dot:] in SCRIPT_EXTENSIONS:
+            name = _basename(token)
+            if name:
+                return name
+        name = _basename(token)
+        not_interpreter = name.lower() not in INTERPRETERS
+        if fallback is None and not_interpreter and not token.startswith(SYSTEM_DIRS):
+            if name and not name.startswith('-'):
+                fallback = name
+        if later is None and i > 0 and not token.startswith(NON_SCRIPT_DIRS):
+            if name and not_interpreter:
+                later = name
+    return fallback if fallback is not None else later
+
+
+@lru_cache(maxsize=CLASSIFIER_CACHE_SIZE)
+def classify_cmdline(cmd):
+    """CommandInfo for a command line (cached per distinct string)"""
+    if not cmd or cmd == "N/A":
+        return EMPTY
+    tokens = cmd.split()
+    if not tokens:
+        return EMPTY
+
+    script = _script(tokens)
+    if script:
+        display_name = script
+    else:
+        main_cmd = _basename(tokens[0])
+        if main_cmd in CONTEXT_COMMANDS and len(tokens) > 1:
+            display_name = f"{main_cmd} {tokens[1]}"
+        else:
+            display_name = main_cmd
+    return CommandInfo(_interpreter(tokens), script, display_name)
+
+
+def script_name(cmd):
+    """Script (or meaningful command) name from a command line, or None"""
+    return classify_cmdline(cmd).script
+
+
+def display_name(cmd, process_name=None):
+    """Best display name for a process, falling back to its process name"""
+    name = classify_cmdline(cmd).display_name
+    if name:
+        return name
+    if process_name:
+        clean_name = process_name.strip("()")
+        if clean_name:
+            return clean_name
+    return "unknown"
+
+
+def cache_stats():
+    info = classify_cmdline.cache_info()
+    return {"size": info.currsize, "capacity": info.maxsize, "hits": info.hits, "misses": info.misses}
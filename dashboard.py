@@ -11,11 +11,38 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import csv
+import io
 import os
+import re
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 import time
 from pathlib import Path
 
+try:
+    from .anomaly_archive import AnomalyArchive, INDEX_FILE as ARCHIVE_INDEX_FILE, available as archive_available
+    from .anomaly_schema import SCHEMA_VERSION, data_version, iter_records, read_frame, records_frame, to_frame
+    from .anomaly_store import AnomalyStore
+    from .anomaly_rollups import RollupStore
+    from .cmdline_classifier import classify_cmdline
+    from .file_watch import FileWatcher
+    from .log_index import MappedLog, read_archived
+    from .log_segments import read_segment_bytes, segments_for_range
+except ImportError:
+    from anomaly_archive import AnomalyArchive, INDEX_FILE as ARCHIVE_INDEX_FILE, available as archive_available
+    from anomaly_schema import SCHEMA_VERSION, data_version, iter_records, read_frame, records_frame, to_frame
+    from anomaly_store import AnomalyStore
+    from anomaly_rollups import RollupStore
+    from cmdline_classifier import classify_cmdline
+    from file_watch import FileWatcher
+    from log_index import MappedLog, read_archived
+    from log_segments import read_segment_bytes, segments_for_range
+
+IST_OFFSET = pd.Timedelta(hours=5, minutes=30)  # Rollup buckets are epoch seconds, charts use IST
+TIME_RANGE_HOURS = {"Last Hour": 1, "Last 6 Hours": 6, "Last 24 Hours": 24, "All Time": None}
+MAX_DASHBOARD_FEEDS = 4  # Feeds (one per set of sidebar file paths) kept running; older ones are stopped
+
 # Page configuration
 st.set_page_config(
     page_title="System Monitor Dashboard",
@@ -83,55 +110,329 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+def parse_anomaly_csv(data, header=True, version=SCHEMA_VERSION):
+    """Typed anomaly frame (newest first) from CSV bytes
+
+    Current-schema files are parsed in one pass with the schema's dtypes;
+    pre-schema files are converted row by row (anomaly_schema.py migrate
+    rewrites them once).
+    """
+    if version:
+        df = read_frame(data, header=header, version=version)
+    else:
+        df = records_frame(iter_records(io.StringIO(data.decode('utf-8', errors='replace'), newline='')))
+    return df.sort_values('timestamp', ascending=False)
+
+class IncrementalAnomalyLoader:
+    """Cached DataFrame of an anomalies CSV that only parses appended rows
+
+    Remembers the byte offset and the file identity (device, inode) of the
+    last read. A new inode or a file shorter than the offset means the CSV
+    was rotated or truncated, which triggers a full reload. Only complete
+    rows are consumed, so a row the monitor is still writing is picked up
+    on the next call.
+    """
+
+    def __init__(self, csv_file):
+        self.csv_file = csv_file
+        self.lock = threading.Lock()
+        self.full_reloads = 0
+        self.rows_parsed = 0
+        self._reset()
+
+    def _reset(self):
+        self.identity = None
+        self.offset = 0
+        self.version = None
+        self.df = pd.DataFrame()
+
+    def load(self):
+        """Return the cached DataFrame (newest first) after reading new rows"""
+        with self.lock:
+            try:
+                st_result = os.stat(self.csv_file)
+            except FileNotFoundError:
+                self._reset()
+                return self.df
+
+            identity = (st_result.st_dev, st_result.st_ino)
+            if identity != self.identity or st_result.st_size < self.offset:
+                if self.identity is not None:
+                    self.full_reloads += 1
+                self._reset()
+                self.identity = identity
+            if st_result.st_size == self.offset:
+                return self.df
+
+            with open(self.csv_file, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(st_result.st_size - self.offset)
+            # Last row boundary: a newline outside quotes (commands can
+            # contain newlines, and the writer may flush mid-row)
+            end = data.rfind(b'\n')
+            quotes = data.count(b'"', 0, max(end, 0))
+            while end >= 0 and quotes % 2:
+                previous = data.rfind(b'\n', 0, end)
+                quotes -= data.count(b'"', max(previous, 0), end)
+                end = previous
+            end += 1
+            if end == 0:
+                return self.df
+            self.offset += end
+
+            first = self.offset == end
+            if first:
+                self.version = data_version(data)  # None for a pre-schema file
+            new_rows = parse_anomaly_csv(data[:end], header=first, version=self.version)
+            self.rows_parsed += len(new_rows)
+
+            if self.df.empty:
+                self.df = new_rows
+            elif not new_rows.empty:
+                # Appended rows are the newest, so they go in front
+                self.df = pd.concat([new_rows, self.df], ignore_index=True)
+            return self.df
+
+@st.cache_resource
+def get_anomaly_loader(csv_file):
+    """One incremental loader per CSV path, kept across reruns"""
+    return IncrementalAnomalyLoader(csv_file)
+
 def load_anomaly_data(csv_file="anomalies.csv"):
-    """Load anomaly data from CSV file"""
+    """Load anomaly data from CSV file, parsing only rows added since the last call"""
     try:
-        if not os.path.exists(csv_file):
-            return pd.DataFrame()
-        
-        df = pd.read_csv(csv_file)
-        if not df.empty:
-            # Handle IST timestamp format - remove " IST" suffix and parse
-            if 'timestamp' in df.columns:
-                # Remove " IST" suffix if present
-                df['timestamp'] = df['timestamp'].astype(str).str.replace(' IST', '', regex=False)
-                # Convert to datetime
-                df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
-                # Drop any rows where timestamp parsing failed
-                df = df.dropna(subset=['timestamp'])
-            
-            # Fix swapped columns: severity and pid are swapped in CSV
-            if 'severity' in df.columns and 'pid' in df.columns:
-                # Check if severity column contains numbers (indicating it's actually PID)
-                if df['severity'].dtype in ['int64', 'float64'] or df['severity'].astype(str).str.isdigit().any():
-                    # Swap the columns
-                    df['severity'], df['pid'] = df['pid'], df['severity']
-            
-            df = df.sort_values('timestamp', ascending=False)
-        return df
+        return get_anomaly_loader(csv_file).load()
     except Exception as e:
         st.error(f"Error loading data: {e}")
         return pd.DataFrame()
 
-def load_log_data(log_file="netsnoop_persistent.txt"):
-    """Load system log data"""
+@st.cache_data(max_entries=64)
+def load_anomaly_segment(csv_file, segment_file):
+    """Parse one rotated CSV segment; segments never change once written"""
+    data = read_segment_bytes(csv_file, {'file': segment_file})
+    return parse_anomaly_csv(data, version=data_version(data))
+
+def load_archived_anomalies(csv_file, since=None, skip=()):
+    """Rotated anomalies overlapping the window, newest first; others (and the numbers in skip) are not opened"""
     try:
-        if not os.path.exists(log_file):
-            return []
-        
-        logs = []
-        with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-            # Get last 100 lines for recent activity
-            for line in lines[-100:]:
-                line = line.strip()
-                if line and not line.startswith('='):
-                    logs.append(line)
-        
-        return logs
+        frames = [
+            load_anomaly_segment(csv_file, segment['file'])
+            for segment in reversed(segments_for_range(csv_file, since))
+            if segment['number'] not in skip
+        ]
+    except Exception as e:
+        st.error(f"Error loading archived anomalies: {e}")
+        return pd.DataFrame()
+    frames = [frame for frame in frames if not frame.empty]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+@st.cache_data(max_entries=8)
+def load_cold_anomalies(archive_dir, since, index_mtime):
+    """Anomalies compacted into the Parquet archive (index_mtime keys the cache)"""
+    df = AnomalyArchive(archive_dir).to_pandas(start=since)
+    return df.drop(columns=['ts']).sort_values('timestamp', ascending=False) if not df.empty else df
+
+def archived_segment_numbers(archive_dir, csv_file):
+    """Segments of csv_file already compacted into the archive; they are read from there"""
+    if not archive_available():
+        return set()
+    return AnomalyArchive(archive_dir or ".").compacted(csv_file)
+
+def load_archive_tier(archive_dir, since=None):
+    """Archived anomalies for the window, or an empty frame without pyarrow/archive"""
+    index_file = os.path.join(archive_dir or ".", ARCHIVE_INDEX_FILE)
+    if not archive_available() or not os.path.exists(index_file):
+        return pd.DataFrame()
+    # Day-aligned window start so the cached frame is reused across reruns
+    since = since // 86400 * 86400 if since else None
+    try:
+        return load_cold_anomalies(archive_dir, since, os.path.getmtime(index_file))
+    except Exception as e:
+        st.error(f"Error loading anomaly archive: {e}")
+        return pd.DataFrame()
+
+def load_anomaly_store(db_file="anomalies.db", since=None):
+    """Load anomalies newer than since (epoch seconds) from the SQLite store"""
+    try:
+        store = AnomalyStore(db_file, readonly=True)
+        try:
+            rows = store.query(start=since)
+        finally:
+            store.close()
+        # Newest first already; the display timestamp comes from the epoch column
+        return to_frame(pd.DataFrame(rows)) if rows else pd.DataFrame()
     except Exception as e:
-        st.error(f"Error loading log data: {e}")
-        return []
+        st.error(f"Error loading anomaly database: {e}")
+        return pd.DataFrame()
+
+def summarize_anomalies(df):
+    """Chart inputs computed from raw rows (used when there is no rollup file)"""
+    summary = {
+        'total': len(df), 'recent': 0, 'by_severity': {}, 'by_type': {}, 'by_process': {},
+        'hourly': pd.DataFrame(columns=['hour', 'severity', 'count'])
+    }
+    if df.empty:
+        return summary
+    if 'state' in df.columns:
+        # A resolved row closes an alert that was already counted when it opened
+        df = df[df['state'] != 'resolved']
+        summary['total'] = len(df)
+    
+    one_hour_ago = datetime.now() - timedelta(hours=1)
+    summary['recent'] = int((df['timestamp'] > one_hour_ago).sum())
+    # Severity and type are categoricals; drop the categories with no rows
+    summary['by_severity'] = {k: v for k, v in df['severity'].value_counts().items() if v}
+    # Extract type from reason (e.g., "HIGH CPU: 95.0% CPU usage" -> "HIGH CPU"),
+    # falling back to severity if there is no reason column
+    if 'reason' in df.columns:
+        summary['by_type'] = df['reason'].str.extract(r'^([^:]+)')[0].value_counts().to_dict()
+    else:
+        summary['by_type'] = summary['by_severity']
+    summary['by_process'] = df['process_name'].value_counts().to_dict()
+    summary['hourly'] = (
+        df.groupby([df['timestamp'].dt.floor('h').rename('hour'), 'severity'], observed=True)
+        .size().reset_index(name='count')
+    )
+    return summary
+
+def load_rollup_summary(rollup_file="anomalies_rollup.db", since=None):
+    """Chart inputs read from the monitor's minute/hour rollups"""
+    try:
+        store = RollupStore(rollup_file, readonly=True)
+        try:
+            by_severity = store.totals('severity', since)
+            summary = {
+                'total': sum(by_severity.values()),
+                'recent': sum(store.totals('severity', time.time() - 3600).values()),
+                'by_severity': by_severity,
+                'by_type': store.totals('type', since),
+                'by_process': store.totals('process', since),
+            }
+            hourly = pd.DataFrame(store.series('severity', since), columns=['hour', 'severity', 'count'])
+        finally:
+            store.close()
+        hourly['hour'] = pd.to_datetime(hourly['hour'], unit='s') + IST_OFFSET
+        summary['hourly'] = hourly
+        return summary
+    except Exception as e:
+        st.error(f"Error loading rollups: {e}")
+        return None
+
+def recent_log_lines(mapped_log, max_lines=100):
+    """Last entries of the log, skipping blank and separator lines"""
+    logs = []
+    # Get last 100 lines for recent activity
+    for line in mapped_log.tail(max_lines):
+        line = line.strip()
+        if line and not line.startswith('='):
+            logs.append(line)
+    return logs
+
+class SharedDashboardFeed:
+    """Process-wide anomaly and log loader shared by every dashboard session
+
+    A single background thread waits for the monitor to write (inotify on
+    the CSV, log, database and rollup files), reloads once and bumps a
+    version. Sessions read the same DataFrame and log lines, which must be
+    treated as read-only, and rerun only when the version changes. stop()
+    ends the thread, which then closes the watcher and the mapped log.
+    """
+
+    def __init__(self, csv_file, log_file, watch_files=()):
+        self.loader = IncrementalAnomalyLoader(csv_file)
+        self.log = MappedLog(log_file)  # Indexed view, also used for filtered log queries
+        self.condition = threading.Condition()
+        self.version = 0
+        self.anomalies = pd.DataFrame()
+        self.logs = []
+        self.error = None
+        self.watcher = FileWatcher([csv_file, log_file, *watch_files])
+        self._stopped = threading.Event()
+        self._refresh()
+        self._thread = threading.Thread(target=self._run, name="dashboard-feed", daemon=True)
+        self._thread.start()
+
+    def _refresh(self):
+        try:
+            anomalies = self.loader.load()
+            logs = recent_log_lines(self.log)
+            error = None
+        except Exception as e:
+            anomalies, logs, error = self.anomalies, self.logs, str(e)
+        with self.condition:
+            self.anomalies, self.logs, self.error = anomalies, logs, error
+            self.version += 1
+            self.condition.notify_all()
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                if self.watcher.wait(timeout=1.0):
+                    time.sleep(0.1)  # Coalesce the events of one writer flush
+                    self.watcher.wait(timeout=0)
+                    self._refresh()
+        finally:
+            self.watcher.close()
+            self.log.close()
+
+    def stop(self):
+        """Stop reloading; sessions still holding the feed keep its last data"""
+        self._stopped.set()
+
+    def snapshot(self):
+        """(version, anomalies DataFrame, log lines, error) as of the last reload"""
+        with self.condition:
+            return self.version, self.anomalies, self.logs, self.error
+
+    def wait_for_change(self, seen_version, timeout=None):
+        """Block until the version differs from seen_version; return the version"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.version != seen_version, timeout)
+            return self.version
+
+class DashboardFeeds:
+    """The running SharedDashboardFeeds by file set, least recently used first
+
+    Every distinct set of sidebar paths gets its own feed; beyond
+    max_feeds the least recently requested one is stopped, so editing a
+    path field does not leave a thread, a watcher and a mapping behind.
+    """
+
+    def __init__(self, max_feeds=MAX_DASHBOARD_FEEDS):
+        self.max_feeds = max_feeds
+        self._feeds = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, csv_file, log_file, db_file, rollup_file):
+        key = (csv_file, log_file, db_file, rollup_file)
+        with self._lock:
+            feed = self._feeds.get(key)
+            if feed is not None:
+                self._feeds.move_to_end(key)
+                return feed
+            watch_files = [path for name in (db_file, rollup_file) if name for path in (name, name + "-wal")]
+            feed = self._feeds[key] = SharedDashboardFeed(csv_file, log_file, watch_files)
+            while len(self._feeds) > self.max_feeds:
+                _, evicted = self._feeds.popitem(last=False)
+                evicted.stop()
+            return feed
+
+@st.cache_resource
+def get_dashboard_feeds():
+    """The feed registry shared by the whole Streamlit process"""
+    return DashboardFeeds()
+
+def get_dashboard_feed(csv_file, log_file, db_file, rollup_file):
+    """One shared feed per set of files for the whole Streamlit process"""
+    return get_dashboard_feeds().get(csv_file, log_file, db_file, rollup_file)
+
+def _rerun_on_new_data(feed, seen_version):
+    """Cheap periodic check that reruns the app only when the feed has new data"""
+    if feed.version != seen_version:
+        st.rerun()
+
+# Streamlit >= 1.37; older versions fall back to blocking on the feed
+watch_for_updates = st.fragment(run_every=0.5)(_rerun_on_new_data) if hasattr(st, "fragment") else None
 
 def create_severity_color_map():
     """Create color mapping for severity levels"""
@@ -144,25 +445,23 @@ def create_severity_color_map():
         'EMERGENCY': '#d32f2f'
     }
 
-def display_metrics(df):
+def display_metrics(summary):
     """Display key metrics"""
-    if df.empty:
+    if not summary['total']:
         st.warning("No anomaly data available")
         return
     
     # Calculate metrics
-    total_anomalies = len(df)
+    total_anomalies = summary['total']
     
     # Recent activity (last hour)
-    current_time = datetime.now()
-    one_hour_ago = current_time - timedelta(hours=1)
-    recent_anomalies = len(df[df['timestamp'] > one_hour_ago])
+    recent_anomalies = summary['recent']
     
     # Critical anomalies
-    critical_count = len(df[df['severity'] == 'CRITICAL'])
+    critical_count = summary['by_severity'].get('CRITICAL', 0)
     
-    # Most active process
-    most_active_process = df['process_name'].value_counts().index[0] if not df.empty else "N/A"
+    # Most active process (counts are sorted largest first)
+    most_active_process = str(next(iter(summary['by_process']), "N/A"))
     
     # Display metrics in columns
     col1, col2, col3, col4 = st.columns(4)
@@ -194,16 +493,11 @@ def display_metrics(df):
             value=most_active_process[:15] + "..." if len(most_active_process) > 15 else most_active_process
         )
 
-def create_timeline_chart(df):
-    """Create timeline chart of anomalies"""
-    if df.empty:
+def create_timeline_chart(hourly_counts):
+    """Create timeline chart of anomalies from hourly severity counts"""
+    if hourly_counts.empty:
         return None
     
-    # Group by hour for timeline
-    df_hourly = df.copy()
-    df_hourly['hour'] = df_hourly['timestamp'].dt.floor('H')
-    hourly_counts = df_hourly.groupby(['hour', 'severity']).size().reset_index(name='count')
-    
     color_map = create_severity_color_map()
     
     fig = px.bar(
@@ -225,23 +519,14 @@ def create_timeline_chart(df):
     
     return fig
 
-def create_anomaly_type_chart(df):
+def create_anomaly_type_chart(type_counts):
     """Create pie chart of anomaly types"""
-    if df.empty:
+    if not type_counts:
         return None
     
-    # Extract anomaly type from reason column since we don't have anomaly_type column
-    if 'reason' in df.columns:
-        # Extract type from reason (e.g., "HIGH CPU: 95.0% CPU usage" -> "HIGH CPU")
-        df['anomaly_type'] = df['reason'].str.extract(r'^([^:]+)')[0]
-        type_counts = df['anomaly_type'].value_counts()
-    else:
-        # Fallback to severity if no reason column
-        type_counts = df['severity'].value_counts()
-    
     fig = px.pie(
-        values=type_counts.values,
-        names=type_counts.index,
+        values=list(type_counts.values()),
+        names=list(type_counts.keys()),
         title="Anomaly Types Distribution"
     )
     
@@ -250,17 +535,17 @@ def create_anomaly_type_chart(df):
     
     return fig
 
-def create_process_activity_chart(df):
+def create_process_activity_chart(process_counts):
     """Create bar chart of most active processes"""
-    if df.empty:
+    if not process_counts:
         return None
     
     # Get top 10 most active processes
-    process_counts = df['process_name'].value_counts().head(10)
+    top = sorted(process_counts.items(), key=lambda item: item[1], reverse=True)[:10]
     
     fig = px.bar(
-        x=process_counts.values,
-        y=process_counts.index,
+        x=[count for _, count in top],
+        y=[name for name, _ in top],
         orientation='h',
         title="Top 10 Most Active Processes",
         labels={'x': 'Number of Anomalies', 'y': 'Process Name'}
@@ -270,15 +555,15 @@ def create_process_activity_chart(df):
     
     return fig
 
-def create_severity_timeline(df):
+def create_severity_timeline(hourly_counts):
     """Create timeline showing severity distribution"""
-    if df.empty:
+    if hourly_counts.empty:
         return None
     
-    # Group by time and severity
-    df_timeline = df.copy()
-    df_timeline['hour'] = df_timeline['timestamp'].dt.floor('H')
-    severity_timeline = df_timeline.groupby(['hour', 'severity']).size().unstack(fill_value=0)
+    # Hours as rows, one column per severity
+    severity_timeline = hourly_counts.pivot_table(
+        index='hour', columns='severity', values='count', aggfunc='sum', fill_value=0
+    )
     
     fig = go.Figure()
     color_map = create_severity_color_map()
@@ -302,6 +587,12 @@ def create_severity_timeline(df):
     
     return fig
 
+def process_label(process_name, command):
+    """Process name with the interpreter and script its command line shows, if they add anything"""
+    info = classify_cmdline(command if isinstance(command, str) else "")
+    details = [part for part in (info.interpreter, info.script) if part and part != process_name]
+    return f"{process_name} ({' '.join(details)})" if details else process_name
+
 def display_recent_alerts(df, limit=10):
     """Display recent alerts table"""
     if df.empty:
@@ -311,7 +602,7 @@ def display_recent_alerts(df, limit=10):
     st.subheader("🚨 Recent Alerts")
     
     # Get recent alerts - adjust column names to match CSV structure
-    columns_to_show = ['timestamp', 'severity', 'process_name', 'reason', 'pid']
+    columns_to_show = ['timestamp', 'severity', 'process_name', 'reason', 'pid', 'command']
     available_columns = [col for col in columns_to_show if col in df.columns]
     
     if not available_columns:
@@ -324,7 +615,7 @@ def display_recent_alerts(df, limit=10):
     for idx, row in recent_df.iterrows():
         severity = str(row.get('severity', 'UNKNOWN')).upper()
         timestamp_str = row['timestamp'].strftime('%H:%M:%S') if pd.notna(row['timestamp']) else 'Unknown'
-        process_name = str(row.get('process_name', 'Unknown'))
+        process_name = process_label(str(row.get('process_name', 'Unknown')), row.get('command'))
         reason = str(row.get('reason', 'No description available'))
         pid = str(row.get('pid', 'N/A'))
         
@@ -382,32 +673,43 @@ def main():
     st.sidebar.title("⚙️ Dashboard Controls")
     
     # Auto-refresh option
-    auto_refresh = st.sidebar.checkbox("Auto Refresh (30s)", value=True)
+    auto_refresh = st.sidebar.checkbox("Auto Refresh (on new data)", value=True)
     
     # File selection
     csv_file = st.sidebar.text_input("Anomalies CSV File", value="anomalies.csv")
+    db_file = st.sidebar.text_input("Anomalies Database (SQLite backend)", value="anomalies.db")
+    rollup_file = st.sidebar.text_input("Rollup File", value="anomalies_rollup.db")
     log_file = st.sidebar.text_input("Log File", value="netsnoop_persistent.txt")
+    archive_dir = st.sidebar.text_input("Archive Directory (Parquet)", value="anomaly_archive")
     
     # Time range filter
     time_range = st.sidebar.selectbox(
         "Time Range",
-        options=["Last Hour", "Last 6 Hours", "Last 24 Hours", "All Time"]
+        options=list(TIME_RANGE_HOURS)
     )
-    
-    # Load data
-    df = load_anomaly_data(csv_file)
-    
-    # Apply time filter
-    if not df.empty and time_range != "All Time":
-        current_time = datetime.now()
-        if time_range == "Last Hour":
-            cutoff_time = current_time - timedelta(hours=1)
-        elif time_range == "Last 6 Hours":
-            cutoff_time = current_time - timedelta(hours=6)
-        elif time_range == "Last 24 Hours":
-            cutoff_time = current_time - timedelta(hours=24)
-        
-        df = df[df['timestamp'] > cutoff_time]
+    hours = TIME_RANGE_HOURS[time_range]
+    since = time.time() - hours * 3600 if hours else None
+    
+    # Shared with every other session; reloaded only when the monitor writes
+    feed = get_dashboard_feed(csv_file, log_file, db_file, rollup_file)
+    version, feed_df, logs, feed_error = feed.snapshot()
+    if feed_error:
+        st.error(f"Error loading data: {feed_error}")
+    
+    # Load data: the SQLite store answers the time range with an indexed
+    # query, the CSV rows are filtered here
+    if db_file and os.path.exists(db_file):
+        df = load_anomaly_store(db_file, since=since)
+    else:
+        df = feed_df
+        # Active file, then rotated segments, then the columnar archive
+        skip = archived_segment_numbers(archive_dir, csv_file)
+        for older in (load_archived_anomalies(csv_file, since, skip), load_archive_tier(archive_dir, since)):
+            if not older.empty:
+                df = pd.concat([df, older], ignore_index=True)
+        if not df.empty and hours:
+            cutoff_time = datetime.now() - timedelta(hours=hours)
+            df = df[df['timestamp'] > cutoff_time]
     
     # Status indicator
     if df.empty:
@@ -416,11 +718,18 @@ def main():
         last_update = df['timestamp'].max().strftime('%Y-%m-%d %H:%M:%S')
         st.success(f"🟢 Live Data | Last Update: {last_update}")
     
+    # Metrics and charts come from the monitor's rollups when available
+    summary = None
+    if rollup_file and os.path.exists(rollup_file):
+        summary = load_rollup_summary(rollup_file, since)
+    if summary is None:
+        summary = summarize_anomalies(df)
+    
     # Display metrics
-    display_metrics(df)
+    display_metrics(summary)
     
     # Main content area
-    if not df.empty:
+    if summary['total']:
         # Charts section
         st.header("📊 Analytics")
         
@@ -428,12 +737,12 @@ def main():
         col1, col2 = st.columns(2)
         
         with col1:
-            timeline_fig = create_timeline_chart(df)
+            timeline_fig = create_timeline_chart(summary['hourly'])
             if timeline_fig:
                 st.plotly_chart(timeline_fig, use_container_width=True)
         
         with col2:
-            type_fig = create_anomaly_type_chart(df)
+            type_fig = create_anomaly_type_chart(summary['by_type'])
             if type_fig:
                 st.plotly_chart(type_fig, use_container_width=True)
         
@@ -441,12 +750,12 @@ def main():
         col3, col4 = st.columns(2)
         
         with col3:
-            process_fig = create_process_activity_chart(df)
+            process_fig = create_process_activity_chart(summary['by_process'])
             if process_fig:
                 st.plotly_chart(process_fig, use_container_width=True)
         
         with col4:
-            severity_fig = create_severity_timeline(df)
+            severity_fig = create_severity_timeline(summary['hourly'])
             if severity_fig:
                 st.plotly_chart(severity_fig, use_container_width=True)
     
@@ -458,19 +767,46 @@ def main():
         with st.expander("📋 Detailed Anomaly Data"):
             st.dataframe(df, use_container_width=True)
     
-    # System logs
-    with st.expander("📜 Recent System Logs"):
-        logs = load_log_data(log_file)
-        if logs:
-            for log in logs[-20:]:  # Show last 20 log entries
+    # System logs: filters and paging run here against the indexed log, so
+    # only the requested lines are read and sent to the browser
+    with st.expander("📜 System Logs"):
+        col_a, col_b, col_c = st.columns([3, 1, 2])
+        log_pattern = col_a.text_input("Filter (regex)", value="")
+        log_pid = col_b.text_input("PID", value="")
+        log_view = col_c.selectbox("Show", ["Latest", "Selected time range", "Browse all"])
+        
+        lines = logs[-20:]  # Show last 20 log entries
+        if log_pattern or log_pid.strip() or log_view != "Latest":
+            try:
+                if log_view == "Selected time range":
+                    # Rotated segments first (only those overlapping the range)
+                    lines = read_archived(log_file, since, None, log_pattern or None, log_pid or None, limit=500)
+                    lines += feed.log.time_range(since, None, log_pattern or None, log_pid or None,
+                                                 limit=500 - len(lines))
+                elif log_view == "Browse all":
+                    page_size = 100
+                    last_page = max((feed.log.line_count - 1) // page_size, 0)
+                    page = st.number_input("Page", min_value=0, max_value=last_page, value=last_page)
+                    lines = feed.log.page(int(page) * page_size, page_size, log_pattern or None, log_pid or None)
+                else:
+                    lines = feed.log.tail(50, log_pattern or None, log_pid or None)
+            except (re.error, ValueError) as e:
+                st.error(f"Invalid log filter: {e}")
+                lines = []
+        
+        if lines:
+            for log in lines:
                 st.text(log)
         else:
             st.info("No log data available")
     
-    # Auto refresh
+    # Auto refresh: rerun as soon as the shared feed has reloaded
     if auto_refresh:
-        time.sleep(30)
-        st.rerun()
+        if watch_for_updates is not None:
+            watch_for_updates(feed, version)
+        else:
+            feed.wait_for_change(version, timeout=30)
+            st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,63 +5,50 @@ import threading
 from datetime import datetime, timezone, timedelta
 from typing import Dict, List, Optional, Any
 
+try:
+    from .anomaly_archive import AnomalyArchive
+    from .anomaly_schema import (ANOMALY_TYPES, FIELDNAMES, SEVERITIES, anomaly_type_for, ensure_current,
+                                 format_timestamp, make_record, read_records, to_row)
+    from .anomaly_store import AnomalyStore
+    from .cmdline_classifier import classify_cmdline
+except ImportError:
+    from anomaly_archive import AnomalyArchive
+    from anomaly_schema import (ANOMALY_TYPES, FIELDNAMES, SEVERITIES, anomaly_type_for, ensure_current,
+                                format_timestamp, make_record, read_records, to_row)
+    from anomaly_store import AnomalyStore
+    from cmdline_classifier import classify_cmdline
+
 IST = timezone(timedelta(hours=5, minutes=30))
 
 class AnomalyLogger:
     """Enhanced anomaly logging system for system monitoring dashboard"""
     
-    def __init__(self, csv_file: str = "anomalies.csv", log_file: str = "system_monitor.log"):
+    def __init__(self, csv_file: str = "anomalies.csv", log_file: str = "system_monitor.log",
+                 db_file: Optional[str] = None, archive_dir: Optional[str] = None):
         self.csv_file = csv_file
         self.log_file = log_file
         self.lock = threading.Lock()
+        # Optional SQLite backend replacing the CSV (indexed, WAL mode)
+        self.store = AnomalyStore(db_file) if db_file else None
+        # Optional Parquet archive holding CSV segments compacted by the monitor
+        self.archive = AnomalyArchive(archive_dir) if archive_dir else None
         
-        # Initialize CSV file with comprehensive headers
-        self.csv_headers = [
-            
-            "timestamp",
-            "anomaly_type", 
-            "severity",
-            "process_name",
-            "pid",
-            "user",
-            "command",
-            "description",
-            "cpu_usage",
-            "memory_usage_mb",
-            "duration",
-            "parent_pid",
-            "session_id",
-            "additional_info"
-        ]
+        # CSV columns come from the shared, versioned anomaly schema
+        self.csv_headers = list(FIELDNAMES)
         
         self.initialize_files()
         
         # Anomaly type categories
-        self.ANOMALY_TYPES = {
-            "PROCESS_BURST": "Process Burst",
-            "HIGH_CPU": "High CPU Usage",
-            "CRITICAL_CPU": "Critical CPU Usage", 
-            "HIGH_MEMORY": "High Memory Usage",
-            "CRITICAL_MEMORY": "Critical Memory Usage",
-            "SUSPICIOUS_PROCESS": "Suspicious Process",
-            "USB_EVENT": "USB Device Event",
-            "SYSTEM_OVERLOAD": "System Overload",
-            "NETWORK_ANOMALY": "Network Anomaly",
-            "FILE_ACCESS": "Suspicious File Access",
-            "PRIVILEGE_ESCALATION": "Privilege Escalation"
-        }
+        self.ANOMALY_TYPES = ANOMALY_TYPES
         
         # Severity levels
-        self.SEVERITY_LEVELS = {
-            "LOW": 1,
-            "MEDIUM": 2, 
-            "HIGH": 3,
-            "CRITICAL": 4,
-            "EMERGENCY": 5
-        }
+        self.SEVERITY_LEVELS = {severity: level for level, severity in enumerate(SEVERITIES, 1)}
     
     def initialize_files(self):
         """Initialize CSV and log files with proper headers"""
+        if self.store is not None:
+            print(f"✅ Anomaly logger initialized with database: {self.store.path}")
+            return
         try:
             # Initialize CSV file if it doesn't exist
             if not os.path.exists(self.csv_file):
@@ -69,6 +56,8 @@ class AnomalyLogger:
                     writer = csv.DictWriter(f, fieldnames=self.csv_headers)
                     writer.writeheader()
                 print(f"✅ Created anomaly CSV file: {self.csv_file}")
+            elif ensure_current(self.csv_file) is not None:
+                print(f"📦 Migrated {self.csv_file} to the current anomaly schema")
             
             # Test CSV file is writable
             with open(self.csv_file, "a", encoding='utf-8') as f:
@@ -98,7 +87,8 @@ class AnomalyLogger:
         
         Args:
             anomaly_type: Type of anomaly (use ANOMALY_TYPES keys)
-            process_name: Name of the process involved
+            process_name: Name of the process involved (derived from command when
+                empty or just the interpreter, e.g. "python3" -> "job.py")
             pid: Process ID
             description: Detailed description of the anomaly
             severity: Severity level (LOW, MEDIUM, HIGH, CRITICAL, EMERGENCY)
@@ -113,32 +103,36 @@ class AnomalyLogger:
         
         with self.lock:
             try:
-                timestamp = datetime.now(IST).strftime('%Y-%m-%d %H:%M:%S')
+                now = time.time()
                 
                 # Generate session ID based on current time (for grouping related events)
                 session_id = datetime.now(IST).strftime('%Y%m%d_%H')
                 
-                anomaly_data = {
-                    "timestamp": timestamp,
-                    "anomaly_type": self.ANOMALY_TYPES.get(anomaly_type, anomaly_type),
-                    "severity": severity,
-                    "process_name": process_name,
-                    "pid": pid,
-                    "user": user,
-                    "command": command[:200] if command else "",  # Truncate long commands
-                    "description": description,
-                    "cpu_usage": cpu_usage,
-                    "memory_usage_mb": memory_usage_mb,
-                    "duration": duration,
-                    "parent_pid": parent_pid,
-                    "session_id": session_id,
-                    "additional_info": additional_info
-                }
+                # Name the script rather than the interpreter running it
+                info = classify_cmdline(command)
+                if info.display_name and (not process_name or process_name.strip("()").lower() == info.interpreter):
+                    process_name = info.display_name
                 
-                # Write to CSV file
-                with open(self.csv_file, "a", newline="", encoding='utf-8') as f:
-                    writer = csv.DictWriter(f, fieldnames=self.csv_headers)
-                    writer.writerow(anomaly_data)
+                record = make_record(
+                    now, anomaly_type_for(anomaly_type, description), severity,
+                    process_name, pid, description,
+                    user=user,
+                    command=command[:200] if command else "",  # Truncate long commands
+                    cpu_usage=cpu_usage,
+                    memory_usage_mb=memory_usage_mb,
+                    duration=duration,
+                    parent_pid=parent_pid,
+                    session_id=session_id,
+                    additional_info=additional_info
+                )
+                
+                if self.store is not None:
+                    self.store.insert(dict(record._asdict(), timestamp=format_timestamp(now)))
+                else:
+                    # Write to CSV file
+                    with open(self.csv_file, "a", newline="", encoding='utf-8') as f:
+                        writer = csv.DictWriter(f, fieldnames=self.csv_headers)
+                        writer.writerow(to_row(record))
                 
                 # Optional: Print to console for immediate feedback
                 if severity in ["HIGH", "CRITICAL", "EMERGENCY"]:
@@ -248,8 +242,14 @@ class AnomalyLogger:
     
     def get_anomaly_stats(self) -> Dict[str, Any]:
         """Get basic statistics about logged anomalies"""
+        if self.store is not None:
+            stats = self.store.counts()
+            stats["recent_count"] = self.store.counts(start=time.time() - 3600)["total_anomalies"]
+            return stats
         try:
-            if not os.path.exists(self.csv_file):
+            archived = self.archive.counts() if self.archive is not None else None
+            compacted = self.archive.compacted(self.csv_file) if self.archive is not None else ()
+            if not os.path.exists(self.csv_file) and not (archived and archived["total_anomalies"]):
                 return {"error": "No anomaly data found"}
             
             stats = {
@@ -258,30 +258,24 @@ class AnomalyLogger:
                 "by_severity": {},
                 "recent_count": 0  # Last hour
             }
+            if archived:
+                # Archived days are older than an hour, so they never add to recent_count
+                stats["total_anomalies"] = archived["total_anomalies"]
+                stats["by_type"].update(archived["by_type"])
+                stats["by_severity"].update(archived["by_severity"])
             
-            current_time = datetime.now(IST)
-            one_hour_ago = current_time - timedelta(hours=1)
+            one_hour_ago = time.time() - 3600
             
-            with open(self.csv_file, "r", encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    stats["total_anomalies"] += 1
-                    
-                    # Count by type
-                    anomaly_type = row.get("anomaly_type", "Unknown")
-                    stats["by_type"][anomaly_type] = stats["by_type"].get(anomaly_type, 0) + 1
-                    
-                    # Count by severity
-                    severity = row.get("severity", "Unknown")
-                    stats["by_severity"][severity] = stats["by_severity"].get(severity, 0) + 1
-                    
-                    # Count recent anomalies
-                    try:
-                        anomaly_time = datetime.strptime(row.get("timestamp", ""), '%Y-%m-%d %H:%M:%S')
-                        if anomaly_time.replace(tzinfo=IST) > one_hour_ago:
-                            stats["recent_count"] += 1
-                    except:
-                        pass
+            # Rotated segments (see log_segments) and then the active file,
+            # in any schema version
+            for record in read_records(self.csv_file, skip=compacted):
+                if record.state == "resolved":
+                    continue  # Closes an alert counted when it opened
+                stats["total_anomalies"] += 1
+                stats["by_type"][record.anomaly_type] = stats["by_type"].get(record.anomaly_type, 0) + 1
+                stats["by_severity"][record.severity] = stats["by_severity"].get(record.severity, 0) + 1
+                if record.ts > one_hour_ago:
+                    stats["recent_count"] += 1
             
             return stats
             
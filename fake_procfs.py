@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+Synthetic procfs trees for benchmarks and offline runs of the monitor
+Writes stat/status/cmdline/comm/cgroup files shaped like the kernel's for
+a realistic process population: kernel threads, daemons, login sessions
+running scripts, comms with spaces and parentheses, zombies and PIDs that
+vanish mid-read. Point the monitor at one with NETSNOOP_PROC_ROOT=<dir>.
+Usage: python3 fake_procfs.py <dir> [num_pids] [seed]
+"""
+
+import os
+import random
+import sys
+
+CLK_TCK = 100
+NUM_CPUS = 4
+PAGE_KB = 4
+KTHREAD_FLAGS = 0x208040  # PF_KTHREAD | PF_NOFREEZE | PF_FORKNOEXEC
+TASK_FLAGS = 0x400100     # PF_RANDOMIZE | PF_SUPERPRIV
+
+# (comm, argv, rss_kb range, uid, cgroup); "{n}" is replaced per process
+DAEMONS = [
+    ("systemd-journal", ["/lib/systemd/systemd-journald"], (8000, 60000), 0, "/system.slice/systemd-journald.service"),
+    ("systemd-udevd", ["/lib/systemd/systemd-udevd"], (4000, 9000), 0, "/system.slice/systemd-udevd.service"),
+    ("cron", ["/usr/sbin/cron", "-f", "-P"], (1500, 3000), 0, "/system.slice/cron.service"),
+    ("dbus-daemon", ["@dbus-daemon", "--system", "--address=systemd:", "--nofork"], (3000, 6000), 101,
+     "/system.slice/dbus.service"),
+    ("NetworkManager", ["/usr/sbin/NetworkManager", "--no-daemon"], (12000, 20000), 0,
+     "/system.slice/NetworkManager.service"),
+    ("containerd", ["/usr/bin/containerd"], (30000, 70000), 0, "/system.slice/containerd.service"),
+    ("postgres", ["/usr/lib/postgresql/15/bin/postgres", "-D", "/var/lib/postgresql/15/main"], (20000, 40000), 113,
+     "/system.slice/postgresql@15-main.service"),
+]
+WORKLOADS = [
+    ("python3", ["/usr/bin/python3", "/srv/jobs/job_{n}.py", "--verbose"], (9000, 120000)),
+    ("python3", ["python3", "-m", "http.server", "{n}"], (15000, 25000)),
+    ("node", ["node", "/opt/app/node_modules/.bin/webpack", "--watch", "--config", "webpack.config.js"],
+     (60000, 400000)),
+    ("java", ["java", "-Xmx4g", "-jar", "/opt/svc/service_{n}.jar"], (200000, 900000)),
+    ("bash", ["bash", "-c", "while true; do sleep 1; done"], (3000, 5000)),
+    ("sleep", ["sleep", "{n}"], (600, 900)),
+    ("gcc", ["gcc", "-O2", "-c", "src/file_{n}.c", "-o", "build/file_{n}.o"], (20000, 90000)),
+    ("postgres", ["postgres: checkpointer"], (5000, 30000)),  # setproctitle(): one string, no NULs
+    ("tmux: server", ["tmux", "new-session", "-d", "-s", "work{n}"], (3000, 6000)),
+    ("Web Content", ["/usr/lib/firefox/firefox", "-contentproc", "-childID", "{n}", "tab"], (80000, 600000)),
+    ("(sd-pam)", ["(sd-pam)"], (4000, 6000)),
+    ("a) b (c", ["./a) b (c", "--weird"], (1000, 2000)),
+]
+KERNEL_THREADS = ["kworker/{cpu}:{n}-events", "ksoftirqd/{cpu}", "migration/{cpu}", "rcu_preempt",
+                  "kworker/u{n}:0-flush-8:0", "kswapd0", "jbd2/sda1-8", "irq/{n}-nvme0q{cpu}"]
+
+ZOMBIE_FRACTION = 0.005   # Exited, not yet reaped: state Z, empty cmdline, no Vm* lines
+VANISHING_FRACTION = 0.005  # Directory listed but files unreadable: the process exited mid-sweep
+
+
+class FakeProcess:
+    """One synthetic process and the values its files are rendered from"""
+
+    __slots__ = ("pid", "comm", "ppid", "uid", "state", "utime", "stime", "rss_kb", "starttime",
+                 "argv", "cgroup", "kernel")
+
+    def __init__(self, pid, comm, ppid, uid, argv, rss_kb, starttime, cgroup, kernel=False):
+        self.pid = pid
+        self.comm = comm[:15]  # TASK_COMM_LEN
+        self.ppid = ppid
+        self.uid = uid
+        self.state = "I" if kernel else "S"
+        self.utime = 0
+        self.stime = 0
+        self.rss_kb = rss_kb
+        self.starttime = starttime
+        self.argv = argv
+        self.cgroup = cgroup
+        self.kernel = kernel
+
+    def stat_line(self):
+        rss_pages = self.rss_kb // PAGE_KB
+        vsize = 0 if self.kernel else self.rss_kb * 1024 * 3
+        flags = KTHREAD_FLAGS if self.kernel else TASK_FLAGS
+        return (
+            f"{self.pid} ({self.comm}) {self.state} {self.ppid} {self.pid} {self.pid} 0 -1 {flags} "
+            f"{self.pid * 7 % 5000} 0 {self.pid % 13} 0 {self.utime} {self.stime} 0 0 20 0 1 0 "
+            f"{self.starttime} {vsize} {rss_pages} 18446744073709551615 1 1 0 0 0 0 0 0 0 0 0 0 17 "
+            f"{self.pid % NUM_CPUS} 0 0 0 0 0 0 0 0 0 0 0 0 0\n"
+        )
+
+    def status_text(self):
+        lines = [
+            f"Name:\t{self.comm}", "Umask:\t0022", f"State:\t{STATE_NAMES[self.state]}",
+            f"Tgid:\t{self.pid}", "Ngid:\t0", f"Pid:\t{self.pid}", f"PPid:\t{self.ppid}", "TracerPid:\t0",
+            f"Uid:\t{self.uid}\t{self.uid}\t{self.uid}\t{self.uid}",
+            f"Gid:\t{self.uid}\t{self.uid}\t{self.uid}\t{self.uid}",
+            "FDSize:\t64", "Groups:\t", f"NStgid:\t{self.pid}", f"NSpid:\t{self.pid}",
+        ]
+        if not self.kernel and self.state != "Z":
+            # Kernel threads and zombies have no address space, hence no Vm* lines
+            lines += [
+                f"VmPeak:\t{self.rss_kb * 3 + 4096:8d} kB", f"VmSize:\t{self.rss_kb * 3:8d} kB",
+                "VmLck:\t       0 kB", "VmPin:\t       0 kB", f"VmHWM:\t{self.rss_kb:8d} kB",
+                f"VmRSS:\t{self.rss_kb:8d} kB", f"RssAnon:\t{self.rss_kb * 3 // 4:8d} kB",
+                f"RssFile:\t{self.rss_kb // 4:8d} kB", "RssShmem:\t       0 kB",
+                f"VmData:\t{self.rss_kb:8d} kB", "VmStk:\t     132 kB", "VmExe:\t    2820 kB",
+                "VmLib:\t    6372 kB", "VmPTE:\t     180 kB", "VmSwap:\t       0 kB",
+            ]
+        lines += ["Threads:\t1", "SigQ:\t0/63413", "SigPnd:\t0000000000000000", "ShdPnd:\t0000000000000000",
+                  "SigBlk:\t0000000000000000", "SigIgn:\t0000000000001000", "SigCgt:\t0000000180004a07",
+                  "CapInh:\t0000000000000000", "Seccomp:\t0", f"Cpus_allowed_list:\t0-{NUM_CPUS - 1}",
+                  "voluntary_ctxt_switches:\t150", "nonvoluntary_ctxt_switches:\t3"]
+        return "\n".join(lines) + "\n"
+
+    def cmdline_bytes(self):
+        if self.kernel or self.state == "Z":
+            return b""
+        return b"\0".join(arg.encode() for arg in self.argv) + b"\0"
+
+
+STATE_NAMES = {"R": "R (running)", "S": "S (sleeping)", "I": "I (idle)", "Z": "Z (zombie)"}
+
+
+class FakeProcfs:
+    """A synthetic /proc directory that can be grown, shrunk and ticked
+
+    populate() lays out the initial tree; spawn(), exit() and tick() change
+    it the way a running system would, rewriting only the affected files
+    (stat files are replaced atomically so a concurrent sweep never reads
+    half a line).
+    """
+
+    def __init__(self, root, seed=0):
+        self.root = root
+        self.rng = random.Random(seed)
+        self.processes = {}  # pid -> FakeProcess
+        self.vanished = set()  # PIDs whose directory exists but whose files are empty
+        self.uptime_ticks = 360000  # Jiffies since boot; new processes start "now"
+        self.cpu_jiffies = [0] * 8  # user nice system idle iowait irq softirq steal
+        self.next_pid = 1
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, pid, name=None):
+        path = os.path.join(self.root, str(pid))
+        return os.path.join(path, name) if name else path
+
+    def _write(self, pid, name, data, atomic=False):
+        path = self._path(pid, name)
+        mode = "wb" if isinstance(data, bytes) else "w"
+        if not atomic:
+            with open(path, mode) as f:
+                f.write(data)
+            return
+        with open(path + ".tmp", mode) as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+    def _write_process(self, proc):
+        os.makedirs(self._path(proc.pid), exist_ok=True)
+        self._write(proc.pid, "stat", proc.stat_line())
+        self._write(proc.pid, "status", proc.status_text())
+        self._write(proc.pid, "cmdline", proc.cmdline_bytes())
+        self._write(proc.pid, "comm", proc.comm + "\n")
+        self._write(proc.pid, "cgroup", f"0::{proc.cgroup}\n")
+
+    def _write_system_stat(self):
+        user, nice, system, idle, iowait, irq, softirq, steal = self.cpu_jiffies
+        line = f"cpu  {user} {nice} {system} {idle} {iowait} {irq} {softirq} {steal} 0 0\n"
+        per_cpu = "".join(
+            f"cpu{n} {user // NUM_CPUS} {nice // NUM_CPUS} {system // NUM_CPUS} {idle // NUM_CPUS} "
+            f"{iowait // NUM_CPUS} {irq // NUM_CPUS} {softirq // NUM_CPUS} {steal // NUM_CPUS} 0 0\n"
+            for n in range(NUM_CPUS)
+        )
+        with open(os.path.join(self.root, "stat.tmp"), "w") as f:
+            f.write(line + per_cpu + f"ctxt 123456789\nbtime 1700000000\nprocesses {self.next_pid}\n"
+                    f"procs_running 2\nprocs_blocked 0\n")
+        os.replace(os.path.join(self.root, "stat.tmp"), os.path.join(self.root, "stat"))
+
+    def _allocate_pid(self):
+        # Real PID allocation leaves gaps where short-lived processes came and went
+        pid = self.next_pid
+        self.next_pid += 1
+        if pid > 2 and self.rng.random() < 0.2:
+            self.next_pid += self.rng.randint(1, 5)
+        return pid
+
+    def spawn(self, ppid, comm, argv, rss_kb=2048, uid=1000, cgroup=None, kernel=False):
+        """Add a process under ppid and write its files; returns it"""
+        pid = self._allocate_pid()
+        parent = self.processes.get(ppid)
+        if cgroup is None:
+            cgroup = parent.cgroup if parent else "/"
+        proc = FakeProcess(pid, comm, ppid, uid, [arg.replace("{n}", str(pid)) for arg in argv],
+                           rss_kb, self.uptime_ticks, cgroup, kernel)
+        self.processes[pid] = proc
+        self._write_process(proc)
+        return proc
+
+    def exit(self, pid, zombie=False):
+        """Remove a process, or leave it as an unreaped zombie"""
+        proc = self.processes.get(pid)
+        if proc is None:
+            return
+        if zombie:
+            proc.state = "Z"
+            self._write_process(proc)
+            return
+        del self.processes[pid]
+        self.vanished.discard(pid)
+        path = self._path(pid)
+        for name in os.listdir(path):
+            os.unlink(os.path.join(path, name))
+        os.rmdir(path)
+
+    def vanish(self, pid):
+        """Keep the directory but empty its files, like a process reaped mid-sweep"""
+        if pid in self.processes:
+            for name in ("stat", "status", "cmdline", "comm"):
+                self._write(pid, name, b"")
+            self.vanished.add(pid)
+
+    def populate(self, num_pids):
+        """Build a boot-like tree of num_pids processes (plus /proc/stat)"""
+        rng = self.rng
+        systemd = self.spawn(0, "systemd", ["/sbin/init", "splash"], 12000, 0, "/init.scope")
+        kthreadd = self.spawn(0, "kthreadd", [], 0, 0, "/", kernel=True)
+
+        num_kernel = max(num_pids // 20, 1)
+        for n in range(num_kernel):
+            name = rng.choice(KERNEL_THREADS).format(cpu=n % NUM_CPUS, n=n)
+            self.spawn(kthreadd.pid, name, [], 0, 0, "/", kernel=True)
+
+        for comm, argv, (low, high), uid, cgroup in DAEMONS:
+            self.spawn(systemd.pid, comm, argv, rng.randint(low, high), uid, cgroup)
+        postgres = next(p for p in self.processes.values() if p.comm == "postgres")
+
+        # Login sessions: sshd -> bash -> workloads (some of them nested)
+        sshd = self.spawn(systemd.pid, "sshd", ["sshd: /usr/sbin/sshd -D [listener] 0 of 10-100 startups"],
+                          7000, 0, "/system.slice/ssh.service")
+        shells = []
+        while len(self.processes) < num_pids:
+            if not shells or rng.random() < 0.02:
+                uid = rng.choice((1000, 1001, 1002))
+                scope = f"/user.slice/user-{uid}.slice/session-{len(shells) + 1}.scope"
+                session = self.spawn(sshd.pid, "sshd", [f"sshd: user{uid}@pts/{len(shells)}"], 6000, uid, scope)
+                shells.append(self.spawn(session.pid, "bash", ["-bash"], 5000, uid))
+                continue
+            comm, argv, (low, high) = rng.choice(WORKLOADS)
+            if comm == "postgres":
+                parent = postgres
+            else:
+                parent = rng.choice(shells)
+            proc = self.spawn(parent.pid, comm, argv, rng.randint(low, high), parent.uid)
+            if comm == "bash" and rng.random() < 0.3:
+                shells.append(proc)
+
+        # Some processes have been running for a while and accumulated CPU time
+        for proc in self.processes.values():
+            if not proc.kernel:
+                proc.starttime = rng.randint(100, self.uptime_ticks)
+                proc.utime = rng.randint(0, 50000)
+                proc.stime = rng.randint(0, 5000)
+                self._write(proc.pid, "stat", proc.stat_line())
+
+        candidates = [pid for pid, proc in self.processes.items() if not proc.kernel and pid > sshd.pid]
+        for pid in rng.sample(candidates, int(len(candidates) * ZOMBIE_FRACTION)):
+            self.exit(pid, zombie=True)
+        candidates = [pid for pid in candidates if self.processes[pid].state != "Z"]
+        for pid in rng.sample(candidates, int(len(candidates) * VANISHING_FRACTION)):
+            self.vanish(pid)
+
+        self.cpu_jiffies = [self.uptime_ticks * NUM_CPUS // 10, 500, self.uptime_ticks * NUM_CPUS // 20,
+                            self.uptime_ticks * NUM_CPUS * 4 // 5, 2000, 0, 300, 0]
+        self._write_system_stat()
+        return self
+
+    def tick(self, seconds=1.0, busy_fraction=0.05, hog=None):
+        """Advance time: a sample of processes burns CPU, /proc/stat moves on
+
+        hog is an optional PID that keeps one core busy for the whole tick.
+        """
+        elapsed = int(seconds * CLK_TCK)
+        self.uptime_ticks += elapsed
+        live = [proc for proc in self.processes.values()
+                if not proc.kernel and proc.state != "Z" and proc.pid not in self.vanished]
+        busy = self.rng.sample(live, min(int(len(live) * busy_fraction), len(live)))
+        used = 0
+        for proc in busy:
+            burn = self.rng.randint(0, elapsed // 4)
+            proc.utime += burn
+            used += burn
+            self._write(proc.pid, "stat", proc.stat_line(), atomic=True)
+        if hog is not None and hog in self.processes:
+            proc = self.processes[hog]
+            proc.utime += elapsed
+            used += elapsed
+            self._write(proc.pid, "stat", proc.stat_line(), atomic=True)
+        total = elapsed * NUM_CPUS
+        used = min(used, total)
+        self.cpu_jiffies[0] += used
+        self.cpu_jiffies[3] += total - used
+        self._write_system_stat()
+
+    def pids(self):
+        return sorted(self.processes)
+
+
+def build_fake_proc(root, num_pids, seed=0):
+    """Populate root with a synthetic procfs of about num_pids processes"""
+    return FakeProcfs(root, seed).populate(num_pids)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+    root = sys.argv[1]
+    num_pids = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    fake = build_fake_proc(root, num_pids, seed)
+    zombies = sum(1 for proc in fake.processes.values() if proc.state == "Z")
+    kernel = sum(1 for proc in fake.processes.values() if proc.kernel)
+    print(f"📁 {len(fake.processes)} processes at {root}: {kernel} kernel threads, "
+          f"{zombies} zombies, {len(fake.vanished)} vanishing")
+    print(f"   Run the monitor against it with NETSNOOP_PROC_ROOT={os.path.abspath(root)}")
+
+
+if __name__ == "__main__":
+    main()
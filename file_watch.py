@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+File change notification for NetSnoop readers
+Uses inotify on the parent directories (so creation and rotation are seen)
+and falls back to polling os.stat() where inotify is not available
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class FileWatcher:
+    """Wait until any of a set of files is modified, created, moved or deleted"""
+
+    def __init__(self, paths, poll_interval=0.5):
+        self.paths = {os.path.abspath(p) for p in paths if p}
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._dirs = {}  # watch descriptor -> directory
+        self._signatures = {}
+        try:
+            self._open_inotify()
+        except (OSError, AttributeError):
+            self._fd = None
+        if self._fd is None:
+            self._signatures = {p: self._signature(p) for p in self.paths}
+
+    @property
+    def using_inotify(self):
+        return self._fd is not None
+
+    def _open_inotify(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        for directory in {os.path.dirname(p) for p in self.paths}:
+            wd = libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self._dirs[wd] = directory
+        self._fd = fd
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _poll(self):
+        changed = set()
+        for path in self.paths:
+            signature = self._signature(path)
+            if signature != self._signatures.get(path):
+                self._signatures[path] = signature
+                changed.add(path)
+        return changed
+
+    def _read_events(self):
+        changed = set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            path = os.path.join(self._dirs.get(wd, ""), os.fsdecode(name))
+            if path in self.paths:
+                changed.add(path)
+        return changed
+
+    def wait(self, timeout=None):
+        """Block up to timeout seconds; return the set of watched paths that changed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if self._fd is not None:
+                readable, _, _ = select.select([self._fd], [], [], remaining)
+                changed = self._read_events() if readable else set()
+            else:
+                time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                changed = self._poll()
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
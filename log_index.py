@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Memory-mapped reader for netsnoop_persistent.txt
+Keeps a sparse line-offset/timestamp index in a sidecar file (<log>.idx),
+updated incrementally as the log grows, so tail, paging and time-range
+reads with regex/PID filters cost O(result) instead of a full read
+Usage: python3 log_index.py <log file> [tail N | page FIRST N | since SECONDS] [--grep REGEX] [--pid PID]
+"""
+
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+try:
+    from .log_segments import open_segment, segments_for_range
+except ImportError:
+    from log_segments import open_segment, segments_for_range
+
+IST = timezone(timedelta(hours=5, minutes=30))
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+TIMESTAMP_LEN = 19  # "[YYYY-mm-dd HH:MM:SS IST] ..." -- compared as bytes
+
+INDEX_MAGIC = b"NSLI"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<4sIQQQQ")  # magic, version, inode, indexed_size, line_count, stride
+_ENTRY = struct.Struct("<QQ19s")      # line number, byte offset, timestamp of the nearest line
+
+
+def ist_timestamp(epoch):
+    """Epoch seconds -> the log's IST timestamp as bytes"""
+    return datetime.fromtimestamp(epoch, IST).strftime(TIMESTAMP_FORMAT).encode()
+
+
+def line_timestamp(line):
+    """Timestamp bytes of a log line, or None for continuation lines"""
+    if line[:3] == b"[20" and len(line) > TIMESTAMP_LEN:
+        return line[1:TIMESTAMP_LEN + 1]
+    return None
+
+
+def compile_filters(pattern=None, pid=None):
+    """Compiled regexes a line must all match (empty list = no filter)"""
+    filters = []
+    if pid is not None and str(pid).strip():
+        # Most selective first. The literal-prefixed pattern lets the
+        # regex engine skip ahead; the second one rejects "PPID 123"
+        filters.append(re.compile(rb"PID:? %d\b" % int(pid)))
+        filters.append(re.compile(rb"(?<![A-Za-z])PID:? %d\b" % int(pid)))
+    if pattern:
+        filters.append(re.compile(pattern.encode() if isinstance(pattern, str) else pattern, re.MULTILINE))
+    return filters
+
+
+def read_archived(path, start=None, end=None, pattern=None, pid=None, limit=1000):
+    """Matching lines from rotated segments overlapping [start, end)
+
+    Segments outside the window (per the rotation manifest) are never
+    opened; the others are decompressed as a stream.
+    """
+    filters = compile_filters(pattern, pid)
+    low = ist_timestamp(start) if start is not None else None
+    high = ist_timestamp(end) if end is not None else None
+    result, stamp = [], None
+    for segment in segments_for_range(path, start, end):
+        try:
+            with open_segment(path, segment, "rb") as f:
+                for line in f:
+                    line = line.rstrip(b"\n")
+                    stamp = line_timestamp(line) or stamp
+                    if low is not None and (stamp is None or stamp < low):
+                        continue
+                    if high is not None and stamp is not None and stamp >= high:
+                        return result
+                    if all(check.search(line) for check in filters):
+                        result.append(line.decode("utf-8", errors="replace"))
+                        if len(result) >= limit:
+                            return result
+        except OSError:
+            continue  # Expired or just compressed
+    return result
+
+
+class MappedLog:
+    """Indexed, memory-mapped view of an append-only log file
+
+    Every stride-th line's byte offset and timestamp are kept in memory and
+    appended to the .idx sidecar, so reopening a multi-GB log only indexes
+    what was written since. A different inode or a shorter file (rotation,
+    truncation) rebuilds the index. Only complete lines are indexed.
+    """
+
+    def __init__(self, path, index_path=None, stride=256):
+        self.path = path
+        self.index_path = index_path or path + ".idx"
+        self.stride = stride
+        self._lock = threading.Lock()
+        self._mm = None
+        self._mapped_size = 0
+        self._reset_index(None)
+        self._load_index()
+
+    # Index maintenance
+
+    def _reset_index(self, inode):
+        self._inode = inode
+        self._indexed_size = 0
+        self._line_count = 0
+        self._lines = []
+        self._offsets = []
+        self._stamps = []
+        self._last_stamp = b"0" * TIMESTAMP_LEN
+        self._saved_entries = 0
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return
+        if len(data) < _HEADER.size:
+            return
+        magic, version, inode, size, count, stride = _HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION or stride != self.stride:
+            return
+        entries = (len(data) - _HEADER.size) // _ENTRY.size
+        for line, offset, stamp in _ENTRY.iter_unpack(data[_HEADER.size:_HEADER.size + entries * _ENTRY.size]):
+            if offset >= size:
+                break
+            self._lines.append(line)
+            self._offsets.append(offset)
+            self._stamps.append(stamp)
+        self._inode, self._indexed_size, self._line_count = inode, size, count
+        self._saved_entries = len(self._lines)
+        if self._stamps:
+            self._last_stamp = self._stamps[-1]
+
+    def _save_index(self):
+        mode = "r+b" if self._saved_entries and os.path.exists(self.index_path) else "wb"
+        if mode == "wb":
+            self._saved_entries = 0
+        try:
+            with open(self.index_path, mode) as f:
+                f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self._inode or 0,
+                                     self._indexed_size, self._line_count, self.stride))
+                f.seek(_HEADER.size + self._saved_entries * _ENTRY.size)
+                for i in range(self._saved_entries, len(self._lines)):
+                    f.write(_ENTRY.pack(self._lines[i], self._offsets[i], self._stamps[i]))
+                f.truncate()
+            self._saved_entries = len(self._lines)
+        except OSError:
+            pass  # Read-only directory: the index just stays in memory
+
+    def _extend_index(self, mm, size):
+        pos, line = self._indexed_size, self._line_count
+        last_stamp, stride = self._last_stamp, self.stride
+        find = mm.find
+        while pos < size:
+            end = find(b"\n", pos, size)
+            if end < 0:
+                break  # Partial last line, picked up on the next refresh
+            if mm[pos:pos + 3] == b"[20":
+                last_stamp = mm[pos + 1:pos + 1 + TIMESTAMP_LEN]
+            if line % stride == 0:
+                self._lines.append(line)
+                self._offsets.append(pos)
+                self._stamps.append(last_stamp)
+            pos = end + 1
+            line += 1
+        self._indexed_size, self._line_count, self._last_stamp = pos, line, last_stamp
+
+    def refresh(self):
+        """Remap the file and index any lines appended since the last call"""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            self._close_map()
+            self._reset_index(None)
+            return False
+        if st.st_ino != self._inode or st.st_size < self._indexed_size:
+            self._close_map()
+            self._reset_index(st.st_ino)
+        if st.st_size != self._mapped_size:
+            self._close_map()
+            if st.st_size:
+                with open(self.path, "rb") as f:
+                    self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._mapped_size = len(self._mm)
+        if self._mm is not None and self._indexed_size < self._mapped_size:
+            self._extend_index(self._mm, self._mapped_size)
+            self._save_index()
+        return True
+
+    def _close_map(self):
+        if self._mm is not None:
+            self._mm.close()
+        self._mm = None
+        self._mapped_size = 0
+
+    def close(self):
+        with self._lock:
+            self._close_map()
+
+    @property
+    def line_count(self):
+        return self._line_count
+
+    # Reads
+
+    def _read_lines(self, start, end, filters, limit=None):
+        """Lines in [start, end) (both line boundaries), optionally filtered
+
+        The first filter is run by the regex engine directly over the mapped
+        bytes; only lines containing a match are sliced out and checked
+        against the remaining filters (and the first again if its match
+        crossed a line break).
+        """
+        mm, result = self._mm, []
+        if not filters:
+            while start < end and (limit is None or len(result) < limit):
+                line_end = mm.find(b"\n", start, end)
+                result.append(mm[start:line_end])
+                start = line_end + 1
+            return result
+        first, rest = filters[0], filters[1:]
+        pos = start
+        while pos < end and (limit is None or len(result) < limit):
+            m = first.search(mm, pos, end)
+            if m is None:
+                break
+            line_start = mm.rfind(b"\n", start, m.start()) + 1 or start
+            line_end = mm.find(b"\n", m.start(), end)
+            if line_end < 0:
+                line_end = end
+            line = mm[line_start:line_end]
+            # The match may run past the newline, so the line must match on its own
+            if (m.end() <= line_end or first.search(line)) and all(f.search(line) for f in rest):
+                result.append(line)
+            pos = line_end + 1
+        return result
+
+    def _seek_line(self, line):
+        """Byte offset of a line number, via the nearest index entry"""
+        i = bisect_right(self._lines, line) - 1
+        if i < 0:
+            return 0
+        pos, current = self._offsets[i], self._lines[i]
+        find = self._mm.find
+        while current < line and pos < self._indexed_size:
+            pos = find(b"\n", pos, self._indexed_size) + 1
+            current += 1
+        return pos
+
+    def _seek_time(self, stamp):
+        """Offset of the first line stamped at or after stamp (bytes)"""
+        i = max(bisect_left(self._stamps, stamp) - 1, 0)
+        pos = self._offsets[i] if self._offsets else 0
+        mm, size = self._mm, self._indexed_size
+        # At most one stride of lines between the entry and the target
+        while pos < size:
+            line_stamp = line_timestamp(mm[pos:pos + TIMESTAMP_LEN + 2])
+            if line_stamp is not None and line_stamp >= stamp:
+                break
+            pos = mm.find(b"\n", pos, size) + 1
+        return pos
+
+    @staticmethod
+    def _decode(lines):
+        return [line.decode("utf-8", errors="replace") for line in lines]
+
+    def tail(self, count=100, pattern=None, pid=None, chunk_size=1 << 20):
+        """Last count lines (matching the filters), oldest first"""
+        with self._lock:
+            self._refresh()
+            if self._mm is None:
+                return []
+            filters = compile_filters(pattern, pid)
+            mm, end, result = self._mm, self._indexed_size, []
+            if not filters:
+                while end > 0 and len(result) < count:
+                    start = mm.rfind(b"\n", 0, end - 1) + 1
+                    result.append(mm[start:end - 1])
+                    end = start
+                result.reverse()
+                return self._decode(result)
+            # Filtered: search backwards one chunk of whole lines at a time
+            while end > 0 and len(result) < count:
+                start = mm.rfind(b"\n", 0, max(end - chunk_size, 0)) + 1
+                result = self._read_lines(start, end, filters) + result
+                end = start
+            return self._decode(result[-count:])
+
+    def page(self, first_line, count=100, pattern=None, pid=None):
+        """count lines (matching the filters) starting at line number first_line"""
+        with self._lock:
+            self._refresh()
+            if self._mm is None:
+                return []
+            start = self._seek_line(first_line)
+            return self._decode(self._read_lines(start, self._indexed_size, compile_filters(pattern, pid), count))
+
+    def time_range(self, start=None, end=None, pattern=None, pid=None, limit=1000):
+        """Lines stamped in [start, end) (epoch seconds), up to limit"""
+        with self._lock:
+            self._refresh()
+            if self._mm is None:
+                return []
+            low = self._seek_time(ist_timestamp(start)) if start is not None else 0
+            high = self._seek_time(ist_timestamp(end)) if end is not None else self._indexed_size
+            return self._decode(self._read_lines(low, high, compile_filters(pattern, pid), limit))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__.strip().splitlines()[-1])
+        return
+    args = sys.argv[2:]
+    pattern = pid = None
+    if "--grep" in args:
+        i = args.index("--grep")
+        pattern = args[i + 1]
+        del args[i:i + 2]
+    if "--pid" in args:
+        i = args.index("--pid")
+        pid = args[i + 1]
+        del args[i:i + 2]
+
+    log = MappedLog(sys.argv[1])
+    started = time.perf_counter()
+    log.refresh()
+    indexed = time.perf_counter()
+    mode = args[0] if args else "tail"
+    if mode == "page":
+        lines = log.page(int(args[1]), int(args[2]) if len(args) > 2 else 100, pattern, pid)
+    elif mode == "since":
+        lines = log.time_range(time.time() - float(args[1]), None, pattern, pid)
+    else:
+        lines = log.tail(int(args[1]) if len(args) > 1 else 20, pattern, pid)
+    finished = time.perf_counter()
+    for line in lines:
+        print(line)
+    print(f"📄 {log.line_count} lines indexed in {(indexed - started) * 1000:.1f} ms, "
+          f"{len(lines)} returned in {(finished - indexed) * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Size- and time-based rotation for NetSnoop's log and anomaly files
+Full files are moved to numbered segments (<file>.N, gzip-compressed to
+<file>.N.gz in the background) and listed in <file>.manifest.json with the
+time range each segment covers, so readers only open the segments that
+overlap the window they need
+"""
+
+import csv
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+
+_manifest_lock = threading.Lock()
+
+
+class RotationPolicy:
+    """When to rotate and how many segments to keep (None = no limit)"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_age=24 * 3600, keep_segments=None, compress=True):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.keep_segments = keep_segments
+        self.compress = compress
+
+    def due(self, size, started, now=None):
+        if size <= 0:
+            return False
+        if self.max_bytes and size >= self.max_bytes:
+            return True
+        now = time.time() if now is None else now
+        return bool(self.max_age and started is not None and now - started >= self.max_age)
+
+
+def manifest_path(path):
+    return path + ".manifest.json"
+
+
+def load_manifest(path):
+    """{"active_start": epoch or None, "segments": [...]} for a rotated file"""
+    try:
+        with open(manifest_path(path), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault("active_start", None)
+    manifest.setdefault("segments", [])
+    return manifest
+
+
+def _save_manifest(path, manifest):
+    tmp = manifest_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, manifest_path(path))
+
+
+def _update_manifest(path, update):
+    with _manifest_lock:
+        manifest = load_manifest(path)
+        update(manifest)
+        _save_manifest(path, manifest)
+
+
+def active_start(path):
+    """When the current (unrotated) file was started, recording now if unknown"""
+    started = []
+
+    def update(manifest):
+        if manifest["active_start"] is None:
+            segments = manifest["segments"]
+            manifest["active_start"] = segments[-1]["end"] if segments else time.time()
+        started.append(manifest["active_start"])
+
+    _update_manifest(path, update)
+    return started[0]
+
+
+def rotate(path, started, policy):
+    """Move path to the next numbered segment and start a new active file
+
+    The caller must have closed path. Compression runs on a background
+    thread; until it finishes the manifest points at the uncompressed
+    segment, so readers always see a complete file.
+    """
+    now = time.time()
+    segment = {}
+
+    def add(manifest):
+        # Never reuse a number, even once its segment is gone (the archive records them)
+        number = max([s["number"] for s in manifest["segments"]] + [manifest.get("last_number", 0)]) + 1
+        manifest["last_number"] = number
+        name = f"{path}.{number}"
+        os.rename(path, name)
+        segment.update(number=number, file=os.path.basename(name), start=started, end=now,
+                       bytes=os.path.getsize(name))
+        manifest["segments"].append(dict(segment))
+        manifest["active_start"] = now
+
+    _update_manifest(path, add)
+    expired = _expire(path, policy)
+    if policy.compress:
+        threading.Thread(target=_compress, args=(path, segment["number"]), daemon=True).start()
+    return segment, expired
+
+
+def _expire(path, policy):
+    if not policy.keep_segments:
+        return []
+    removed = []
+
+    def drop(manifest):
+        while len(manifest["segments"]) > policy.keep_segments:
+            removed.append(manifest["segments"].pop(0))
+
+    _update_manifest(path, drop)
+    for segment in removed:
+        try:
+            os.remove(segment_path(path, segment))
+        except OSError:
+            pass
+    return removed
+
+
+def remove_segments(path, numbers):
+    """Drop segments from the manifest and delete their files (e.g. once archived)"""
+    numbers = set(numbers)
+    removed = []
+
+    def drop(manifest):
+        removed.extend(s for s in manifest["segments"] if s["number"] in numbers)
+        manifest["segments"] = [s for s in manifest["segments"] if s["number"] not in numbers]
+
+    _update_manifest(path, drop)
+    for segment in removed:
+        try:
+            os.remove(segment_path(path, segment))
+        except OSError:
+            pass
+    return removed
+
+
+def _compress(path, number):
+    source = f"{path}.{number}"
+    target = source + ".gz"
+    try:
+        with open(source, "rb") as src, gzip.open(target + ".tmp", "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(target + ".tmp", target)
+    except OSError as e:
+        print(f"❌ Could not compress {source}: {e}")
+        return
+
+    def mark(manifest):
+        for segment in manifest["segments"]:
+            if segment["number"] == number:
+                segment["file"] = os.path.basename(target)
+                segment["compressed_bytes"] = os.path.getsize(target)
+
+    _update_manifest(path, mark)
+    os.remove(source)
+
+
+# Readers
+
+def segment_path(path, segment):
+    return os.path.join(os.path.dirname(path), segment["file"])
+
+
+def segments_for_range(path, start=None, end=None):
+    """Manifest entries overlapping [start, end), oldest first"""
+    result = []
+    for segment in load_manifest(path)["segments"]:
+        if start is not None and segment["end"] < start:
+            continue
+        if end is not None and segment["start"] is not None and segment["start"] >= end:
+            continue
+        result.append(segment)
+    return result
+
+
+def open_segment(path, segment, mode="rt"):
+    """Open a segment for reading, decompressing it if needed"""
+    name = segment_path(path, segment)
+    if name.endswith(".gz"):
+        return gzip.open(name, mode, encoding="utf-8", newline="") if "t" in mode else gzip.open(name, mode)
+    return open(name, mode, encoding="utf-8", newline="") if "t" in mode else open(name, mode)
+
+
+def iter_lines(path, start=None, end=None):
+    """Lines of every segment overlapping [start, end), then the active file"""
+    for segment in segments_for_range(path, start, end):
+        try:
+            with open_segment(path, segment) as f:
+                yield from f
+        except OSError:
+            continue  # Expired or being compressed; the next manifest read has it
+    if end is None or (load_manifest(path)["active_start"] or 0) < end:
+        try:
+            with open(path, "r", encoding="utf-8", newline="") as f:
+                yield from f
+        except OSError:
+            pass
+
+
+def iter_csv_rows(path, start=None, end=None):
+    """csv.DictReader rows across segments and the active file"""
+    for segment in segments_for_range(path, start, end):
+        try:
+            with open_segment(path, segment) as f:
+                yield from csv.DictReader(f)
+        except OSError:
+            continue
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    except OSError:
+        pass
+
+
+def read_segment_bytes(path, segment):
+    """Whole decompressed segment, e.g. for pandas.read_csv(io.BytesIO(...))"""
+    with open_segment(path, segment, "rb") as f:
+        return f.read()
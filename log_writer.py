@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Background batched writer for NetSnoop's log and anomaly files
+One thread owns every output file: producers enqueue lines, CSV rows or
+records for a sink (e.g. the SQLite store), the writer keeps the files open,
+writes in batches and flushes on size or time thresholds with a
+configurable fsync policy; with a RotationPolicy full files are rotated
+into compressed segments after a flush
+"""
+
+import csv
+import os
+import queue
+import threading
+import time
+
+try:
+    from .log_segments import active_start, rotate
+except ImportError:
+    from log_segments import active_start, rotate
+
+FSYNC_NEVER = "never"        # Leave durability to the OS page cache
+FSYNC_INTERVAL = "interval"  # fsync at most once per fsync_interval seconds
+FSYNC_ALWAYS = "always"      # fsync after every flush
+
+_LINE = 0
+_ROW = 1
+_RECORD = 2
+_FLUSH = 3
+_STOP = 4
+
+
+class BatchedWriter:
+    """Single writer thread fed by a bounded queue
+
+    write_line() and write_row() never touch the disk; when the queue is
+    full the record is dropped and counted (or the caller blocks, if
+    block_when_full is set) so a burst cannot stall the detectors. Once
+    close() has been called, writes are refused and counted as dropped
+    until start() is called again.
+    """
+
+    def __init__(self, max_queue=10000, batch_size=512, flush_bytes=64 * 1024,
+                 flush_interval=1.0, fsync_policy=FSYNC_INTERVAL, fsync_interval=5.0,
+                 block_when_full=False, rotation=None, metrics=None):
+        self.batch_size = batch_size
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.block_when_full = block_when_full
+        self.rotation = rotation
+        self.metrics = metrics  # Optional self_metrics.SelfMetrics: batch write/flush latency
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._files = {}
+        self._csv_writers = {}
+        self._sinks = {}  # sink -> records waiting for the end of the batch
+        self._started = {}  # path -> when the active file was started (for rotation)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._submit_lock = threading.Lock()  # Orders writes against close()
+        self._closed = False
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+        self._last_fsync = time.monotonic()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.fsyncs = 0
+        self.errors = 0
+        self.rotations = 0
+        self.max_depth = 0
+
+    # Producer side
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name="netsnoop-writer", daemon=True)
+                self._thread.start()
+
+    def _submit(self, item):
+        # Under the lock, so every accepted item is queued ahead of close()'s _STOP
+        with self._submit_lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            if self._thread is None:
+                self.start()
+            try:
+                if self.block_when_full:
+                    self._queue.put(item)
+                else:
+                    self._queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        self.enqueued += 1
+        depth = self._queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+        return True
+
+    def write_line(self, path, text):
+        """Queue text (including its newline) to be appended to path"""
+        return self._submit((_LINE, path, text, None))
+
+    def write_row(self, path, fieldnames, row):
+        """Queue a CSV row (dict) to be appended to path"""
+        return self._submit((_ROW, path, row, fieldnames))
+
+    def write_record(self, sink, record):
+        """Queue a record for sink.write_batch(), called once per batch"""
+        return self._submit((_RECORD, sink, record, None))
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is written and flushed"""
+        done = threading.Event()
+        if self._thread is None or self._closed:
+            return self._thread is None  # close() flushes; True once it has finished
+        self._queue.put((_FLUSH, None, done, None))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Drain the queue, flush, fsync and close every file
+
+        Returns False if the writer is still draining after timeout; calling
+        close() again keeps waiting for it.
+        """
+        with self._submit_lock:
+            stopping = not self._closed
+            self._closed = True
+        if self._thread is None:
+            return True
+        if stopping:
+            self._queue.put((_STOP, None, None, None))
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"⚠️ Writer still draining {self._queue.qsize()} queued items after {timeout}s")
+            return False
+        self._thread = None
+        return True
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "max_queue_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "fsyncs": self.fsyncs,
+            "errors": self.errors,
+            "rotations": self.rotations,
+        }
+
+    # Writer thread
+
+    def _file(self, path):
+        f = self._files.get(path)
+        if f is None:
+            f = open(path, "a", newline="", encoding="utf-8")
+            self._files[path] = f
+            if self.rotation is not None:
+                self._started[path] = active_start(path)
+        return f
+
+    def _write(self, kind, path, payload, fieldnames):
+        f = self._file(path)
+        if kind == _LINE:
+            f.write(payload)
+            self._pending_bytes += len(payload)
+        else:
+            writer = self._csv_writers.get(path)
+            if writer is None or writer.fieldnames != fieldnames:
+                writer = csv.DictWriter(f, fieldnames=fieldnames)
+                self._csv_writers[path] = writer
+                if f.tell() == 0:
+                    writer.writeheader()  # New file, e.g. right after a rotation
+            writer.writerow(payload)
+            self._pending_bytes += 128  # Rough row size; only drives flush_bytes
+        self.written += 1
+
+    def _write_sinks(self):
+        for sink, records in self._sinks.items():
+            if records:
+                try:
+                    sink.write_batch(records)
+                    self.written += len(records)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"❌ Writer error for {type(sink).__name__}: {e}")
+                self._sinks[sink] = []
+
+    def _flush_files(self, force_fsync=False):
+        now = time.monotonic()
+        do_fsync = force_fsync or self.fsync_policy == FSYNC_ALWAYS or (
+            self.fsync_policy == FSYNC_INTERVAL and now - self._last_fsync >= self.fsync_interval)
+        for f in self._files.values():
+            try:
+                f.flush()
+                if do_fsync and self.fsync_policy != FSYNC_NEVER:
+                    os.fsync(f.fileno())
+            except OSError:
+                self.errors += 1
+        self.flushes += 1
+        if do_fsync and self.fsync_policy != FSYNC_NEVER:
+            self.fsyncs += 1
+            self._last_fsync = now
+        self._pending_bytes = 0
+        self._last_flush = now
+        if self.rotation is not None:
+            self._rotate_due(now)
+
+    def _rotate_due(self, now):
+        """Rotate every file over the size or age limit (files are flushed)"""
+        for path, f in list(self._files.items()):
+            try:
+                size = os.fstat(f.fileno()).st_size
+                if not self.rotation.due(size, self._started.get(path), time.time()):
+                    continue
+                f.close()
+                del self._files[path]
+                self._csv_writers.pop(path, None)
+                segment, _ = rotate(path, self._started.pop(path, None), self.rotation)
+                self.rotations += 1
+                print(f"🔄 Rotated {path} to segment {segment['number']} ({segment['bytes']} bytes)")
+            except OSError as e:
+                self.errors += 1
+                print(f"❌ Rotation error for {path}: {e}")
+
+    def _close_files(self):
+        self._write_sinks()
+        self._flush_files(force_fsync=True)
+        for sink in self._sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+        self._sinks.clear()
+        for f in self._files.values():
+            try:
+                f.close()
+            except OSError:
+                pass
+        self._files.clear()
+        self._csv_writers.clear()
+
+    def _handle(self, kind, path, payload, fieldnames):
+        """Apply one queued item; True for _STOP"""
+        if kind == _RECORD:
+            self._sinks.setdefault(path, []).append(payload)
+        elif kind == _FLUSH:
+            self._write_sinks()
+            self._flush_files()
+            payload.set()
+        elif kind == _STOP:
+            return True
+        else:
+            try:
+                self._write(kind, path, payload, fieldnames)
+            except (OSError, ValueError) as e:
+                self.errors += 1
+                print(f"❌ Writer error for {path}: {e}")
+        return False
+
+    def _run(self):
+        while True:
+            timeout = max(self.flush_interval - (time.monotonic() - self._last_flush), 0.01)
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                if self._pending_bytes:
+                    self._flush_files()
+                continue
+
+            started = time.perf_counter()
+            # Drain whatever else is already waiting, up to one batch
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            for item in batch:
+                stop = self._handle(*item) or stop
+            if stop:
+                # Whatever is still queued (e.g. a flush() racing close()) goes out too
+                while True:
+                    try:
+                        self._handle(*self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                self._close_files()
+                return
+
+            self._write_sinks()
+            if (self._pending_bytes >= self.flush_bytes
+                    or time.monotonic() - self._last_flush >= self.flush_interval):
+                self._flush_files()
+            if self.metrics is not None:
+                self.metrics.observe("write", time.perf_counter() - started)
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the monitor's hot paths on synthetic /proc trees
+Times the sweep, the procfs parsers, metadata lookups, script-name
+extraction, burst detection, CSV logging and the dashboard's CSV load for
+each tree size, appends the results to a JSON-lines file keyed by git
+revision, and compares them with the previous run on this host
+Usage: python3 netsnoop_bench.py [sizes] [rounds] [results_file] [cases]
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+DEFAULT_SIZES = (1000, 10000, 50000)
+RESULTS_FILE = "netsnoop_bench.jsonl"
+REGRESSION_THRESHOLD = 0.25  # Slower than the previous run by this fraction is flagged
+CASES = ("parsers", "sweep", "metadata", "script_name", "bursts", "csv_logging", "csv_parse", "dashboard_load")
+SCRIPT_NAME_REPEAT = 10  # Alerts keep naming the same commands
+BURST_PARENTS = 20       # Parents that fan out during the spawn storm
+BURST_CHILDREN = 12      # Children each of them spawns (over PROCESS_BURST_THRESHOLD)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def git_revision():
+    """Short commit hash, with "-dirty" for uncommitted changes, or "unknown\""""
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "diff", "--quiet", "HEAD", "--"], cwd=HERE).returncode != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return revision + ("-dirty" if dirty else "")
+
+
+def best_of(func, rounds, setup=None):
+    """Fastest of rounds calls of func(), each after an untimed setup()"""
+    best = float("inf")
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+class Suite:
+    """One synthetic /proc tree at a time, plus the monitor pointed at it
+
+    The monitor modules read NETSNOOP_PROC_ROOT at import, so main() sets
+    it to proc_root before importing them and every size is rebuilt in
+    place there.
+    """
+
+    def __init__(self, proc_root, work_dir, rounds):
+        self.proc_root = proc_root
+        self.work_dir = work_dir
+        self.rounds = rounds
+        self.fake = None
+        self.csv_file = os.path.join(work_dir, "anomalies.csv")
+        self.results = {}
+        self.rounds_logged = 0
+
+        import acm_monitor as monitor
+        from log_writer import BatchedWriter
+        self.monitor = monitor
+        # Blocks instead of dropping, so every row is in the timed writes
+        monitor.log_writer = BatchedWriter(block_when_full=True, flush_interval=60.0)
+        monitor.log_writer.start()
+        try:
+            import dashboard
+        except ImportError as e:
+            dashboard, self.dashboard_error = None, str(e)
+        self.dashboard = dashboard
+
+    def build(self, size):
+        from fake_procfs import build_fake_proc
+        shutil.rmtree(self.proc_root, ignore_errors=True)
+        start = time.perf_counter()
+        self.fake = build_fake_proc(self.proc_root, size)
+        print(f"📁 {len(self.fake.processes):,} fake processes built in {time.perf_counter() - start:.1f}s")
+
+    def record(self, case, size, seconds, ops, unit):
+        key = f"{case}@{size}"
+        self.results[key] = {"seconds": seconds, "ops": ops, "unit": unit}
+        print(f"  {case:<15} {seconds * 1000:10.2f} ms   {ops / seconds:12,.0f} {unit}/s")
+
+    def run(self, size, cases):
+        self.build(size)
+        for case in cases:
+            getattr(self, f"bench_{case}")(size)
+
+    # Cases
+
+    def bench_parsers(self, size):
+        from procfs import ProcReader
+        from proc_snapshot import SNAPSHOT_STAT_FIELDS, SNAPSHOT_STATUS_KEYS
+        reader = ProcReader(self.proc_root)
+        pids = self.fake.pids()
+
+        def parse():
+            for pid in pids:
+                reader.stat(pid, SNAPSHOT_STAT_FIELDS)
+                reader.status(pid, SNAPSHOT_STATUS_KEYS)
+        self.record("parsers", size, best_of(parse, self.rounds), len(pids), "PIDs")
+
+    def bench_sweep(self, size):
+        from procfs import ProcReader
+        from proc_snapshot import take_snapshot
+        reader = ProcReader(self.proc_root)
+        snapshot = take_snapshot(1, self.proc_root, (), reader)
+        seconds = best_of(lambda: take_snapshot(1, self.proc_root, (), reader), self.rounds)
+        self.record("sweep", size, seconds, len(snapshot), "PIDs")
+
+    def bench_metadata(self, size):
+        from process_cache import ProcessMetadataCache
+        from proc_snapshot import take_snapshot
+        snapshot = take_snapshot(1, self.proc_root)
+        cache = None
+
+        def fresh():
+            nonlocal cache
+            cache = ProcessMetadataCache(self.proc_root)
+
+        def lookup():
+            for proc in snapshot:
+                cache.lookup(proc, snapshot)
+        self.record("metadata", size, best_of(lookup, self.rounds, fresh), len(snapshot), "lookups")
+
+    def bench_script_name(self, size):
+        from cmdline_classifier import classify_cmdline
+        calls = [" ".join(proc.argv) for proc in self.fake.processes.values()] * SCRIPT_NAME_REPEAT
+        extract = self.monitor.extract_script_name_improved
+
+        def classify():
+            for cmd in calls:
+                extract(cmd)
+        seconds = best_of(classify, self.rounds, classify_cmdline.cache_clear)
+        self.record("script_name", size, seconds, len(calls), "cmdlines")
+
+    def bench_bursts(self, size):
+        """Sweep-fed burst detection: new-process bookkeeping plus the burst check"""
+        from burst_window import SlidingWindowCounter
+        from process_cache import ProcessMetadataCache
+        from proc_snapshot import take_snapshot
+        from state_tables import BoundedTable
+        monitor = self.monitor
+        monitor.anomaly_logger = monitor.AnomalyLogger(self.csv_file)
+        before = take_snapshot(1, self.proc_root)
+
+        # A spawn storm: a few script parents fan out, the rest of the tree churns a little
+        scripts = [proc for proc in self.fake.processes.values() if proc.comm == "python3"][:BURST_PARENTS]
+        spawned = []
+        for parent in scripts:
+            for n in range(BURST_CHILDREN):
+                spawned.append(self.fake.spawn(parent.pid, "sh", ["/bin/sh", "-c", f"echo {n}"], 900, parent.uid))
+        others = [proc for proc in self.fake.processes.values() if proc.comm == "bash"]
+        for parent in others[:max(size // 100, 1)]:
+            spawned.append(self.fake.spawn(parent.pid, "sleep", ["sleep", "1"], 700, parent.uid))
+        after = take_snapshot(2, self.proc_root)
+        seen_before = {(proc.pid, proc.starttime) for proc in before}
+
+        def fresh():
+            monitor.metadata_cache = ProcessMetadataCache(self.proc_root)
+            monitor.spawn_counter = SlidingWindowCounter(monitor.PROCESS_BURST_WINDOW, monitor.PROCESS_BURST_THRESHOLD)
+            monitor.script_spawn_counter = SlidingWindowCounter(monitor.PROCESS_BURST_WINDOW,
+                                                                monitor.PROCESS_BURST_THRESHOLD)
+            monitor.burst_alert_history = BoundedTable("burst_alert_history", monitor.STATE_TABLE_CAPACITY,
+                                                       ttl=monitor.BURST_COOLDOWN)
+            monitor.recent_processes.clear()
+            seen.clear()
+            seen.update(seen_before)
+
+        def detect():
+            with contextlib.redirect_stdout(io.StringIO()):
+                monitor.detect_new_processes(after, seen)
+                monitor.check_process_bursts(after)
+
+        seen = set()
+        seconds = best_of(detect, self.rounds, fresh)
+        self.record("bursts", size, seconds, len(spawned), "spawns")
+        monitor.log_writer.flush()
+        for proc in spawned:
+            self.fake.exit(proc.pid)
+
+    def bench_csv_logging(self, size):
+        """AnomalyLogger rows through the batched writer until they are on disk"""
+        monitor = self.monitor
+        commands = [" ".join(proc.argv) or proc.comm for proc in list(self.fake.processes.values())[:1000]]
+        reasons = ["High memory usage: {n:.1f}MB (Severity: HIGH)", "High CPU usage: {n:.1f}% (Severity: CRITICAL)",
+                   "Process burst: {n:.0f} processes spawned rapidly (spawned by job.py)"]
+
+        def fresh():
+            # A new file each round: the writer keeps its files open by path
+            self.rounds_logged += 1
+            self.csv_file = os.path.join(self.work_dir, f"anomalies_{size}_{self.rounds_logged}.csv")
+            monitor.anomaly_logger = monitor.AnomalyLogger(self.csv_file)
+
+        def log():
+            for n in range(size):
+                command = commands[n % len(commands)]
+                monitor.anomaly_logger.log_anomaly(
+                    command.split()[0].rsplit("/", 1)[-1], reasons[n % len(reasons)].format(n=n % 500 + 50.0),
+                    pid=1000 + n, severity="HIGH", user="user1000", command=command,
+                )
+            monitor.log_writer.flush(timeout=60.0)
+        self.record("csv_logging", size, best_of(log, self.rounds, fresh), size, "rows")
+
+    def bench_csv_parse(self, size):
+        from anomaly_schema import load_frame
+        if not os.path.exists(self.csv_file):
+            self.bench_csv_logging(size)
+        rows = len(load_frame(self.csv_file))
+        self.record("csv_parse", size, best_of(lambda: load_frame(self.csv_file), self.rounds), rows, "rows")
+
+    def bench_dashboard_load(self, size):
+        dashboard = self.dashboard
+        if dashboard is None:
+            print(f"  {'dashboard_load':<15} skipped ({self.dashboard_error})")
+            return
+        if not os.path.exists(self.csv_file):
+            self.bench_csv_logging(size)
+        # A cold load: the cached incremental loader is dropped every round
+        seconds = best_of(lambda: dashboard.load_anomaly_data(self.csv_file), self.rounds,
+                          dashboard.get_anomaly_loader.clear)
+        self.record("dashboard_load", size, seconds, len(dashboard.load_anomaly_data(self.csv_file)), "rows")
+
+    def close(self):
+        self.monitor.log_writer.close()
+
+
+def load_runs(path):
+    runs = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        runs.append(json.loads(line))
+                    except ValueError:
+                        continue
+    except FileNotFoundError:
+        pass
+    return runs
+
+
+def compare(results, previous):
+    """Print the change against the previous run; returns the regressed case names"""
+    print(f"\n📊 Against {previous['revision']} ({previous['date']}):")
+    regressions = []
+    for key, result in results.items():
+        before = previous["results"].get(key)
+        if not before:
+            print(f"  {key:<24} {result['seconds'] * 1000:10.2f} ms   (new)")
+            continue
+        change = result["seconds"] / before["seconds"] - 1.0
+        flag = ""
+        if change > REGRESSION_THRESHOLD:
+            flag = "  ⚠️  REGRESSION"
+            regressions.append(key)
+        elif change < -REGRESSION_THRESHOLD:
+            flag = "  ⚡"
+        print(f"  {key:<24} {before['seconds'] * 1000:10.2f} -> {result['seconds'] * 1000:10.2f} ms "
+              f"{change * 100:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else list(DEFAULT_SIZES)
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    results_file = os.path.abspath(sys.argv[3] if len(sys.argv) > 3 else RESULTS_FILE)
+    cases = sys.argv[4].split(",") if len(sys.argv) > 4 else list(CASES)
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        print(f"❌ Unknown case(s): {', '.join(sorted(unknown))} (choose from {', '.join(CASES)})")
+        sys.exit(2)
+
+    base = tempfile.mkdtemp(prefix="netsnoop-bench-")
+    proc_root = os.path.join(base, "proc")
+    work_dir = os.path.join(base, "work")
+    os.makedirs(work_dir)
+    os.environ["NETSNOOP_PROC_ROOT"] = proc_root
+    sys.path.insert(0, HERE)
+    cwd = os.getcwd()
+    os.chdir(work_dir)  # The monitor's log and CSV files are relative paths
+    try:
+        suite = Suite(proc_root, work_dir, rounds)
+        try:
+            for size in sizes:
+                print(f"\n🧪 {size:,} PIDs, best of {rounds} rounds")
+                suite.run(size, cases)
+        finally:
+            suite.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(base, ignore_errors=True)
+
+    run = {
+        "revision": git_revision(),
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "rounds": rounds,
+        "results": suite.results,
+    }
+    previous = [r for r in load_runs(results_file) if r.get("host") == run["host"]]
+    with open(results_file, "a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"\n💾 Results for {run['revision']} appended to {results_file}")
+
+    if previous and compare(suite.results, previous[-1]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Plumbing for running the monitor as a pipeline of processes
+Bounded queues between stages (a full queue blocks the producer, so a slow
+stage slows the one before it instead of growing memory), per-stage
+throughput meters, and a BatchedWriter stand-in that forwards every write
+to the writer process
+"""
+
+import queue
+import time
+
+STOP = "stop"  # Sent down a channel after the last item
+
+_LINE = "line"
+_ROW = "row"
+_RECORD = "record"
+
+
+class StageMeter:
+    """Items handled by one stage and where its time went
+
+    Time blocked on a full output queue and time waiting on an empty input
+    queue are measured by the Channel; a stage that sleeps between ticks
+    adds that to idle itself. The rest of the wall time is busy.
+    """
+
+    __slots__ = ("name", "items", "blocked", "idle", "stalls", "max_depth", "_last")
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.blocked = 0.0  # seconds in put() on a full queue
+        self.idle = 0.0     # seconds in get() on an empty queue (or sleeping)
+        self.stalls = 0     # put() calls that found the queue full
+        self.max_depth = 0
+        self._last = (time.monotonic(), 0, 0.0, 0.0, 0)
+
+    def handled(self, n=1):
+        self.items += n
+
+    def report(self):
+        """Rates and time shares since the last report"""
+        now = time.monotonic()
+        start, items, blocked, idle, stalls = self._last
+        self._last = (now, self.items, self.blocked, self.idle, self.stalls)
+        elapsed = max(now - start, 1e-9)
+        max_depth, self.max_depth = self.max_depth, 0
+        return {
+            "stage": self.name,
+            "seconds": elapsed,
+            "items": self.items - items,
+            "per_second": (self.items - items) / elapsed,
+            "busy_percent": max(elapsed - (self.blocked - blocked) - (self.idle - idle), 0.0) * 100.0 / elapsed,
+            "blocked_seconds": self.blocked - blocked,
+            "stalls": self.stalls - stalls,
+            "max_depth": max_depth,
+        }
+
+
+def format_stage_report(report, unit="items"):
+    """One-line summary of a StageMeter.report() for the persistent log"""
+    return (f"{report['stage']}: {report['items']:,} {unit} in {report['seconds']:.0f}s "
+            f"({report['per_second']:.1f}/s), busy {report['busy_percent']:.1f}%, "
+            f"blocked {report['blocked_seconds']:.2f}s on a full queue ({report['stalls']} stalls), "
+            f"max output queue depth {report['max_depth']}")
+
+
+class Channel:
+    """Bounded multiprocessing queue from one stage to the next"""
+
+    def __init__(self, context, maxsize):
+        self.maxsize = maxsize
+        self._queue = context.Queue(maxsize)
+
+    def put(self, item, meter, timeout=None):
+        """Blocks while the queue is full (backpressure); False if timeout ran out"""
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            meter.stalls += 1
+            start = time.perf_counter()
+            try:
+                self._queue.put(item, timeout=timeout)
+            except queue.Full:
+                return False
+            finally:
+                meter.blocked += time.perf_counter() - start
+        depth = self.depth()
+        if depth > meter.max_depth:
+            meter.max_depth = depth
+        return True
+
+    def get(self, meter, timeout=None):
+        """Next item, or None if nothing arrived within timeout"""
+        start = time.perf_counter()
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        finally:
+            meter.idle += time.perf_counter() - start
+
+    def depth(self):
+        try:
+            return self._queue.qsize()
+        except NotImplementedError:  # macOS has no sem_getvalue
+            return 0
+
+
+class QueueWriter:
+    """Producer side of BatchedWriter in a stage process: every write goes to the writer process
+
+    Records for a sink (e.g. the SQLite store) travel as the sink's class
+    name and path; the writer process opens its own connection to it.
+    Writes block while the writer is behind, so nothing is dropped.
+    """
+
+    def __init__(self, channel, meter):
+        self.channel = channel
+        self.meter = meter
+        self.written = 0
+        self.dropped = 0
+
+    def start(self):
+        pass
+
+    def _submit(self, item):
+        self.channel.put(item, self.meter)
+        self.written += 1
+        return True
+
+    def write_line(self, path, text):
+        return self._submit((_LINE, path, text, None))
+
+    def write_row(self, path, fieldnames, row):
+        return self._submit((_ROW, path, row, fieldnames))
+
+    def write_record(self, sink, record):
+        return self._submit((_RECORD, (type(sink).__name__, sink.path), record, None))
+
+    def flush(self, timeout=5.0):
+        return True  # The writer process flushes on its own schedule
+
+    def close(self, timeout=5.0):
+        pass
+
+    def stats(self):
+        return {"queue_depth": self.channel.depth(), "enqueued": self.written, "dropped": self.dropped}
+
+
+def deliver(writer, item, sinks, open_sink):
+    """Hand a QueueWriter item to the real BatchedWriter; open_sink(name, path) opens a sink once"""
+    kind, target, payload, fieldnames = item
+    if kind == _LINE:
+        writer.write_line(target, payload)
+    elif kind == _ROW:
+        writer.write_row(target, fieldnames, payload)
+    else:
+        sink = sinks.get(target)
+        if sink is None:
+            sink = sinks[target] = open_sink(*target)
+        writer.write_record(sink, payload)
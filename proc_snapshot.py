@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Shared /proc sweep engine
+Walks /proc once per tick and builds an immutable process table that
+every detector in acm_monitor consumes
+"""
+
+import os
+import time
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+try:
+    from .procfs import (
+        PROC_ROOT, STAT_PPID, STAT_RSS, STAT_STARTTIME, STAT_STATE, STAT_STIME,
+        STAT_UTIME, UID_KEY, VMRSS_KEY, ProcReader, thread_reader
+    )
+except ImportError:
+    from procfs import (
+        PROC_ROOT, STAT_PPID, STAT_RSS, STAT_STARTTIME, STAT_STATE, STAT_STIME,
+        STAT_UTIME, UID_KEY, VMRSS_KEY, ProcReader, thread_reader
+    )
+
+PAGE_SIZE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 if hasattr(os, "sysconf") else 4
+
+# One row of the per-tick process table
+ProcessInfo = namedtuple(
+    "ProcessInfo",
+    ["pid", "comm", "ppid", "uid", "state", "utime", "stime", "rss_kb", "starttime"]
+)
+
+
+SNAPSHOT_STAT_FIELDS = (STAT_STATE, STAT_PPID, STAT_UTIME, STAT_STIME, STAT_STARTTIME, STAT_RSS)
+SNAPSHOT_STATUS_KEYS = (UID_KEY, VMRSS_KEY)
+
+
+def read_total_jiffies(proc_root=PROC_ROOT, reader=None):
+    """Total CPU time across all CPUs from the aggregate line of /proc/stat"""
+    reader = reader or thread_reader(proc_root)
+    line = reader.first_line(f"{proc_root}/stat")
+    if not line:
+        return 0
+    try:
+        # Skip the "cpu" label; guest time is already counted in user/nice
+        return sum(int(value) for value in line.split()[1:9])
+    except ValueError:
+        return 0
+
+
+def read_process(pid, proc_root=PROC_ROOT, reader=None):
+    """Read one process row, or None if it vanished or is unreadable"""
+    reader = reader or thread_reader(proc_root)
+    parsed = reader.stat(pid, SNAPSHOT_STAT_FIELDS)
+    if parsed is None:
+        return None
+    comm, (state, ppid, utime, stime, starttime, rss_pages) = parsed
+
+    status = reader.status(pid, SNAPSHOT_STATUS_KEYS)
+    if status is None:
+        return None
+    uid, rss_kb = status
+    if rss_kb is None:  # Kernel threads have no VmRSS line
+        rss_kb = rss_pages * PAGE_SIZE_KB
+
+    return ProcessInfo(pid, comm, ppid, uid or 0, state, utime, stime, rss_kb, starttime)
+
+
+class ProcessSnapshot:
+    """Immutable process table captured by a single /proc sweep
+
+    With adaptive sampling some rows are carried over unchanged from the
+    previous snapshot; sampled maps each PID to the seq of the sweep that
+    last read it (None when every row was read by this sweep).
+    """
+
+    __slots__ = ("seq", "timestamp", "processes", "cpu_total", "sampled")
+
+    def __init__(self, seq, timestamp, processes, cpu_total=0, sampled=None):
+        self.seq = seq
+        self.timestamp = timestamp
+        self.processes = MappingProxyType(processes)
+        self.cpu_total = cpu_total
+        self.sampled = sampled
+
+    def __len__(self):
+        return len(self.processes)
+
+    def __iter__(self):
+        return iter(self.processes.values())
+
+    def __contains__(self, pid):
+        return pid in self.processes
+
+    def get(self, pid):
+        return self.processes.get(pid)
+
+    def pids(self):
+        return self.processes.keys()
+
+    def is_fresh(self, pid, after_seq=0):
+        """Whether a PID's row was read from /proc by a sweep newer than after_seq"""
+        return (self.seq if self.sampled is None else self.sampled.get(pid, 0)) > after_seq
+
+    def fresh(self, after_seq=0):
+        """Rows read from /proc by a sweep newer than after_seq"""
+        if self.sampled is None:
+            return iter(self.processes.values()) if self.seq > after_seq else iter(())
+        sampled = self.sampled
+        return (proc for pid, proc in self.processes.items() if sampled[pid] > after_seq)
+
+    def rss_mb(self, pid):
+        """Resident memory of a process in MB, or None if it is not in the table"""
+        proc = self.processes.get(pid)
+        return proc.rss_kb / 1024 if proc else None
+
+
+def take_snapshot(seq=0, proc_root=PROC_ROOT, exclude_pids=(), reader=None, previous=None, scheduler=None):
+    """Walk /proc once and return a ProcessSnapshot
+
+    With a scheduler (sampling_scheduler.SamplingScheduler) and the previous
+    snapshot, PIDs that are not due keep their previous row instead of
+    being re-read; new PIDs are always read.
+    """
+    reader = reader or thread_reader(proc_root)
+    processes = {}
+    cpu_total = read_total_jiffies(proc_root, reader)
+    adaptive = scheduler is not None
+    previous_rows = previous.processes if adaptive and previous is not None else {}
+    previous_sampled = previous.sampled if previous_rows and previous.sampled is not None else {}
+    sampled = {} if adaptive else None
+    if adaptive:
+        scheduler.begin()
+    now = time.time()
+
+    for entry in os.listdir(proc_root):
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        if pid in exclude_pids:
+            continue
+        if adaptive:
+            row = previous_rows.get(pid)
+            if row is not None and not scheduler.due(pid, now):
+                processes[pid] = row
+                sampled[pid] = previous_sampled.get(pid, previous.seq)
+                continue
+        proc = read_process(pid, proc_root, reader)
+        if proc is not None:
+            processes[pid] = proc
+            if adaptive:
+                sampled[pid] = seq
+                scheduler.observe(proc, cpu_total, now)
+    if adaptive:
+        scheduler.prune(processes)
+    return ProcessSnapshot(seq, time.time(), processes, cpu_total, sampled)
+
+
+class CpuSampler:
+    """Delta-based per-process CPU usage between two snapshots
+
+    Remembers utime+stime per (pid, starttime) so a recycled PID never
+    inherits another process's counters, and divides the jiffy delta by the
+    system-wide delta from /proc/stat. Percentages are relative to one core,
+    like top(1), so a process saturating two cores reports 200%.
+    """
+
+    def __init__(self, num_cpus=None):
+        self.num_cpus = num_cpus or os.cpu_count() or 1
+        self._previous = {}  # (pid, starttime) -> (row, cpu_total when sampled, cpu_percent)
+
+    def sample(self, snapshot):
+        """Return {pid: cpu_percent} for processes also present in the last sample
+
+        A row carried over from an earlier sweep (adaptive sampling) keeps
+        the percentage computed when it was read; a re-read row is measured
+        against the system-wide jiffies since its own previous read.
+        """
+        previous = self._previous
+        current = {}
+        usage = {}
+        for proc in snapshot:
+            key = (proc.pid, proc.starttime)
+            before = previous.get(key)
+            if before is None:
+                current[key] = (proc, snapshot.cpu_total, None)
+                continue
+            row, total, percent = before
+            total_delta = snapshot.cpu_total - total
+            if row is proc or total_delta <= 0:
+                current[key] = before
+            else:
+                jiffies = (proc.utime + proc.stime) - (row.utime + row.stime)
+                percent = max(jiffies, 0) * 100.0 * self.num_cpus / total_delta
+                current[key] = (proc, snapshot.cpu_total, percent)
+            if percent is not None:
+                usage[proc.pid] = percent
+        self._previous = current
+        return usage
+
+
+class SnapshotEngine:
+    """Produces one snapshot per tick and hands it to any number of consumers
+
+    The sweeping thread calls sweep(); detector threads call wait_for()
+    with the sequence number they last saw and block until a newer
+    snapshot is published.
+    """
+
+    def __init__(self, proc_root=PROC_ROOT, exclude_pids=None, scheduler=None):
+        self.proc_root = proc_root
+        self.exclude_pids = frozenset(exclude_pids or (os.getpid(),))
+        self.scheduler = scheduler  # Optional SamplingScheduler: re-read only PIDs that are due
+        self.reader = ProcReader(proc_root)
+        self._seq = 0
+        self._latest = None
+        self._cond = threading.Condition()
+
+    @property
+    def latest(self):
+        return self._latest
+
+    def sweep(self):
+        """Take a fresh snapshot and publish it to waiting consumers"""
+        snapshot = take_snapshot(self._seq + 1, self.proc_root, self.exclude_pids, self.reader,
+                                 self._latest, self.scheduler)
+        with self._cond:
+            self._seq = snapshot.seq
+            self._latest = snapshot
+            self._cond.notify_all()
+        return snapshot
+
+    def wait_for(self, after_seq=0, timeout=None):
+        """Block until a snapshot newer than after_seq exists, then return it"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > after_seq, timeout)
+            return self._latest
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+PID-reuse-safe process metadata cache
+Holds comm, cmdline, uid, resolved username and parent identity per
+(pid, starttime) so long-lived processes are not re-read on every alert
+"""
+
+import threading
+from collections import namedtuple
+
+try:
+    import pwd
+except ImportError:  # Not available on Windows
+    pwd = None
+
+try:
+    from .proc_snapshot import PROC_ROOT, read_process
+    from .procfs import thread_reader
+except ImportError:
+    from proc_snapshot import PROC_ROOT, read_process
+    from procfs import thread_reader
+
+ProcessMetadata = namedtuple(
+    "ProcessMetadata",
+    ["pid", "starttime", "comm", "cmdline", "uid", "user", "ppid", "parent_starttime"]
+)
+
+
+class ProcessMetadataCache:
+    """Metadata cache keyed by pid and validated against starttime
+
+    An entry is reused only while the snapshot row still has the same
+    starttime (so a recycled PID gets a fresh entry) and the same comm and
+    uid (so an exec or setuid is noticed even without process events).
+    Parent identity is refreshed in place when a process is reparented.
+    """
+
+    def __init__(self, proc_root=PROC_ROOT):
+        self.proc_root = proc_root
+        self._entries = {}
+        self._users = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.file_opens = 0
+
+    def username(self, uid):
+        """Resolve a uid once and remember it"""
+        name = self._users.get(uid)
+        if name is None:
+            try:
+                name = pwd.getpwuid(uid).pw_name
+            except (AttributeError, KeyError, TypeError):
+                name = str(uid)
+            self._users[uid] = name
+        return name
+
+    def lookup(self, proc, snapshot=None):
+        """Return metadata for a snapshot row, reading /proc only on a miss"""
+        parent = snapshot.get(proc.ppid) if snapshot is not None else None
+        parent_starttime = parent.starttime if parent else None
+
+        with self._lock:
+            entry = self._entries.get(proc.pid)
+            if (entry is not None and entry.starttime == proc.starttime
+                    and entry.comm == proc.comm and entry.uid == proc.uid):
+                self.hits += 1
+                if entry.ppid != proc.ppid or (parent_starttime is not None
+                                               and entry.parent_starttime != parent_starttime):
+                    entry = entry._replace(ppid=proc.ppid, parent_starttime=parent_starttime)
+                    self._entries[proc.pid] = entry
+                return entry
+            self.misses += 1
+
+        entry = ProcessMetadata(
+            proc.pid, proc.starttime, proc.comm, self.read_cmdline(proc.pid),
+            proc.uid, self.username(proc.uid), proc.ppid, parent_starttime
+        )
+        with self._lock:
+            self._entries[proc.pid] = entry
+        return entry
+
+    def get(self, pid, snapshot=None):
+        """Metadata for a pid, using the snapshot row when there is one"""
+        proc = snapshot.get(pid) if snapshot is not None else None
+        if proc is None:
+            self.file_opens += 2
+            proc = read_process(pid, self.proc_root)
+            if proc is None:
+                return None
+        return self.lookup(proc, snapshot)
+
+    def parent_of(self, entry, snapshot=None):
+        """Metadata for the parent recorded in an entry"""
+        if not entry or not entry.ppid:
+            return None
+        return self.get(entry.ppid, snapshot)
+
+    def invalidate(self, pid):
+        """Drop an entry whose process has exec'd a new image"""
+        with self._lock:
+            self._entries.pop(pid, None)
+
+    evict = invalidate  # Process exited
+
+    def prune(self, snapshot):
+        """Evict entries for processes that are gone or whose PID was reused"""
+        with self._lock:
+            for pid, entry in list(self._entries.items()):
+                proc = snapshot.get(pid)
+                if proc is None or proc.starttime != entry.starttime:
+                    del self._entries[pid]
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "file_opens": self.file_opens,
+        }
+
+    def read_cmdline(self, pid):
+        """Current command line of a PID straight from /proc ("N/A" if unreadable)"""
+        self.file_opens += 1
+        return thread_reader(self.proc_root).cmdline(pid) or "N/A"
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Event-driven process lifecycle source
+Subscribes to fork/exec/exit notifications from the kernel's netlink proc
+connector so short-lived children are seen even if they exit between two
+/proc sweeps. Needs CAP_NET_ADMIN; callers fall back to polling when
+ProcConnectorSource.open() returns None.
+
+Run directly to measure detection latency and sustained events/second,
+optionally while generating a fork storm of N short-lived children:
+    sudo python3 process_events.py [seconds] [N]
+"""
+
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+# linux/netlink.h, linux/connector.h, linux/cn_proc.h
+NETLINK_CONNECTOR = 11
+NLMSG_DONE = 3
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_EXIT = 0x80000000
+
+NLMSGHDR = struct.Struct("=IHHII")
+CN_MSG = struct.Struct("=IIIIHH")
+PROC_EVENT_HEADER = struct.Struct("=IIQ")
+FORK_EVENT = struct.Struct("=IIII")
+PID_EVENT = struct.Struct("=II")
+
+EVENT_OFFSET = NLMSGHDR.size + CN_MSG.size
+DATA_OFFSET = EVENT_OFFSET + PROC_EVENT_HEADER.size
+RECV_BUFFER_SIZE = 64 * 1024
+
+# kind is "fork", "exec" or "exit"; ppid is only meaningful for forks.
+# timestamp is wall-clock seconds, latency is kernel-to-userspace seconds.
+ProcessEvent = namedtuple("ProcessEvent", ["kind", "pid", "ppid", "timestamp", "latency"])
+
+
+def _control_message(op):
+    """Build the netlink message that (un)subscribes from proc events"""
+    payload = struct.pack("=I", op)
+    cn_msg = CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+    header = NLMSGHDR.pack(NLMSGHDR.size + len(cn_msg), NLMSG_DONE, 0, 0, os.getpid())
+    return header + cn_msg
+
+
+class ProcConnectorSource:
+    """Background reader of kernel process lifecycle events
+
+    Only thread-group leaders are reported, so thread creation inside a
+    process does not look like a fork storm. The callback runs on the
+    reader thread and must be cheap.
+    """
+
+    def __init__(self, sock, callback):
+        self._sock = sock
+        self._callback = callback
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._started_at = None
+        self._events = 0
+        self._overruns = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+
+    @classmethod
+    def open(cls, callback):
+        """Subscribe to the proc connector, or return None if unavailable"""
+        sock = None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+            sock.bind((os.getpid(), CN_IDX_PROC))
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+            sock.send(_control_message(PROC_CN_MCAST_LISTEN))
+        except (AttributeError, OSError):
+            # No AF_NETLINK (non-Linux) or missing CAP_NET_ADMIN
+            if sock is not None:
+                sock.close()
+            return None
+        return cls(sock, callback)
+
+    def start(self):
+        self._running = True
+        self._started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        try:
+            self._sock.send(_control_message(PROC_CN_MCAST_IGNORE))
+        except OSError:
+            pass
+        self._sock.close()
+
+    def stats(self):
+        """Events seen, sustained events/second, detection latency and overruns"""
+        with self._lock:
+            events = self._events
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+            return {
+                "events": events,
+                "events_per_second": events / elapsed if elapsed > 0 else 0.0,
+                "avg_latency_ms": self._latency_total / events * 1000 if events else 0.0,
+                "max_latency_ms": self._latency_max * 1000,
+                "overruns": self._overruns,
+            }
+
+    def _run(self):
+        while self._running:
+            try:
+                data = self._sock.recv(RECV_BUFFER_SIZE)
+            except OSError:
+                if not self._running:
+                    break
+                # ENOBUFS: the kernel dropped events because we fell behind
+                with self._lock:
+                    self._overruns += 1
+                continue
+
+            offset = 0
+            while offset + DATA_OFFSET <= len(data):
+                msg_len = NLMSGHDR.unpack_from(data, offset)[0]
+                if msg_len < DATA_OFFSET:
+                    break
+                self._handle(data, offset)
+                offset += (msg_len + 3) & ~3
+
+    def _handle(self, data, offset):
+        what, _cpu, timestamp_ns = PROC_EVENT_HEADER.unpack_from(data, offset + EVENT_OFFSET)
+        body = offset + DATA_OFFSET
+
+        if what == PROC_EVENT_FORK:
+            _parent_pid, parent_tgid, child_pid, child_tgid = FORK_EVENT.unpack_from(data, body)
+            if child_pid != child_tgid:
+                return  # New thread, not a new process
+            kind, pid, ppid = "fork", child_tgid, parent_tgid
+        elif what == PROC_EVENT_EXEC or what == PROC_EVENT_EXIT:
+            pid, tgid = PID_EVENT.unpack_from(data, body)
+            if pid != tgid:
+                return
+            kind, ppid = ("exec" if what == PROC_EVENT_EXEC else "exit"), 0
+        else:
+            return
+
+        # The kernel stamps events with CLOCK_MONOTONIC
+        latency = max(time.monotonic_ns() - timestamp_ns, 0) / 1e9
+        with self._lock:
+            self._events += 1
+            self._latency_total += latency
+            if latency > self._latency_max:
+                self._latency_max = latency
+
+        try:
+            self._callback(ProcessEvent(kind, pid, ppid, time.time() - latency, latency))
+        except Exception:
+            pass
+
+
+def _fork_storm(count):
+    """Spawn and reap count children as fast as possible"""
+    for _ in range(count):
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+    storm = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    source = ProcConnectorSource.open(lambda event: None)
+    if source is None:
+        print("❌ Proc connector unavailable (requires Linux and CAP_NET_ADMIN)")
+        return 1
+
+    print(f"🔍 Listening for process events for {duration:.0f}s...")
+    source.start()
+    started = time.monotonic()
+    if storm:
+        _fork_storm(storm)
+    time.sleep(max(duration - (time.monotonic() - started), 0))
+    stats = source.stats()
+    source.stop()
+
+    print(f"📊 Events: {stats['events']} ({stats['events_per_second']:.1f}/s)")
+    print(f"⏱️  Latency: avg {stats['avg_latency_ms']:.3f} ms, max {stats['max_latency_ms']:.3f} ms")
+    print(f"⚠️  Receive buffer overruns: {stats['overruns']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
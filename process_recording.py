@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Record and replay of the monitor's process table
+A capture is a gzip'd JSON-lines file: a header, then one line per sweep
+holding only the rows that changed, the PIDs that exited and the command
+line and user of each new process. Replay rebuilds every snapshot from it
+so acm_monitor.replay_recording() can run the detectors offline; the same
+records carry the sweeps between the processes of the pipeline mode
+Usage: python3 process_recording.py record <capture> [seconds] [interval]
+       python3 process_recording.py replay <capture> [speed] [NAME=VALUE ...]
+       python3 process_recording.py info <capture>
+"""
+
+import gzip
+import json
+import os
+import platform
+import sys
+import threading
+import time
+
+try:
+    from .proc_snapshot import ProcessInfo, ProcessSnapshot
+    from .process_cache import ProcessMetadataCache
+except ImportError:
+    from proc_snapshot import ProcessInfo, ProcessSnapshot
+    from process_cache import ProcessMetadataCache
+
+CAPTURE_VERSION = 1
+SPAWN_FIELDS = ("pid", "ppid", "name", "user", "cmd", "time", "script")
+
+
+class DeltaEncoder:
+    """Turns each sweep into a record holding only what changed since the last one
+
+    A row goes out when it was read by the sweep and differs from the last
+    one sent; the cmdline and user go with the first row of each process
+    identity (pid, starttime, comm, uid), so an exec is noticed. With
+    adaptive sampling the PIDs re-read unchanged are listed too, because a
+    rebuilt CPU sample must know which rows were measured. Spawns reported
+    by kernel events (spawn()) go out with the next sweep.
+    """
+
+    def __init__(self):
+        self._previous = {}   # pid -> row as last sent
+        self._described = {}  # pid -> identity whose cmdline/user were sent
+        self._spawns = []
+        self._lock = threading.Lock()
+        self.sweeps = 0
+        self.rows = 0
+
+    def spawn(self, entry):
+        """Remember a spawn entry (a dict as built for record_spawn); safe from any thread"""
+        with self._lock:
+            self._spawns.append(entry)
+
+    def encode(self, snapshot, describe):
+        """Record for one sweep; describe(proc) returns (cmdline, user) for a new process"""
+        previous, described = self._previous, self._described
+        sampled = snapshot.sampled
+        rows, meta, reread = [], [], []
+        for proc in snapshot:
+            pid = proc.pid
+            if sampled is not None and sampled[pid] != snapshot.seq:
+                continue  # Carried over from an earlier sweep, not read by this one
+            if previous.get(pid) != proc:
+                rows.append(list(proc))
+                previous[pid] = proc
+            elif sampled is not None:
+                reread.append(pid)
+            identity = (proc.starttime, proc.comm, proc.uid)
+            if described.get(pid) != identity:
+                cmdline, user = describe(proc)
+                meta.append([pid, cmdline, user])
+                described[pid] = identity
+        gone = [pid for pid in previous if pid not in snapshot.processes]
+        for pid in gone:
+            del previous[pid]
+            described.pop(pid, None)
+        with self._lock:
+            spawns, self._spawns = self._spawns, []
+
+        record = {"seq": snapshot.seq, "t": round(snapshot.timestamp, 3), "cpu": snapshot.cpu_total}
+        if rows:
+            record["rows"] = rows
+        if gone:
+            record["gone"] = gone
+        if meta:
+            record["meta"] = meta
+        if sampled is not None:
+            record["reread"] = reread
+        if spawns:
+            record["spawns"] = [[entry.get(field) for field in SPAWN_FIELDS] for entry in spawns]
+        self.sweeps += 1
+        self.rows += len(rows)
+        return record
+
+
+class Recorder(DeltaEncoder):
+    """Appends the encoded sweeps to a capture file"""
+
+    def __init__(self, path, num_cpus=None, events=False, flush_interval=5.0):
+        super().__init__()
+        self.path = path
+        self.flush_interval = flush_interval
+        self._file = gzip.open(path, "wb")
+        self._last_flush = time.monotonic()
+        self.write({
+            "netsnoop_capture": CAPTURE_VERSION, "started": time.time(), "host": platform.node(),
+            "num_cpus": num_cpus or os.cpu_count() or 1, "events": events,
+        })
+
+    def write(self, record):
+        """Append one record, e.g. from encode() (already called by record())"""
+        self._file.write(json.dumps(record, separators=(",", ":")).encode() + b"\n")
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()  # A sync flush: everything so far is readable if the monitor dies
+            self._last_flush = now
+
+    def record(self, snapshot, describe):
+        """Encode and write one sweep"""
+        self.write(self.encode(snapshot, describe))
+
+    def stats(self):
+        fileobj = self._file.fileobj  # None once closed
+        size = fileobj.tell() if fileobj is not None else os.path.getsize(self.path)
+        return {"sweeps": self.sweeps, "rows": self.rows, "bytes": size}
+
+    def close(self):
+        self._file.close()
+
+
+class DeltaDecoder:
+    """Rebuilds snapshots from DeltaEncoder records, applied in order
+
+    Also stands in for the monitor's SnapshotEngine (latest) and /proc: the
+    cmdline of every live process and the name of every uid are known from
+    the records. Rows that were re-read but unchanged get a fresh object,
+    like a real sweep, so CpuSampler measures them instead of carrying
+    their previous percentage.
+    """
+
+    def __init__(self, num_cpus=None, events=False):
+        self.num_cpus = num_cpus or os.cpu_count() or 1
+        self.events = events
+        self.latest = None
+        self.cmdlines = {}  # pid -> cmdline of the process now holding it
+        self.users = {}     # uid -> user name
+        self.sweeps = 0
+        self._processes = {}
+        self._sampled = {}  # pid -> seq of the sweep that last read it
+
+    def now(self):
+        """Time of the current sweep (a replacement for time.time)"""
+        return self.latest.timestamp if self.latest is not None else time.time()
+
+    def apply(self, record):
+        """(snapshot, spawns) for the next record; spawns are record_spawn() entries"""
+        processes, sampled = self._processes, self._sampled
+        seq = record["seq"]
+        for pid in record.get("gone", ()):
+            processes.pop(pid, None)
+            sampled.pop(pid, None)
+            self.cmdlines.pop(pid, None)
+
+        adaptive = "reread" in record
+        current = dict(processes) if adaptive else {
+            pid: ProcessInfo._make(proc) for pid, proc in processes.items()
+        }
+        for row in record.get("rows", ()):
+            proc = ProcessInfo._make(row)
+            current[proc.pid] = proc
+            sampled[proc.pid] = seq
+        for pid in record.get("reread", ()):
+            current[pid] = ProcessInfo._make(current[pid])
+            sampled[pid] = seq
+        for pid, cmdline, user in record.get("meta", ()):
+            self.cmdlines[pid] = cmdline
+            self.users[current[pid].uid] = user
+        self._processes = current
+
+        snapshot = ProcessSnapshot(seq, record["t"], current, record["cpu"],
+                                   dict(sampled) if adaptive else None)
+        self.latest = snapshot
+        self.sweeps += 1
+        return snapshot, [dict(zip(SPAWN_FIELDS, values)) for values in record.get("spawns", ())]
+
+
+class Replayer(DeltaDecoder):
+    """Rebuilds the snapshots of a capture file in order"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = gzip.open(path, "rt", encoding="utf-8")
+        try:
+            self.header = json.loads(self._file.readline())
+        except ValueError:
+            self.header = {}
+        if self.header.get("netsnoop_capture") != CAPTURE_VERSION:
+            self._file.close()
+            raise ValueError(f"{path} is not a version {CAPTURE_VERSION} NetSnoop capture")
+        super().__init__(self.header["num_cpus"], self.header.get("events", False))
+
+    def now(self):
+        """Recorded time of the current sweep (a replacement for time.time)"""
+        return self.latest.timestamp if self.latest is not None else self.header["started"]
+
+    def _records(self):
+        """Sweep records up to the end, or up to what a still-running recorder has flushed"""
+        try:
+            for line in self._file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return  # Torn last line
+        except EOFError:
+            return  # No end-of-stream marker yet
+        finally:
+            self._file.close()
+
+    def __iter__(self):
+        """Yields (snapshot, spawns) per recorded sweep"""
+        for record in self._records():
+            yield self.apply(record)
+
+
+class ReplayMetadataCache(ProcessMetadataCache):
+    """ProcessMetadataCache that answers from a DeltaDecoder instead of /proc"""
+
+    def __init__(self, decoder):
+        super().__init__()
+        self.decoder = decoder
+
+    def username(self, uid):
+        return self.decoder.users.get(uid) or str(uid)
+
+    def read_cmdline(self, pid):
+        return self.decoder.cmdlines.get(pid) or "N/A"
+
+    def get(self, pid, snapshot=None):
+        snapshot = snapshot if snapshot is not None else self.decoder.latest
+        proc = snapshot.get(pid) if snapshot is not None else None
+        return self.lookup(proc, snapshot) if proc is not None else None
+
+
+def record_standalone(path, seconds, interval=1.0):
+    """Capture sweeps of the live /proc without running the detectors"""
+    try:
+        from .proc_snapshot import SnapshotEngine
+    except ImportError:
+        from proc_snapshot import SnapshotEngine
+    engine = SnapshotEngine()
+    cache = ProcessMetadataCache()
+    recorder = Recorder(path)
+
+    def describe(proc):
+        meta = cache.lookup(proc, engine.latest)
+        return meta.cmdline, meta.user
+
+    deadline = time.monotonic() + seconds
+    try:
+        while time.monotonic() < deadline:
+            snapshot = engine.sweep()
+            recorder.record(snapshot, describe)
+            cache.prune(snapshot)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+    return recorder.stats()
+
+
+def capture_info(path):
+    replayer = Replayer(path)
+    first = last = None
+    pids = 0
+    for snapshot, _ in replayer:
+        first = first if first is not None else snapshot.timestamp
+        last = snapshot.timestamp
+        pids = max(pids, len(snapshot))
+    return {"host": replayer.header.get("host"), "sweeps": replayer.sweeps, "seconds": (last or 0) - (first or 0),
+            "max_pids": pids, "events": replayer.events, "bytes": os.path.getsize(path)}
+
+
+def parse_override(text):
+    """NAME=VALUE with a JSON value (numbers, true/false, quoted strings) or a bare string"""
+    name, _, value = text.partition("=")
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "replay", "info"):
+        print(__doc__.strip().split("Usage: ", 1)[1])
+        sys.exit(1)
+    command, path = sys.argv[1], sys.argv[2]
+
+    if command == "record":
+        seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 60.0
+        interval = float(sys.argv[4]) if len(sys.argv) > 4 else 1.0
+        print(f"🎥 Recording the process table to {path} for {seconds:.0f}s (Ctrl+C stops early)")
+        stats = record_standalone(path, seconds, interval)
+        print(f"✅ {stats['sweeps']} sweeps, {stats['rows']} changed rows, {stats['bytes'] / 1024:.1f} KB")
+    elif command == "info":
+        info = capture_info(path)
+        print(f"📼 {path}: {info['sweeps']} sweeps over {info['seconds']:.0f}s from {info['host']}, "
+              f"up to {info['max_pids']} PIDs, {info['bytes'] / 1024:.1f} KB"
+              f"{', kernel spawn events' if info['events'] else ''}")
+    else:
+        speed = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+        try:
+            from . import acm_monitor
+        except ImportError:
+            import acm_monitor
+        for name, value in map(parse_override, sys.argv[4:]):
+            if not name.isupper() or not hasattr(acm_monitor, name):
+                print(f"❌ Unknown setting {name}")
+                sys.exit(2)
+            setattr(acm_monitor, name, value)
+        acm_monitor.replay_recording(path, speed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Incrementally maintained process tree index
+Keeps a ppid -> children map in step with each sweep's diff and rolls CPU
+and RSS up every subtree, so whole process families can be judged without
+extra /proc reads
+"""
+
+import threading
+from collections import namedtuple
+
+MAX_DEPTH = 512  # Guards the ancestor walk against a corrupt parent chain
+
+# Result of applying one snapshot: PIDs that appeared, exited or changed parent
+TreeDiff = namedtuple("TreeDiff", ["added", "exited", "reparented"])
+
+# Aggregates for a process and all of its descendants
+SubtreeTotals = namedtuple("SubtreeTotals", ["pid", "rss_kb", "cpu_percent", "processes"])
+
+
+class ProcessTree:
+    """ppid -> children index with per-subtree RSS, CPU and process count
+
+    Each node stores its own values and the totals of its subtree. Any
+    change to a node (value update, attach, detach) is pushed up the
+    ancestor chain, so an update costs O(depth) and a subtree query O(1).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._starttime = {}
+        self._parent = {}
+        self._children = {}
+        self._roots = set()
+        self._own_rss = {}
+        self._own_cpu = {}
+        self._rss = {}
+        self._cpu = {}
+        self._count = {}
+
+    def __len__(self):
+        return len(self._parent)
+
+    def __contains__(self, pid):
+        return pid in self._parent
+
+    # Internal helpers -- callers hold the lock
+
+    def _propagate(self, pid, rss, cpu, count):
+        """Add deltas to pid and every ancestor above it"""
+        depth = 0
+        while pid is not None and depth < MAX_DEPTH:
+            self._rss[pid] += rss
+            self._cpu[pid] += cpu
+            self._count[pid] += count
+            pid = self._parent.get(pid)
+            depth += 1
+
+    def _detach(self, pid):
+        parent = self._parent.get(pid)
+        if parent is None:
+            return
+        self._propagate(parent, -self._rss[pid], -self._cpu[pid], -self._count[pid])
+        self._children[parent].discard(pid)
+        self._parent[pid] = None
+        self._roots.add(pid)
+
+    def _attach(self, pid, ppid):
+        self._parent[pid] = ppid
+        self._children[ppid].add(pid)
+        self._roots.discard(pid)
+        self._propagate(ppid, self._rss[pid], self._cpu[pid], self._count[pid])
+
+    def _insert(self, proc):
+        pid = proc.pid
+        self._starttime[pid] = proc.starttime
+        self._parent[pid] = None
+        self._children[pid] = set()
+        self._roots.add(pid)
+        self._own_rss[pid] = self._rss[pid] = proc.rss_kb
+        self._own_cpu[pid] = self._cpu[pid] = 0.0
+        self._count[pid] = 1
+
+    def _remove(self, pid):
+        self._detach(pid)
+        for child in self._children.pop(pid, ()):
+            self._parent[child] = None
+            self._roots.add(child)
+        self._roots.discard(pid)
+        for table in (self._starttime, self._parent, self._own_rss, self._own_cpu,
+                      self._rss, self._cpu, self._count):
+            table.pop(pid, None)
+
+    # Public API
+
+    def update(self, snapshot):
+        """Apply a snapshot and return the TreeDiff that was applied"""
+        with self._lock:
+            processes = snapshot.processes
+            exited = [pid for pid, start in self._starttime.items()
+                      if pid not in processes or processes[pid].starttime != start]
+            for pid in exited:
+                self._remove(pid)
+
+            added = [proc for pid, proc in processes.items() if pid not in self._parent]
+            for proc in added:
+                self._insert(proc)
+
+            # Moves: new nodes, plus survivors whose parent changed (e.g.
+            # orphans adopted by init or a subreaper)
+            new_pids = {proc.pid for proc in added}
+            reparented = []
+            for proc in processes.values():
+                pid = proc.pid
+                current = self._parent[pid]
+                wanted = proc.ppid if proc.ppid in self._parent and proc.ppid != pid else None
+                if current != wanted:
+                    if pid not in new_pids:
+                        reparented.append(pid)
+                    self._detach(pid)
+                    if wanted is not None:
+                        self._attach(pid, wanted)
+
+                delta = proc.rss_kb - self._own_rss[pid]
+                if delta:
+                    self._own_rss[pid] = proc.rss_kb
+                    self._propagate(pid, delta, 0.0, 0)
+
+            return TreeDiff(sorted(new_pids), exited, reparented)
+
+    def set_cpu(self, usage):
+        """Record per-process CPU percentages (e.g. from CpuSampler)"""
+        with self._lock:
+            for pid in self._own_cpu:
+                cpu = usage.get(pid, 0.0)
+                delta = cpu - self._own_cpu[pid]
+                if delta:
+                    self._own_cpu[pid] = cpu
+                    self._propagate(pid, 0, delta, 0)
+
+    def parent(self, pid):
+        return self._parent.get(pid)
+
+    def children(self, pid):
+        with self._lock:
+            return list(self._children.get(pid, ()))
+
+    def ancestors(self, pid):
+        """[ppid, grandparent, ...] up to the root, in O(depth)"""
+        chain = []
+        with self._lock:
+            pid = self._parent.get(pid)
+            while pid is not None and len(chain) < MAX_DEPTH:
+                chain.append(pid)
+                pid = self._parent.get(pid)
+        return chain
+
+    def totals(self, pid):
+        """SubtreeTotals for pid, or None if it is not in the tree"""
+        with self._lock:
+            if pid not in self._parent:
+                return None
+            return SubtreeTotals(pid, self._rss[pid], self._cpu[pid], self._count[pid])
+
+    def heaviest_families(self, rss_kb=None, cpu_percent=None):
+        """Deepest subtrees over a threshold that no single child explains
+
+        Walks down from the roots only into subtrees above the threshold
+        and returns the nodes where none of the children is above it on its
+        own -- e.g. make for a make -j64 build, or the Chrome browser
+        process for its renderers. Exactly one of rss_kb/cpu_percent
+        selects the metric.
+        """
+        metric, limit = (self._rss, rss_kb) if rss_kb is not None else (self._cpu, cpu_percent)
+        families = []
+        with self._lock:
+            stack = [pid for pid in self._roots if metric[pid] > limit]
+            while stack:
+                pid = stack.pop()
+                heavy_children = [c for c in self._children[pid] if metric[c] > limit]
+                if heavy_children:
+                    stack.extend(heavy_children)
+                else:
+                    families.append(SubtreeTotals(pid, self._rss[pid], self._cpu[pid], self._count[pid]))
+        return families
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Low-level procfs reader
+Reads /proc files with raw os.open/os.read into a reusable buffer and
+parses only the requested fields, without building Python file objects or
+splitting the whole line into ~52 strings
+"""
+
+import os
+import threading
+import weakref
+
+# Overridable so the monitor and benchmarks can run against a synthetic tree
+# (see fake_procfs.py)
+PROC_ROOT = os.environ.get("NETSNOOP_PROC_ROOT", "/proc")
+
+# Field numbers of /proc/<pid>/stat as documented in proc(5)
+STAT_PID = 1
+STAT_COMM = 2
+STAT_STATE = 3
+STAT_PPID = 4
+STAT_UTIME = 14
+STAT_STIME = 15
+STAT_STARTTIME = 22
+STAT_VSIZE = 23
+STAT_RSS = 24
+
+UID_KEY = b"\nUid:"
+VMRSS_KEY = b"\nVmRSS:"
+
+
+def parse_stat(buf, length, fields):
+    """Parse selected fields from raw /proc/<pid>/stat contents
+
+    The comm field is whatever lies between the first '(' and the LAST ')',
+    so names such as "Web Content" or "(sd-pam)" do not shift the fields
+    after it. Returns (comm, values) where values follow the order of
+    fields; the state field is returned as a str, every other field as int.
+    Returns None if the buffer is not a stat line.
+    """
+    start = buf.find(b"(", 0, length)
+    end = buf.rfind(b")", 0, length)
+    if start < 0 or end < start:
+        return None
+    comm = buf[start + 1:end].decode(errors="replace")
+
+    # Only split as far as the highest field we need
+    last = max(fields)
+    rest = buf[end + 2:length].split(None, last - STAT_STATE + 1)
+    values = []
+    for field in fields:
+        if field == STAT_PID:
+            values.append(int(buf[:start]))
+        elif field == STAT_COMM:
+            values.append(comm)
+        elif field == STAT_STATE:
+            values.append(rest[0].decode())
+        else:
+            values.append(int(rest[field - STAT_STATE]))
+    return comm, values
+
+
+def parse_status_value(buf, length, key):
+    """First integer after a "\\nKey:" line in raw /proc/<pid>/status contents"""
+    pos = buf.find(key, 0, length)
+    if pos < 0:
+        return None
+    pos += len(key)
+    eol = buf.find(b"\n", pos, length)
+    if eol < 0:
+        eol = length
+    parts = buf[pos:eol].split(None, 1)
+    return int(parts[0]) if parts else None
+
+
+class ProcReader:
+    """Reads procfs files into one growable, reusable buffer
+
+    Not thread-safe: each thread should own its reader (see thread_reader).
+    Keeps running totals of files opened and bytes read so callers can
+    account for their own I/O cost.
+    """
+
+    def __init__(self, proc_root=PROC_ROOT, buffer_size=4096):
+        self.proc_root = proc_root
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self.opens = 0
+        self.bytes_read = 0
+        with _readers_lock:
+            _readers.add(self)
+
+    def read(self, path):
+        """Read a whole file into the shared buffer and return its length
+
+        Returns None if the file cannot be opened or read, e.g. because the
+        process exited. The data is valid until the next call.
+        """
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+        self.opens += 1
+        total = 0
+        try:
+            while True:
+                n = os.readv(fd, [self._view[total:]])
+                if n == 0:
+                    break
+                total += n
+                if total == len(self._buffer):
+                    self._grow()
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+        self.bytes_read += total
+        return total
+
+    def _grow(self):
+        self._view.release()
+        self._buffer.extend(bytes(len(self._buffer)))
+        self._view = memoryview(self._buffer)
+
+    def stat(self, pid, fields):
+        """(comm, values) for the requested stat fields, or None"""
+        length = self.read(f"{self.proc_root}/{pid}/stat")
+        if not length:
+            return None
+        try:
+            return parse_stat(self._buffer, length, fields)
+        except (ValueError, IndexError):
+            return None
+
+    def status(self, pid, keys):
+        """Integer values for the given status keys (None where missing)"""
+        length = self.read(f"{self.proc_root}/{pid}/status")
+        if not length:
+            return None
+        try:
+            return [parse_status_value(self._buffer, length, key) for key in keys]
+        except ValueError:
+            return None
+
+    def cmdline(self, pid):
+        """Command line with NUL separators replaced by spaces, or None"""
+        length = self.read(f"{self.proc_root}/{pid}/cmdline")
+        if length is None:
+            return None
+        return self._buffer[:length].replace(b"\x00", b" ").decode(errors="replace").strip()
+
+    def first_line(self, path):
+        """First line of an arbitrary procfs file as bytes, or None"""
+        length = self.read(path)
+        if length is None:
+            return None
+        eol = self._buffer.find(b"\n", 0, length)
+        return bytes(self._buffer[:eol if eol >= 0 else length])
+
+
+_local = threading.local()
+_readers = weakref.WeakSet()  # Every live ProcReader, for io_totals()
+_readers_lock = threading.Lock()
+
+
+def io_totals():
+    """(files opened, bytes read) summed over every live ProcReader"""
+    with _readers_lock:
+        readers = list(_readers)
+    return sum(r.opens for r in readers), sum(r.bytes_read for r in readers)
+
+
+def thread_reader(proc_root=PROC_ROOT):
+    """A ProcReader owned by the calling thread"""
+    readers = getattr(_local, "readers", None)
+    if readers is None:
+        readers = _local.readers = {}
+    reader = readers.get(proc_root)
+    if reader is None:
+        reader = readers[proc_root] = ProcReader(proc_root)
+    return reader
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Adaptive per-process sampling for NetSnoop's /proc sweeps
+Each process gets its own re-read interval from how close it is to the
+alert thresholds and how much it moved since its last read, so hot and
+volatile processes are read every tick and idle daemons rarely; all
+intervals are stretched while the monitor's own CPU is over budget
+"""
+
+import os
+import threading
+import time
+
+HOT = 0.8  # Heat (fraction of a threshold) at and above which a process gets the shortest interval
+
+
+class _Sampled:
+    """What the scheduler remembers about one process since its last read"""
+
+    __slots__ = ("starttime", "jiffies", "total", "rss_kb", "cpu", "interval", "next_due")
+
+    def __init__(self, proc, total, now):
+        self.starttime = proc.starttime
+        self.jiffies = proc.utime + proc.stime
+        self.total = total
+        self.rss_kb = proc.rss_kb
+        self.cpu = None  # Unknown until the second read
+        self.interval = 0.0
+        self.next_due = now
+
+
+class SamplingScheduler:
+    """Decides which PIDs a sweep re-reads and which keep their previous row
+
+    heat = max(value / threshold, 2 * change / threshold) over memory and
+    CPU, with thresholds from limits() (the lowest level any rule alerts
+    at). A process at HOT or above is re-read every min_interval; colder
+    ones geometrically less often, up to max_interval. New processes are
+    re-read on the next tick so their CPU rate is known quickly.
+
+    check_budget() measures the whole monitor's CPU time against
+    budget_percent of one core over budget_window seconds and multiplies
+    every interval by a stretch factor (up to max_stretch) while it is
+    over, relaxing it again once usage drops below half the budget.
+    """
+
+    def __init__(self, limits, min_interval=1.0, max_interval=30.0, budget_percent=1.0,
+                 budget_window=10.0, max_stretch=8.0, num_cpus=None):
+        self.limits = limits  # () -> (memory_mb, cpu_percent)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.budget_percent = budget_percent
+        self.budget_window = budget_window
+        self.max_stretch = max_stretch
+        self.num_cpus = num_cpus or os.cpu_count() or 1
+        self.stretch = 1.0
+        self.overhead_percent = 0.0
+        self._entries = {}  # pid -> _Sampled
+        self._lock = threading.Lock()
+        self._memory_limit = self._cpu_limit = 1.0
+        self._budget_start = (time.monotonic(), time.process_time())
+        self.sweeps = 0
+        self.reads = 0
+        self.reused = 0
+
+    def begin(self):
+        """Start a sweep: refresh the thresholds the heat is measured against"""
+        memory_mb, cpu_percent = self.limits()
+        self._memory_limit = max(memory_mb, 1e-6) * 1024  # In kB, like rss_kb
+        self._cpu_limit = max(cpu_percent, 1e-6)
+        self.sweeps += 1
+
+    def due(self, pid, now):
+        """Whether a PID's row must be re-read this sweep"""
+        entry = self._entries.get(pid)
+        if entry is None or now >= entry.next_due:
+            return True
+        self.reused += 1
+        return False
+
+    def observe(self, proc, cpu_total, now):
+        """Schedule the next read of a process that was just read"""
+        self.reads += 1
+        with self._lock:
+            entry = self._entries.get(proc.pid)
+            if entry is None or entry.starttime != proc.starttime:
+                # New process (or a recycled PID): read it again next tick
+                self._entries[proc.pid] = _Sampled(proc, cpu_total, now)
+                return
+
+            jiffies = proc.utime + proc.stime
+            total_delta = cpu_total - entry.total
+            cpu = entry.cpu
+            if total_delta > 0:
+                cpu = max(jiffies - entry.jiffies, 0) * 100.0 * self.num_cpus / total_delta
+            change = abs(proc.rss_kb - entry.rss_kb) / self._memory_limit
+            if cpu is not None and entry.cpu is not None:
+                change += abs(cpu - entry.cpu) / self._cpu_limit
+            heat = max(proc.rss_kb / self._memory_limit, (cpu or 0.0) / self._cpu_limit, 2 * change)
+
+            entry.jiffies, entry.total, entry.rss_kb, entry.cpu = jiffies, cpu_total, proc.rss_kb, cpu
+            entry.interval = self.interval_for(heat)
+            entry.next_due = now + entry.interval
+
+    def interval_for(self, heat):
+        """min_interval at HOT and above, max_interval for an idle process, stretched"""
+        if heat >= HOT:
+            interval = self.min_interval
+        else:
+            interval = self.min_interval * (self.max_interval / self.min_interval) ** (1.0 - heat / HOT)
+        return interval * self.stretch
+
+    def prune(self, live_pids):
+        """Forget processes that are no longer in /proc"""
+        with self._lock:
+            for pid in [pid for pid in self._entries if pid not in live_pids]:
+                del self._entries[pid]
+
+    def check_budget(self):
+        """Adjust the stretch once per budget window; returns True if it changed"""
+        wall, cpu = time.monotonic(), time.process_time()
+        start_wall, start_cpu = self._budget_start
+        if wall - start_wall < self.budget_window:
+            return False
+        self._budget_start = (wall, cpu)
+        self.overhead_percent = (cpu - start_cpu) * 100.0 / (wall - start_wall)
+
+        previous = self.stretch
+        if self.overhead_percent > self.budget_percent:
+            self.stretch = min(self.stretch * 1.5, self.max_stretch)
+        elif self.overhead_percent < self.budget_percent / 2:
+            self.stretch = max(self.stretch / 1.25, 1.0)
+        return self.stretch != previous
+
+    def stats(self):
+        with self._lock:
+            intervals = [entry.interval for entry in self._entries.values() if entry.interval]
+        return {
+            "tracked": len(self._entries),
+            "hot": sum(1 for interval in intervals if interval <= self.min_interval * self.stretch),
+            "mean_interval": sum(intervals) / len(intervals) if intervals else 0.0,
+            "reads_per_sweep": self.reads / self.sweeps if self.sweeps else 0.0,
+            "reused_per_sweep": self.reused / self.sweeps if self.sweeps else 0.0,
+            "overhead_percent": self.overhead_percent,
+            "budget_percent": self.budget_percent,
+            "stretch": self.stretch,
+        }
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Self-instrumentation for the NetSnoop monitor
+Per-stage latency histograms and counters for a periodic self-report, and
+an on-demand profiling session (cProfile per instrumented thread plus
+tracemalloc) that dumps its results to files after N seconds
+"""
+
+import bisect
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+# Histogram bucket upper bounds in seconds (the last bucket is open-ended)
+LATENCY_BOUNDS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+
+class LatencyHistogram:
+    """Fixed log-spaced buckets; percentiles are reported as bucket upper bounds"""
+
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.buckets[bisect.bisect_left(LATENCY_BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction):
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank:
+                return min(LATENCY_BOUNDS[index], self.max) if index < len(LATENCY_BOUNDS) else self.max
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "max": self.max,
+        }
+
+
+class SelfMetrics:
+    """Counters and per-stage latency histograms, collected per report interval"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._running = {}   # name -> running total kept elsewhere
+        self._reported = {}  # name -> that total at the last collect
+        self._interval_start = (time.monotonic(), time.process_time())
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def set_total(self, name, value):
+        """Record a running total kept elsewhere; reported as its change since the last collect"""
+        with self._lock:
+            self._running[name] = value
+
+    def collect(self):
+        """Stage summaries, counters and the monitor's CPU since the last collect, then reset"""
+        wall, cpu = time.monotonic(), time.process_time()
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            counters, self._counters = self._counters, {}
+            for name, value in self._running.items():
+                counters[name] = value - self._reported.get(name, 0)
+                self._reported[name] = value
+            start_wall, start_cpu = self._interval_start
+            self._interval_start = (wall, cpu)
+        elapsed = max(wall - start_wall, 1e-9)
+        return {
+            "seconds": elapsed,
+            "cpu_percent": (cpu - start_cpu) * 100.0 / elapsed,
+            "stages": {stage: h.summary() for stage, h in histograms.items()},
+            "counters": counters,
+        }
+
+
+def format_report(report):
+    """One-line summary of a collect() result for the persistent log"""
+    stages = ", ".join(
+        f"{stage} p50 {s['p50'] * 1000:.2f}ms p95 {s['p95'] * 1000:.2f}ms max {s['max'] * 1000:.2f}ms ({s['count']})"
+        for stage, s in sorted(report["stages"].items())
+    )
+    counters = ", ".join(f"{name} {value:,}" for name, value in sorted(report["counters"].items()))
+    return (f"last {report['seconds']:.0f}s: CPU {report['cpu_percent']:.2f}% | {stages or 'no stages'}"
+            f" | {counters or 'no counters'}")
+
+
+class ProfileSession:
+    """cProfile in every thread that calls checkpoint(), plus tracemalloc, for a fixed time
+
+    cProfile only sees the thread that enabled it, so each instrumented
+    loop calls checkpoint() once per iteration: before the deadline it
+    starts a profiler for that thread, after it the thread stops its own
+    profiler and hands the stats over.
+    """
+
+    def __init__(self, seconds, output_dir=".", frames=10, grace=15.0, prefix="netsnoop_profile"):
+        self.seconds = seconds
+        self.output_dir = output_dir
+        self.prefix = prefix
+        self.started = time.time()
+        self.deadline = time.monotonic() + seconds
+        self.grace = grace
+        self._lock = threading.Lock()
+        self._active = {}  # thread ident -> Profile
+        self._finished = []
+        self._own_tracing = not tracemalloc.is_tracing()
+        if self._own_tracing:
+            tracemalloc.start(frames)
+        self._baseline = tracemalloc.take_snapshot()
+
+    def checkpoint(self):
+        ident = threading.get_ident()
+        if time.monotonic() < self.deadline:
+            if ident not in self._active:
+                profile = cProfile.Profile()
+                try:
+                    profile.enable()
+                except ValueError:
+                    # Python 3.12+: one profiler already covers every thread
+                    profile = None
+                with self._lock:
+                    self._active[ident] = profile
+            return
+        with self._lock:
+            profile = self._active.pop(ident, None)
+        if profile is not None:
+            profile.disable()
+            with self._lock:
+                self._finished.append(profile)
+
+    def done(self):
+        """Past the deadline and every profiled thread has checked in (or the grace ran out)"""
+        now = time.monotonic()
+        return now >= self.deadline and (not self._active or now >= self.deadline + self.grace)
+
+    def dump(self):
+        """Write the merged profile and the allocation report; returns the file paths"""
+        stamp = datetime.fromtimestamp(self.started).strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"{self.prefix}_{stamp}")
+        paths = []
+
+        # Before building the profile report, whose allocations would show up too
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if self._own_tracing:
+            tracemalloc.stop()
+
+        with self._lock:
+            profiles = list(self._finished)
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(base + ".pstats")
+            text = io.StringIO()
+            stats.stream = text
+            stats.sort_stats("cumulative").print_stats(50)
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(f"NetSnoop profile: {self.seconds}s from {stamp}, {len(profiles)} threads\n")
+                f.write(text.getvalue())
+            paths += [base + ".pstats", base + ".txt"]
+
+        with open(base + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+            f.write(f"Traced memory: {current / 1024:.1f} KB current, {peak / 1024:.1f} KB peak\n\n")
+            f.write("Largest allocation sites:\n")
+            for stat in snapshot.statistics("lineno")[:30]:
+                f.write(f"{stat}\n")
+            f.write(f"\nGrowth over {self.seconds}s:\n")
+            for stat in snapshot.compare_to(self._baseline, "lineno")[:30]:
+                f.write(f"{stat}\n")
+        paths.append(base + ".tracemalloc.txt")
+        return paths
+
+
+class Profiler:
+    """Starts a ProfileSession on request (e.g. from a signal handler) and dumps it when done
+
+    request() only records the wish, so it is safe in a signal handler;
+    poll() on the main loop starts and finishes sessions.
+    """
+
+    def __init__(self, seconds=30, output_dir=".", prefix="netsnoop_profile"):
+        self.seconds = seconds
+        self.output_dir = output_dir
+        self.prefix = prefix  # File name prefix, e.g. per process of the pipeline mode
+        self.session = None
+        self._requested = False
+
+    def request(self):
+        self._requested = True
+
+    def checkpoint(self):
+        session = self.session
+        if session is not None:
+            session.checkpoint()
+
+    def poll(self):
+        """Returns ("started", None), ("finished", paths) or None"""
+        if self.session is None:
+            if not self._requested:
+                return None
+            self._requested = False
+            self.session = ProfileSession(self.seconds, self.output_dir, prefix=self.prefix)
+            self.session.checkpoint()
+            return "started", None
+        self.session.checkpoint()
+        if not self.session.done():
+            return None
+        session, self.session = self.session, None
+        self._requested = False  # Requests during a session do not queue another one
+        return "finished", session.dump()
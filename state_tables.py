@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Bounded state tables for NetSnoop's per-process bookkeeping
+A dict with a capacity (least recently used entries are evicted first)
+and an optional time-to-live, so per-PID history cannot grow with PID
+churn and stale entries do not survive to be picked up by a reused PID
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class BoundedTable:
+    """Capacity- and TTL-bounded mapping, kept in least-recently-updated order
+
+    Every write moves the entry to the end and restarts its TTL, so a full
+    table evicts the entry that was updated longest ago. Expired entries
+    are dropped lazily on access and in bulk by expire(), which stops at
+    the first live entry because the table is in update order.
+    Sizes and eviction counts are reported by stats() as gauges.
+    """
+
+    def __init__(self, name, capacity=10000, ttl=None):
+        self.name = name
+        self.capacity = capacity
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, updated)
+        self._lock = threading.Lock()
+        self.lru_evictions = 0
+        self.ttl_evictions = 0
+
+    def _expired(self, updated, now):
+        return self.ttl is not None and now - updated > self.ttl
+
+    def get(self, key, default=None, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            item = self._entries.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            if self._expired(item[1], now):
+                del self._entries[key]
+                self.ttl_evictions += 1
+                return default
+            return item[0]
+
+    def set(self, key, value, now=None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._entries[key] = (value, now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+                self.lru_evictions += 1
+
+    __setitem__ = set
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._entries.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def __delitem__(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._entries.pop(key, _MISSING)
+            if item is not _MISSING and self._expired(item[1], now):
+                self.ttl_evictions += 1
+                item = _MISSING
+        if item is _MISSING:
+            raise KeyError(key)
+
+    def __len__(self):
+        """Live entries (expired ones are dropped first)"""
+        self.expire()
+        return len(self._entries)
+
+    def items(self):
+        """Snapshot of (key, value) pairs, oldest first"""
+        with self._lock:
+            return [(key, item[0]) for key, item in self._entries.items()]
+
+    def expire(self, now=None):
+        """Drop every entry older than the TTL; returns how many were dropped"""
+        if self.ttl is None:
+            return 0
+        now = time.time() if now is None else now
+        dropped = 0
+        with self._lock:
+            while self._entries:
+                key, (_, updated) = next(iter(self._entries.items()))
+                if not self._expired(updated, now):
+                    break
+                del self._entries[key]
+                dropped += 1
+            self.ttl_evictions += dropped
+        return dropped
+
+    def stats(self):
+        self.expire()  # So size counts live entries only
+        return {
+            "size": len(self._entries),
+            "capacity": self.capacity,
+            "lru_evictions": self.lru_evictions,
+            "ttl_evictions": self.ttl_evictions,
+        }
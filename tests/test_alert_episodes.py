@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+from alert_episodes import ESCALATED, OPEN, AlertTracker, format_duration
+
+
+def snapshot(**starttimes):
+    """pid -> row with a starttime, e.g. snapshot(p100=5000)"""
+    return {int(pid[1:]): SimpleNamespace(starttime=st) for pid, st in starttimes.items()}
+
+
+def test_open_escalate_and_ongoing():
+    tracker = AlertTracker("memory", resolve_after=30)
+    transition, episode = tracker.observe(100, 5000, "HIGH", 60.0, now=1000)
+    assert transition == OPEN
+    assert tracker.observe(100, 5000, "HIGH", 70.0, now=1005) == (None, episode)
+    assert tracker.observe(100, 5000, "CRITICAL", 120.0, now=1010) == (ESCALATED, episode)
+    # Falling back to a lower severity keeps the highest one, without a new row
+    assert tracker.observe(100, 5000, "HIGH", 65.0, now=1015) == (None, episode)
+    assert episode.severity == "CRITICAL"
+    assert (episode.value, episode.peak) == (65.0, 120.0)
+    assert tracker.stats() == {"open": 1, "opened": 1, "escalated": 1, "resolved": 0}
+
+
+def test_hysteresis_waits_resolve_after_quiet_seconds():
+    tracker = AlertTracker("cpu", resolve_after=30)
+    tracker.observe(100, 5000, "HIGH", 85.0, now=1000)
+    running = snapshot(p100=5000)
+    assert tracker.resolve(running, now=1029) == []
+    # Back over the threshold before resolve_after ran out: same episode
+    assert tracker.observe(100, 5000, "HIGH", 82.0, now=1029)[0] is None
+    assert tracker.resolve(running, now=1058) == []
+    (episode,) = tracker.resolve(running, now=1059)
+    assert episode.closed == 1029  # Last sweep it was over the thresholds
+    assert tracker.stats()["open"] == 0
+    # Crossing again later opens a new episode
+    transition, again = tracker.observe(100, 5000, "HIGH", 90.0, now=1100)
+    assert transition == OPEN and again.id != episode.id
+
+
+def test_exited_process_resolves_at_once():
+    tracker = AlertTracker("memory", resolve_after=30)
+    tracker.observe(100, 5000, "HIGH", 60.0, now=1000)
+    (episode,) = tracker.resolve(snapshot(), now=1001)
+    assert episode.closed == 1000
+
+
+def test_reused_pid_replaces_episode():
+    tracker = AlertTracker("memory", resolve_after=30)
+    _, old = tracker.observe(100, 5000, "CRITICAL", 150.0, now=1000)
+    # Same pid, new process: its own episode, and the old one resolves
+    transition, new = tracker.observe(100, 7000, "HIGH", 60.0, now=1005)
+    assert transition == OPEN and new.id != old.id and new.severity == "HIGH"
+    assert tracker.resolve(snapshot(p100=7000), now=1006) == [old]
+    assert tracker.stats()["open"] == 1
+
+
+def test_resolved_episode_has_peak_and_duration():
+    tracker = AlertTracker("memory", resolve_after=30)
+    for now, value in ((1000, 60.0), (1010, 95.5), (1020, 70.0), (1725, 61.0)):
+        tracker.observe(100, 5000, "HIGH", value, now=now)
+    (episode,) = tracker.resolve(snapshot(), now=1730)
+    assert episode.peak == 95.5
+    assert episode.duration == 725
+    assert format_duration(episode.duration) == "12m05s"
+    assert format_duration(45) == "45s" and format_duration(3 * 3600 + 7 * 60) == "3h07m"
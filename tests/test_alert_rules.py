@@ -0,0 +1,45 @@
+import pytest
+
+from alert_rules import RuleSet
+
+DEFAULTS = {
+    "memory_mb": {"HIGH": 50, "CRITICAL": 100, "EXTREME": 200},
+    "cpu_percent": {"HIGH": 80, "CRITICAL": 95, "EXTREME": 98},
+    "family_memory_mb": 400, "family_cpu_percent": 150,
+}
+
+
+def test_patterns_with_global_flags_and_backreferences():
+    rules = RuleSet({
+        "safe_parent_patterns": ["(?i)^KWORKER/"],
+        "rules": [
+            {"name": "python", "cmdline": "(?i)python", "exclude": True},
+            {"name": "doubled", "cmdline": r"(\w)\1"},
+        ],
+    }, DEFAULTS)
+    assert rules.decide("x", "root", "/usr/bin/PYTHON3 run.py").rules == ("python",)
+    assert rules.decide("x", "root", "/usr/bin/PYTHON3 run.py").excluded
+    assert rules.decide("x", "root", "cat -n").rules == ()
+    assert rules.decide("x", "root", "seed").rules == ("doubled",)
+    assert rules.is_safe_parent("kworker/0:1")
+
+
+def test_bad_pattern_names_its_rule():
+    with pytest.raises(ValueError, match="rule 'broken'"):
+        RuleSet({"rules": [{"name": "broken", "cmdline": "("}]}, DEFAULTS)
+
+
+def test_partial_levels_keep_default_ratios():
+    rules = RuleSet({"thresholds": {"memory_mb": {"HIGH": 500}}}, DEFAULTS)
+    assert dict(rules.defaults["memory_mb"]) == {"HIGH": 500, "CRITICAL": 1000, "EXTREME": 2000}
+    assert rules.floor["memory_mb"] == 500
+
+    rules = RuleSet({"rules": [{"name": "shells", "process": "bash",
+                                "thresholds": {"cpu_percent": {"CRITICAL": 190}}}]}, DEFAULTS)
+    assert dict(rules.decide("bash", "root", "bash").thresholds["cpu_percent"]) == {
+        "HIGH": 160, "CRITICAL": 190, "EXTREME": 196}
+
+
+def test_decreasing_levels_are_rejected():
+    with pytest.raises(ValueError, match="below"):
+        RuleSet({"thresholds": {"memory_mb": {"HIGH": 300, "CRITICAL": 150}}}, DEFAULTS)
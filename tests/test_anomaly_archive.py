@@ -0,0 +1,80 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+import anomaly_archive
+from anomaly_archive import AnomalyArchive
+from anomaly_schema import FIELDNAMES, make_record, read_records, to_row
+from log_segments import load_manifest, manifest_path
+
+pytest.importorskip("pyarrow")
+
+DAY = 1719700000.0  # 2024-06-30 IST
+
+
+def write_segments(csv_file, rows_per_segment):
+    """Compressed segments holding the given records, and their manifest"""
+    segments = []
+    for number, records in enumerate(rows_per_segment, 1):
+        name = f"{csv_file}.{number}.gz"
+        with gzip.open(name, "wt", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDNAMES)
+            writer.writeheader()
+            for record in records:
+                writer.writerow(to_row(record))
+        segments.append({"number": number, "file": name.rsplit("/", 1)[-1],
+                         "start": records[0].ts, "end": records[-1].ts})
+    with open(manifest_path(csv_file), "w", encoding="utf-8") as f:
+        json.dump({"active_start": None, "last_number": len(segments), "segments": segments}, f)
+
+
+def records(offset):
+    return [
+        make_record(DAY + offset, "HIGH_MEMORY", "HIGH", "java", 4242, "HIGH MEMORY: 812.5 MB",
+                    parent_pid=1, user="app", command="java -jar svc.jar", memory_usage_mb=812.5,
+                    cpu_usage=12.5, duration="", session_id="s1", additional_info="{}",
+                    state="open", episode="4242-1"),
+        make_record(DAY + offset + 60, "HIGH_MEMORY", "HIGH", "java", 4242, "resolved",
+                    parent_pid=1, user="app", command="java -jar svc.jar", memory_usage_mb=903.0,
+                    duration="60s", state="resolved", episode="4242-1"),
+    ]
+
+
+def test_compaction_keeps_every_schema_field(tmp_path):
+    csv_file = str(tmp_path / "anomalies.csv")
+    written = records(0)
+    write_segments(csv_file, [written])
+    archive = AnomalyArchive(str(tmp_path / "archive"))
+
+    assert archive.compact(csv_file, now=DAY + 3 * 86400)["rows"] == 2
+    assert load_manifest(csv_file)["segments"] == []
+    table = archive.read()
+    assert table.column_names == list(FIELDNAMES)
+    assert [tuple(row[name] for name in FIELDNAMES) for row in table.to_pylist()] == [tuple(r) for r in written]
+
+
+def test_compaction_rerun_after_crash_does_not_duplicate(tmp_path, monkeypatch):
+    csv_file = str(tmp_path / "anomalies.csv")
+    write_segments(csv_file, [records(0), records(600)])
+    archive = AnomalyArchive(str(tmp_path / "archive"))
+
+    def crash(path, numbers):
+        raise KeyboardInterrupt
+
+    # Dies after publishing the archive, before the segments are removed
+    real = anomaly_archive.remove_segments
+    monkeypatch.setattr(anomaly_archive, "remove_segments", crash)
+    with pytest.raises(KeyboardInterrupt):
+        archive.compact(csv_file, now=DAY + 3 * 86400)
+    assert archive.compacted(csv_file) == {1, 2}
+    # Readers of both tiers see each row once in the meantime
+    assert len(list(read_records(csv_file, skip=archive.compacted(csv_file)))) == 0
+    assert archive.read().num_rows == 4
+
+    monkeypatch.setattr(anomaly_archive, "remove_segments", real)
+    assert archive.compact(csv_file, now=DAY + 3 * 86400)["rows"] == 0
+    assert load_manifest(csv_file)["segments"] == []
+    assert archive.read().num_rows == 4
+    assert archive.counts()["total_anomalies"] == 2  # Resolved rows are not counted
@@ -0,0 +1,33 @@
+import csv
+
+from anomaly_schema import FIELDNAMES, from_legacy_row, header_version, migrate_file, read_records
+
+
+def test_legacy_monitor_rows_take_metrics_from_the_reason():
+    memory = from_legacy_row(["2025-06-29 19:56:11 IST", "test2.py", "1516",
+                              "HIGH MEMORY: 69.53 MB memory usage", "HIGH", "chitv", "python3 test2.py"])
+    cpu = from_legacy_row(["2025-06-29 19:59:36 IST", "test3.py", "1578",
+                           "HIGH CPU: 90.0% CPU usage", "HIGH", "chitv", "python3 test3.py"])
+    burst = from_legacy_row(["2025-06-29 19:55:35 IST", "python", "1447",
+                             "Process burst: 21 processes spawned rapidly", "HIGH", "chitv", "N/A"])
+    assert (memory.anomaly_type, memory.memory_usage_mb, memory.cpu_usage) == ("HIGH_MEMORY", 69.53, 0.0)
+    assert (cpu.anomaly_type, cpu.cpu_usage, cpu.memory_usage_mb) == ("HIGH_CPU", 90.0, 0.0)
+    assert (burst.cpu_usage, burst.memory_usage_mb) == (0.0, 0.0)
+
+
+def test_migrate_keeps_legacy_metrics(tmp_path):
+    path = tmp_path / "anomalies.csv"
+    path.write_text(
+        "timestamp,anomaly_type,severity,process_name,pid,user,command,description,cpu_usage,"
+        "memory_usage_mb,duration,parent_pid,session_id,additional_info\n"
+        "2024-01-15 14:32:45,High Memory Usage,HIGH,firefox,1236,user1,/usr/bin/firefox,"
+        "High memory usage: 512.3 MB,0.0,512.3,,1000,20240115_14,\n"
+        "2025-06-29 19:56:11 IST,test2.py,1516,HIGH MEMORY: 69.53 MB memory usage,HIGH,chitv,python3 test2.py\n"
+        "2025-06-29 19:59:36 IST,test3.py,1578,HIGH CPU: 90.0% CPU usage,HIGH,chitv,python3 test3.py\n",
+        encoding="utf-8",
+    )
+    migrate_file(str(path))
+    with open(path, newline="", encoding="utf-8") as f:
+        assert header_version(next(csv.reader(f))) == header_version(FIELDNAMES)
+    records = list(read_records(str(path), include_segments=False))
+    assert [(r.memory_usage_mb, r.cpu_usage) for r in records] == [(512.3, 0.0), (69.53, 0.0), (0.0, 90.0)]
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+from fake_procfs import PAGE_KB, build_fake_proc
+from proc_snapshot import SNAPSHOT_STAT_FIELDS, SnapshotEngine
+from process_cache import ProcessMetadataCache
+from procfs import parse_stat
+
+ODD_COMMS = ["Web Content", "(sd-pam)", "a) b (c", "tmux: server", "x) 1 2 (y) z"]
+
+
+def fake_tree(tmp_path, num_pids=300):
+    fake = build_fake_proc(str(tmp_path), num_pids, seed=7)
+    shell = next(proc for proc in fake.processes.values() if proc.comm == "bash")
+    odd = [fake.spawn(shell.pid, comm, [f"./{comm}", "--flag"], 1200, shell.uid) for comm in ODD_COMMS]
+    zombie = fake.spawn(shell.pid, "python3", ["python3", "done.py"], 9000, shell.uid)
+    fake.exit(zombie.pid, zombie=True)
+    vanishing = fake.spawn(shell.pid, "sleep", ["sleep", "5"], 700, shell.uid)
+    fake.vanish(vanishing.pid)
+    return fake, odd, zombie, vanishing
+
+
+def expected_row(proc):
+    rss_kb = proc.rss_kb // PAGE_KB * PAGE_KB if proc.kernel or proc.state == "Z" else proc.rss_kb
+    return (proc.pid, proc.comm, proc.ppid, proc.uid, proc.state, proc.utime, proc.stime, rss_kb, proc.starttime)
+
+
+def test_parse_stat_handles_odd_comms(tmp_path):
+    fake, odd, _, _ = fake_tree(tmp_path)
+    for proc in odd:
+        line = proc.stat_line().encode()
+        comm, (state, ppid, utime, stime, starttime, rss) = parse_stat(bytearray(line), len(line),
+                                                                      SNAPSHOT_STAT_FIELDS)
+        assert (comm, state, ppid, utime, stime, starttime, rss) == (
+            proc.comm, proc.state, proc.ppid, proc.utime, proc.stime, proc.starttime, proc.rss_kb // PAGE_KB)
+
+
+def test_sweep_matches_generated_processes(tmp_path):
+    fake, odd, zombie, vanishing = fake_tree(tmp_path)
+    snapshot = SnapshotEngine(str(tmp_path), exclude_pids=()).sweep()
+
+    # Vanished mid-sweep: listed in the directory, but left out of the table
+    assert vanishing.pid not in snapshot
+    assert set(snapshot.pids()) == set(fake.processes) - fake.vanished
+    for pid in snapshot.pids():
+        assert tuple(snapshot.get(pid)) == expected_row(fake.processes[pid])
+    assert [snapshot.get(proc.pid).comm for proc in odd] == ODD_COMMS
+    assert snapshot.get(zombie.pid).state == "Z"
+    assert snapshot.cpu_total == sum(fake.cpu_jiffies)
+
+
+def test_metadata_cache_against_generated_tree(tmp_path):
+    fake, odd, zombie, vanishing = fake_tree(tmp_path)
+    engine = SnapshotEngine(str(tmp_path), exclude_pids=())
+    snapshot = engine.sweep()
+    cache = ProcessMetadataCache(str(tmp_path))
+
+    entry = cache.lookup(snapshot.get(odd[0].pid), snapshot)
+    assert (entry.comm, entry.cmdline) == ("Web Content", "./Web Content --flag")
+    assert entry.parent_starttime == fake.processes[odd[0].ppid].starttime
+    assert cache.lookup(snapshot.get(odd[0].pid), snapshot) is entry
+    assert cache.stats()["hits"] == 1
+    assert cache.lookup(snapshot.get(zombie.pid), snapshot).cmdline == "N/A"  # Zombies have no cmdline
+    assert cache.get(vanishing.pid) is None
+
+    # Same pid, new process: a fresh entry, and prune drops the stale one
+    proc = fake.processes[odd[0].pid]
+    proc.starttime += 500
+    proc.argv = ["/usr/bin/other"]
+    fake._write_process(proc)
+    snapshot = engine.sweep()
+    cache.prune(snapshot)
+    assert cache.stats()["entries"] == 1  # Only the zombie survives
+    assert cache.lookup(snapshot.get(proc.pid), snapshot).cmdline == "/usr/bin/other"
+
+
+def test_monitor_modules_honour_proc_root_variable(tmp_path):
+    fake, _, _, _ = fake_tree(tmp_path)
+    env = dict(os.environ, NETSNOOP_PROC_ROOT=str(tmp_path))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = "import os; from proc_snapshot import SnapshotEngine; print(os.getpid(), *SnapshotEngine().sweep().pids())"
+    own, *pids = map(int, subprocess.run([sys.executable, "-c", script], cwd=root, env=env,
+                                         capture_output=True, text=True, check=True).stdout.split())
+    assert set(pids) == set(fake.processes) - fake.vanished - {own}
@@ -0,0 +1,94 @@
+import csv
+import io
+import os
+
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("plotly")
+pd = pytest.importorskip("pandas")
+
+from anomaly_schema import FIELDNAMES, make_record, to_row  # noqa: E402
+from dashboard import IncrementalAnomalyLoader, parse_anomaly_csv  # noqa: E402
+
+
+def row_bytes(ts, pid, command="python3 app.py"):
+    record = make_record(ts, "HIGH_CPU", "HIGH", "python3", pid, f"HIGH CPU: {pid % 100}% CPU usage",
+                         user="app", command=command, cpu_usage=pid % 100)
+    out = io.StringIO(newline="")
+    csv.DictWriter(out, fieldnames=FIELDNAMES).writerow(to_row(record))
+    return out.getvalue().encode("utf-8")
+
+
+def header_bytes():
+    out = io.StringIO(newline="")
+    csv.writer(out).writerow(FIELDNAMES)
+    return out.getvalue().encode("utf-8")
+
+
+def append(path, data):
+    with open(path, "ab") as f:
+        f.write(data)
+
+
+def full_parse(path):
+    with open(path, "rb") as f:
+        return parse_anomaly_csv(f.read())
+
+
+def assert_same(loaded, expected):
+    def normalized(df):
+        df = df.sort_values(["ts", "pid"]).reset_index(drop=True)
+        return df.astype({name: str for name in df.columns if df[name].dtype.name in ("category", "object")})
+    pd.testing.assert_frame_equal(normalized(loaded), normalized(expected), check_dtype=False)
+
+
+def test_appends_partial_rows_and_embedded_newlines(tmp_path):
+    path = str(tmp_path / "anomalies.csv")
+    append(path, header_bytes() + row_bytes(1000, 101) + row_bytes(1001, 102))
+    loader = IncrementalAnomalyLoader(path)
+    assert len(loader.load()) == 2
+
+    # A row still being written is left for the next call
+    partial = row_bytes(1002, 103)
+    append(path, partial[:25])
+    assert len(loader.load()) == 2
+    append(path, partial[25:])
+    assert len(loader.load()) == 3
+
+    # A quoted command with newlines, flushed in the middle of the quotes
+    multiline = row_bytes(1003, 104, command='sh -c "echo one\necho two"\n--flag')
+    cut = multiline.index(b"\n") + 1
+    append(path, multiline[:cut])
+    assert len(loader.load()) == 3
+    append(path, multiline[cut:] + row_bytes(1004, 105))
+    df = loader.load()
+    assert len(df) == 5
+    assert 'sh -c "echo one\necho two"\n--flag' in set(df["command"].astype(str))
+    assert loader.full_reloads == 0
+    assert_same(df, full_parse(path))
+
+
+def test_rotation_and_truncation_reload(tmp_path):
+    path = str(tmp_path / "anomalies.csv")
+    append(path, header_bytes() + row_bytes(1000, 101) + row_bytes(1001, 102))
+    loader = IncrementalAnomalyLoader(path)
+    assert len(loader.load()) == 2
+
+    # Rotated: a new file (new inode) starts with a header again
+    os.rename(path, path + ".1")
+    append(path, header_bytes() + row_bytes(2000, 201))
+    df = loader.load()
+    assert loader.full_reloads == 1
+    assert_same(df, full_parse(path))
+
+    append(path, row_bytes(2001, 202))
+    assert_same(loader.load(), full_parse(path))
+
+    # Truncated in place: shorter than the last offset
+    with open(path, "wb") as f:
+        f.write(header_bytes() + row_bytes(3000, 301))
+    df = loader.load()
+    assert loader.full_reloads == 2
+    assert list(df["pid"]) == [301]
+    assert_same(df, full_parse(path))
@@ -0,0 +1,18 @@
+from log_index import MappedLog
+
+
+def test_filter_match_must_not_span_lines(tmp_path):
+    path = tmp_path / "netsnoop_persistent.txt"
+    path.write_text(
+        "[2025-06-29 19:52:09 IST] alpha end\n"
+        "[2025-06-29 19:52:10 IST] beta\n"
+        "[2025-06-29 19:52:11 IST] gamma end here\n",
+        encoding="utf-8",
+    )
+    log = MappedLog(str(path))
+    try:
+        assert log.tail(10, r"end\s+\S+") == ["[2025-06-29 19:52:11 IST] gamma end here"]
+        assert log.page(0, 10, r"end\s+\S+") == ["[2025-06-29 19:52:11 IST] gamma end here"]
+        assert len(log.tail(10, "end")) == 2
+    finally:
+        log.close()
@@ -0,0 +1,55 @@
+import threading
+
+from log_writer import _LINE, _STOP, BatchedWriter
+
+
+class SlowSink:
+    def __init__(self, release):
+        self.release = release
+        self.records = []
+
+    def write_batch(self, records):
+        self.release.wait(10)
+        self.records.extend(records)
+
+    def close(self):
+        pass
+
+
+def test_writes_after_close_are_refused_and_counted(tmp_path):
+    path = str(tmp_path / "netsnoop.log")
+    writer = BatchedWriter()
+    assert writer.write_line(path, "before\n")
+    assert writer.close()
+    assert not writer.write_line(path, "after\n")
+    assert writer.stats()["dropped"] == 1
+    assert writer.flush()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "before\n"
+
+
+def test_items_behind_stop_in_a_batch_are_written(tmp_path):
+    path = str(tmp_path / "netsnoop.log")
+    writer = BatchedWriter()
+    # Queued before the thread starts, so they arrive in one drained batch
+    for item in ((_LINE, path, "one\n", None), (_STOP, None, None, None), (_LINE, path, "two\n", None)):
+        writer._queue.put(item)
+    writer.start()
+    writer._thread.join(5)
+    assert not writer._thread.is_alive()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == "one\ntwo\n"
+
+
+def test_close_timeout_keeps_the_writer_until_it_exits(tmp_path):
+    release = threading.Event()
+    sink = SlowSink(release)
+    writer = BatchedWriter()
+    writer.write_record(sink, "row")
+    assert not writer.close(timeout=0.05)
+    assert not writer.flush(timeout=0.05)
+    assert not writer.write_record(sink, "late")
+    release.set()
+    assert writer.close()
+    assert sink.records == ["row"]
+    assert writer.stats()["dropped"] == 1
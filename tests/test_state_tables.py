@@ -0,0 +1,28 @@
+import pytest
+
+from state_tables import BoundedTable
+
+
+def test_del_missing_or_expired_key_raises():
+    table = BoundedTable("cooldowns", capacity=10, ttl=30)
+    table.set("a", 1, now=0)
+    with pytest.raises(KeyError):
+        del table["missing"]
+    table.set("b", 2)
+    del table["b"]
+    assert "b" not in table
+    # Expired entries are already gone as far as the mapping is concerned
+    with pytest.raises(KeyError):
+        del table["a"]
+    assert table.stats()["ttl_evictions"] == 1
+
+
+def test_size_counts_live_entries_only():
+    table = BoundedTable("cooldowns", capacity=2, ttl=30)
+    table.set("old", 1, now=0)
+    table.set("new", 2)
+    assert table.stats()["size"] == 1
+    assert len(table) == 1
+    table.set("newer", 3)
+    table.set("newest", 4)
+    assert table.stats() == {"size": 2, "capacity": 2, "lru_evictions": 1, "ttl_evictions": 1}